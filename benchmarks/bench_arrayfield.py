@@ -0,0 +1,77 @@
+"""
+Encode and decode throughput of `ArrayField`, for enum and plain element types.
+
+Compares the per-element Enum constructor the field used to call with its cached lookup
+tables, and the native Postgres list with the JSON text used on other databases.
+
+    python -m benchmarks.bench_arrayfield --size 50 --runs 20000
+"""
+
+import argparse
+import time
+from enum import Enum
+from bot.database.models import ArrayField
+
+
+class Colour(str, Enum):
+    red = "red"
+    green = "green"
+    blue = "blue"
+
+
+class _Dialect:
+    def __init__(self, dialect: str) -> None:
+        self.capabilities = type("Capabilities", (), {"dialect": dialect})()
+
+
+def make_field(elem_type: type, dialect: str) -> ArrayField:
+    field = ArrayField(elem_type)
+    field.model = type("Model", (), {"_meta": type("Meta", (), {"db": _Dialect(dialect)})()})
+    return field
+
+
+def legacy_encode(value: list) -> list:
+    return [v.value if isinstance(v, Enum) else v for v in value]
+
+
+def legacy_decode(elem_type: type, value: list) -> list:
+    return [elem_type(v) for v in value]
+
+
+def timeit(label: str, func, runs: int) -> None:
+    start = time.perf_counter()
+    for _ in range(runs):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed / runs * 1e6:8.2f} us/op")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=50, help="elements per array")
+    parser.add_argument("--runs", type=int, default=20_000)
+    args = parser.parse_args()
+
+    members = list(Colour)
+    enums = [members[i % len(members)] for i in range(args.size)]
+    values = [member.value for member in enums]
+    strings = [f"domain-{i}.com" for i in range(args.size)]
+
+    for dialect in ("postgres", "sqlite"):
+        enum_field = make_field(Colour, dialect)
+        str_field = make_field(str, dialect)
+        enum_stored = enum_field.to_db_value(enums, None)
+        str_stored = str_field.to_db_value(strings, None)
+
+        print(f"{dialect}, {args.size} elements")
+        timeit("enum encode (legacy)", lambda: legacy_encode(enums), args.runs)
+        timeit("enum encode", lambda: enum_field.to_db_value(enums, None), args.runs)
+        timeit("enum decode (legacy)", lambda: legacy_decode(Colour, values), args.runs)
+        timeit("enum decode", lambda: enum_field.to_python_value(enum_stored), args.runs)
+        timeit("str encode", lambda: str_field.to_db_value(strings, None), args.runs)
+        timeit("str decode", lambda: str_field.to_python_value(str_stored), args.runs)
+        print()
+
+
+if __name__ == "__main__":
+    main()
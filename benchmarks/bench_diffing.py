@@ -0,0 +1,150 @@
+"""
+Cost of diffing the objects of the ModLog update events: the `DiffSpec`s against DeepDiff.
+
+Builds a guild of `--members` members, `--channels` channels and `--roles` roles from gateway
+payloads, then times the diffs of the update events as py-cord produces them: a shallow copy
+of the object taken before it is updated in place from the new payload.
+
+    python -m benchmarks.bench_diffing --members 2000
+
+DeepDiff is not a dependency of the bot, install it to compare with it.
+"""
+
+import argparse
+import asyncio
+import copy
+import time
+import typing as t
+import discord
+from discord.http import HTTPClient
+from discord.state import ConnectionState
+from bot.utils.diffing import CHANNEL_DIFF, GUILD_DIFF, MEMBER_DIFF, ROLE_DIFF
+
+try:
+    from deepdiff import DeepDiff
+except ImportError:
+    DeepDiff = None
+
+
+def role_payload(i: int, name: str = "role") -> dict:
+    return {
+        "id": str(100 + i),
+        "name": f"{name}{i}",
+        "color": 0x3775A8,
+        "hoist": False,
+        "position": i,
+        "permissions": "104324673",
+        "managed": False,
+        "mentionable": False,
+    }
+
+
+def channel_payload(i: int, topic: str = "Rules and announcements") -> dict:
+    return {
+        "id": str(10_000 + i),
+        "type": 0,
+        "name": f"channel-{i}",
+        "position": i,
+        "permission_overwrites": [{"id": str(100 + j), "type": 0, "allow": "1024", "deny": "2048"} for j in range(5)],
+        "topic": topic,
+        "nsfw": False,
+        "rate_limit_per_user": 0,
+        "parent_id": None,
+    }
+
+
+def member_payload(i: int, nick: t.Optional[str] = None) -> dict:
+    return {
+        "user": {"id": str(1_000_000 + i), "username": f"user{i}", "discriminator": "0001", "avatar": None},
+        "nick": nick,
+        "roles": [str(100 + j) for j in range(i % 5)],
+        "joined_at": "2023-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+    }
+
+
+def guild_payload(members: int, channels: int, roles: int, name: str = "Guild") -> dict:
+    return {
+        "id": "1",
+        "name": name,
+        "icon": None,
+        "owner_id": "2",
+        "afk_timeout": 300,
+        "verification_level": 1,
+        "explicit_content_filter": 0,
+        "default_message_notifications": 0,
+        "mfa_level": 0,
+        "features": ["COMMUNITY"],
+        "emojis": [],
+        "stickers": [],
+        "premium_tier": 0,
+        "preferred_locale": "en-US",
+        "nsfw_level": 0,
+        "system_channel_flags": 0,
+        "roles": [role_payload(i) for i in range(roles)],
+        "channels": [channel_payload(i) for i in range(channels)],
+        "members": [member_payload(i) for i in range(members)],
+    }
+
+
+def timed(label: str, count: int, diff: t.Callable[[], t.Any]) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        diff()
+    per_call = (time.perf_counter() - start) / count
+    print(f"  {label:<10} {per_call * 1e6:>10.1f}µs")
+    return per_call
+
+
+def main(members: int, channels: int, roles: int, count: int) -> None:
+    loop = asyncio.new_event_loop()
+    state = ConnectionState(
+        dispatch=lambda *args: None,
+        handlers={},
+        hooks={},
+        http=HTTPClient(loop=loop),
+        loop=loop,
+        intents=discord.Intents.all(),
+    )
+    guild = discord.Guild(data=guild_payload(members, channels, roles), state=state)
+
+    # Like py-cord's update handlers: copy, then update in place
+    channel = guild.get_channel(10_000)
+    channel_before = copy.copy(channel)
+    channel._update(guild, channel_payload(0, topic="Read the rules"))
+
+    role = guild.get_role(103)
+    role_before = copy.copy(role)
+    role._update(role_payload(3, name="renamed"))
+
+    member = guild.get_member(1_000_001)
+    member_before = copy.copy(member)
+    member._update(member_payload(1, nick="nickname"))
+
+    guild_before = copy.copy(guild)
+    guild._from_data(guild_payload(members, channels, roles, name="Renamed"))
+
+    cases = (
+        ("channel", CHANNEL_DIFF, channel_before, channel, {}),
+        ("role", ROLE_DIFF, role_before, role, {}),
+        ("member", MEMBER_DIFF, member_before, member, {"exclude_regex_paths": r".*\[.*"}),
+        ("guild", GUILD_DIFF, guild_before, guild, {}),
+    )
+    print(f"{members} members, {channels} channels, {roles} roles, {count} diffs each")
+    for name, spec, before, after, deepdiff_options in cases:
+        print(f"{name}: {[change.label for change in spec.diff(before, after)]}")
+        spec_time = timed("DiffSpec", count, lambda: spec.diff(before, after))
+        if DeepDiff is not None:
+            deepdiff_time = timed("DeepDiff", max(count // 100, 1), lambda: DeepDiff(before, after, **deepdiff_options))
+            print(f"  {deepdiff_time / spec_time:.0f}x faster")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--channels", type=int, default=100)
+    parser.add_argument("--roles", type=int, default=50)
+    parser.add_argument("--count", type=int, default=10_000)
+    args = parser.parse_args()
+    main(args.members, args.channels, args.roles, args.count)
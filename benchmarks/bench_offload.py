@@ -0,0 +1,71 @@
+"""
+Event loop lag while long edited messages are diffed, inline and offloaded.
+
+Diffs `--edits` pairs of `--chars`-character messages where every other word changed, the
+worst case of the message log's word diff, while `LoopLag` times the loop. Each mode runs the
+same edits: inline on the loop, in the thread pool and in the process pool.
+
+    python -m benchmarks.bench_offload --edits 20 --chars 4000
+"""
+
+import argparse
+import asyncio
+import random
+import string
+import time
+from bot.utils.diffing import word_diff
+from bot.utils.offload import LoopLag, Offloader
+
+
+def random_word() -> str:
+    return "".join(random.choices(string.ascii_lowercase, k=random.randint(2, 8)))
+
+
+def edited_message(chars: int) -> tuple:
+    words = []
+    while sum(map(len, words)) + len(words) < chars:
+        words.append(random_word())
+    edited = [word if i % 2 else random_word() for i, word in enumerate(words)]
+    return " ".join(words), " ".join(edited)
+
+
+async def run(mode: str, edits: list, threshold: int) -> None:
+    offloader = Offloader(mode=mode, workers=2, threshold=threshold, max_pending=32)
+    lag = LoopLag(0.01)
+    lag.start()
+    await asyncio.sleep(0.05)
+    lag.reset()
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(offloader.run(word_diff, before, after, size=len(before) + len(after)) for before, after in edits)
+    )
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.05)
+    lag.stop()
+    offloader.close()
+
+    label = "inline" if threshold == float("inf") else mode
+    print(
+        f"{label:<8} {elapsed * 1000:>8.0f}ms total, "
+        f"loop lag max {lag.max * 1000:>7.1f}ms, avg {lag.avg * 1000:>6.1f}ms"
+    )
+
+
+async def main(count: int, chars: int) -> None:
+    edits = [edited_message(chars) for _ in range(count)]
+    start = time.perf_counter()
+    word_diff(*edits[0])
+    print(f"{count} edits of {chars} characters, {(time.perf_counter() - start) * 1000:.0f}ms per diff")
+
+    await run("thread", edits, threshold=float("inf"))
+    await run("thread", edits, threshold=0)
+    await run("process", edits, threshold=0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--edits", type=int, default=20)
+    parser.add_argument("--chars", type=int, default=4000)
+    args = parser.parse_args()
+    asyncio.run(main(args.edits, args.chars))
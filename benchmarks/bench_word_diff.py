@@ -0,0 +1,102 @@
+"""
+Word diff of edited messages on adversarial edits: the capped Myers diff against `difflib.ndiff`.
+
+Every case is a pair of `--chars`-character messages:
+
+- typo: one word changed in the middle, the common case
+- alternating: every other word replaced
+- shuffled: the same words in a random order
+- reversed: the same words in the reverse order
+- repetitive: few distinct words, which defeats difflib's matching heuristics
+- rewritten: no word in common
+
+    python -m benchmarks.bench_word_diff --chars 4000
+
+`difflib.ndiff` is cubic on some of them (its intraline matching of replaced words), so its
+runs are killed after `--ndiff-timeout` seconds.
+"""
+
+import argparse
+import difflib
+import itertools
+import multiprocessing
+import random
+import string
+import time
+import typing as t
+from bot.utils import diffing
+from bot.utils.diffing import MAX_DIFF_COST, word_diff
+
+
+def words_of(chars: int, vocabulary: t.Optional[t.List[str]] = None) -> t.List[str]:
+    words: t.List[str] = []
+    while sum(map(len, words)) + len(words) < chars:
+        if vocabulary:
+            words.append(random.choice(vocabulary))
+        else:
+            words.append("".join(random.choices(string.ascii_lowercase, k=random.randint(2, 8))))
+    return words
+
+
+def cases(chars: int) -> t.Dict[str, t.Tuple[str, str]]:
+    words = words_of(chars)
+    typo = words[:]
+    typo[len(typo) // 2] = "tpyo"
+    alternating = [word if i % 2 else "changed" for i, word in enumerate(words)]
+    shuffled = random.sample(words, len(words))
+    repetitive = words_of(chars, ["a", "b", "c"])
+    edited_repetitive = [word if random.random() < 0.7 else "d" for word in repetitive]
+
+    return {
+        "typo": (words, typo),
+        "alternating": (words, alternating),
+        "shuffled": (words, shuffled),
+        "reversed": (words, words[::-1]),
+        "repetitive": (repetitive, edited_repetitive),
+        "rewritten": (words, words_of(chars)),
+    }
+
+
+def ndiff_render(before: str, after: str) -> None:
+    """The rendering the message log did before, with `difflib.ndiff`."""
+    diff = difflib.ndiff(before.split(), after.split())
+    tuple((kind, tuple(s[2:] for s in words)) for kind, words in itertools.groupby(diff, key=lambda s: s[0]))
+
+
+def timed(func: t.Callable[[], t.Any], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def timed_ndiff(before: str, after: str, timeout: float) -> str:
+    process = multiprocessing.Process(target=ndiff_render, args=(before, after))
+    start = time.perf_counter()
+    process.start()
+    process.join(timeout)
+    if process.is_alive():
+        process.terminate()
+        return f">{timeout:.0f}s"
+    return f"{(time.perf_counter() - start) * 1000:.1f}ms"
+
+
+def main(chars: int, repeat: int, max_cost: int, ndiff_timeout: float) -> None:
+    print(f"Edits of {chars} characters, cost cap {max_cost}, ndiff timed once (with a process start)")
+    print(f"{'case':<12} {'ndiff':>10} {'myers':>10}  coarse")
+    for name, (before_words, after_words) in cases(chars).items():
+        before, after = " ".join(before_words), " ".join(after_words)
+        ndiff_time = timed_ndiff(before, after, ndiff_timeout)
+        myers_time = timed(lambda: word_diff(before, after, max_cost), repeat)
+        coarse = diffing._diff(before_words, after_words, max_cost // 2 + 1) is None
+        print(f"{name:<12} {ndiff_time:>10} {myers_time * 1000:>8.1f}ms  {'yes' if coarse else 'no'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chars", type=int, default=4000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-cost", type=int, default=MAX_DIFF_COST)
+    parser.add_argument("--ndiff-timeout", type=float, default=10)
+    args = parser.parse_args()
+    main(args.chars, args.repeat, args.max_cost, args.ndiff_timeout)
@@ -26,6 +26,20 @@ from collections import defaultdict
 from bot import constants
 from bot.log import get_logger, return_error
 from bot.database import tortoise_config
+from bot.database.cache import connect_redis
+from bot.database.instrumentation import instrument_connections, query_origin
+from bot.database.routing import start_lag_monitor
+from bot.database.writers import guild_events
+from bot.database.partitions import start_partition_maintenance
+from bot.utils.cache import start_invalidation_listener
+from bot.utils.afk import afk_index
+from bot.utils.tags import tag_uses
+from bot.utils.timers import timers
+from bot.utils.log_dispatch import log_dispatcher
+from bot.utils.message_store import message_archive
+from bot.utils.send_queue import send_queues
+from bot.utils.webhooks import WebhookPool
+from bot.utils.offload import loop_lag, offload
 from bot.database.models import Filterlist
 
 
@@ -37,7 +51,7 @@ class Bot(commands.Bot):
     """Subclass of Pycord commands.Bot with custom methods and attributes."""
 
     on_ready_fired: bool = False
-    cache: Dict[str, Dict] = {"afk": {}, "example_list": {}}
+    cache: Dict[str, Dict] = {"afk": afk_index.guilds, "example_list": {}}
 
     def __init__(
         self,
@@ -82,6 +96,15 @@ class Bot(commands.Bot):
             command_prefix=self.command_prefix,
         )
 
+        # -- Log delivery through webhooks, see bot/utils/webhooks.py
+        if constants.Logs.webhooks:
+            log_dispatcher.webhooks = WebhookPool(
+                self.session,
+                size=constants.Logs.webhook_pool_size,
+                allowed_mentions=allowed_mentions,
+                retry_after=constants.Logs.webhook_retry_after,
+            )
+
         # -- Load Extensions
         self.load_extension("jishaku")
         self.load_extensions()
@@ -132,11 +155,43 @@ class Bot(commands.Bot):
     async def on_ready(self) -> None:
         """Called when we have successfully connected to a gateway"""
         await Tortoise.init(tortoise_config.TORTOISE_CONFIG)
+        instrument_connections()
+        start_lag_monitor()
         await Tortoise.generate_schemas()
+        await connect_redis()
+        start_invalidation_listener()
+        guild_events.start()
+        start_partition_maintenance()
+        tag_uses.start()
+        timers.start()
+        loop_lag.start()
         self.status.start()
         log.info(f"Signed into Discord as {self.user} (ID: {self.user.id})\n")
         await self.cache_guilds_data()
+        if any(guild["message_store"] for guild in self.guilds_info_cache.values()):
+            message_archive.start()
         await self.cache_filter_list_data()
+        await afk_index.load()
+
+    async def on_webhooks_update(self, channel: discord.abc.GuildChannel) -> None:
+        """Try again to set up the log webhooks of a channel whose webhooks changed."""
+        if log_dispatcher.webhooks is not None:
+            log_dispatcher.webhooks.webhooks_updated(channel.id)
+
+    async def close(self) -> None:
+        """
+        Flush the buffered audit rows, tag uses, archived and queued messages, and stop the timers, before
+        disconnecting.
+        """
+        await guild_events.close()
+        log_dispatcher.close()
+        await send_queues.close(constants.SendQueues.drain_timeout)
+        await tag_uses.close()
+        await timers.close()
+        await message_archive.close()
+        loop_lag.stop()
+        offload.close()
+        await super().close()
 
     def _start(self) -> None:
         self.run(constants.Bot.token, reconnect=True)
@@ -166,6 +221,7 @@ class Bot(commands.Bot):
             "message_log": item["message_log"],
             "mod_log": item["mod_log"],
             "logging": item["is_logging"],
+            "message_store": item["is_message_store"],
         }
 
     async def cache_guilds_data(self) -> None:
@@ -189,6 +245,13 @@ async def on_guild_join(guild: discord.Guild) -> None:
         log.info(f"{guild.name} ({guild.id}) Has Reinvited {constants.Bot.name}.")
 
 
+@bot.before_invoke
+async def set_query_origin(ctx: commands.Context) -> None:
+    """Tag the queries run by this command invocation, for the slow-query log."""
+    cog = ctx.cog.qualified_name if ctx.cog else "Bot"
+    query_origin.set(f"{cog}.{ctx.command.qualified_name}")
+
+
 # -- Bot Checks
 
 
@@ -210,7 +273,7 @@ async def is_bot_on_maintenance_mode(ctx: commands.Context) -> bool:
 
 @bot.check
 async def is_guild_blacklisted(ctx: commands.Context) -> bool:
-    guild = await Guild.get(discord_id=ctx.guild.id)
+    guild = await Guild.from_id(ctx.guild.id)
     blacklisted = guild.is_bot_blacklisted
     bot_name = constants.Bot.name
 
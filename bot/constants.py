@@ -317,11 +317,176 @@ class _Redis(EnvConfig):
     use_fakeredis = False  # If this is True, Bot will use fakeredis.aioredis
     default_path = "C:/Redis"
     uri = "redis://localhost:6379"
+    ttl = 3600  # Seconds a cached model hash lives in Redis
 
 
 Redis = _Redis()
 
 
+class _Cache(EnvConfig):
+    # In-process tier of the two-tier cache, see bot/utils/cache.py
+
+    EnvConfig.Config.env_prefix = "cache_"
+
+    maxsize = 10_000  # Entries kept per namespace
+    ttl = 300  # Seconds an entry lives in process memory
+    invalidation_channel = "b0f:cache-invalidate"
+    listener_retry = 5  # Seconds before subscribing to the invalidations again after losing Redis
+
+
+Cache = _Cache()
+
+
+class _Database(EnvConfig):
+    # Query instrumentation (bot/database/instrumentation.py) and the asyncpg pool (bot/database/pool.py).
+    # The pool settings can also be overridden by the `DATABASE_POOL` mapping of config.yaml
+
+    EnvConfig.Config.env_prefix = "database_"
+
+    instrument_queries = True
+    slow_query_ms = 250  # Queries slower than this are logged with the command that ran them
+
+    pool_min_size = 2
+    pool_max_size = 10
+    pool_max_queries = 50_000  # Queries before a connection is replaced
+    pool_max_inactive_lifetime = 300.0  # Seconds before an idle connection is closed
+    pool_acquire_timeout = 10.0  # Seconds a query waits for a free connection
+    statement_cache_size = 256  # Prepared statements kept per connection, 0 behind pgbouncer
+    command_timeout = 30.0  # Seconds before a single statement is cancelled
+
+    # Read replica (DATABASE_REPLICA_URI in config.yaml), see bot/database/routing.py
+    replica_max_lag = 5.0  # Seconds behind the primary past which reads go to the primary
+    replica_pin_seconds = 5.0  # Seconds a task keeps reading from the primary after a write
+    replica_lag_interval = 5.0  # Seconds between lag measurements
+
+    # Batched GuildEvent writer, see bot/database/writers.py
+    event_batch_size = 500  # Rows per COPY/executemany
+    event_flush_interval = 2.0  # Seconds a row waits at most before being written
+    event_max_pending = 10_000  # Queued rows past which producers wait
+
+    # Monthly partitions of GuildEvent and Warns, see bot/database/partitions.py
+    partition_months_ahead = 3  # Future monthly partitions kept ready
+    guild_event_retention_months = 0  # Months kept, 0 keeps everything
+    warns_retention_months = 0  # Months kept, 0 keeps everything
+
+
+Database = _Database()
+
+
+class _Tags(EnvConfig):
+    # Tag name index, tag content cache and use counters, see bot/utils/tags.py
+
+    EnvConfig.Config.env_prefix = "tags_"
+
+    index_ttl = 600  # Seconds before a guild's tag names are reloaded from the database
+    fuzzy_index_max = 20_000  # Guilds with more tags get their suggestions from pg_trgm
+    suggestion_threshold = 0.3  # Minimum trigram similarity of a suggested tag
+    suggestions = 3
+    content_cache_size = 256  # Tag contents kept per guild
+    uses_flush_interval = 30.0  # Seconds between writes of the buffered tag use counts
+
+
+Tags = _Tags()
+
+
+class _Invites(EnvConfig):
+    # Join attribution from invite use snapshots, see bot/utils/invites.py
+
+    EnvConfig.Config.env_prefix = "invites_"
+
+    join_debounce = 2.0  # Seconds without a new join before the invites of a guild are fetched
+    join_max_wait = 10.0  # Seconds a burst of joins waits at most for its fetch
+    refresh_retries = 2  # Retries of a failed invite fetch, the snapshot is kept if they all fail
+    refresh_retry_delay = 1.0  # Seconds before the first retry, doubled for each next one
+
+
+Invites = _Invites()
+
+
+class _Timers(EnvConfig):
+    # Persisted timers of timed actions (like mutes), see bot/utils/timers.py
+
+    EnvConfig.Config.env_prefix = "timers_"
+
+    window = 3600  # Seconds of upcoming timers held in memory, the later ones stay in the database
+    batch_size = 500  # Due timers loaded and run at once
+    max_concurrency = 50  # Timer actions running at the same time
+    max_attempts = 5  # Runs of a failing action before its timer is dropped
+    retry_delay = 30  # Seconds before the first retry, doubled on every failure
+
+
+Timers = _Timers()
+
+
+class _Logs(EnvConfig):
+    # Delivery of the log channel messages, see bot/utils/log_dispatch.py
+
+    EnvConfig.Config.env_prefix = "logs_"
+
+    coalesce_window = 1.5  # Seconds a log embed waits for others to share its message
+    max_embeds = 10  # Embeds per message, Discord's limit
+    max_chars = 6000  # Characters of all the embeds of a message, Discord's limit
+    webhooks = False  # Post the logs through webhooks, outside of the bot's own rate limits
+    webhook_pool_size = 2  # Webhooks used in turn per log channel
+    webhook_retry_after = 3600  # Seconds the logs of a channel without webhooks are sent by the bot
+    dedupe_ttl = 60  # Seconds an event stays ignored in the mod log
+    delete_run_window = 2  # Seconds the deletes of a channel are collected, from the first one
+    delete_run_threshold = 5  # Deletes within the window logged as one transcript instead of one by one
+
+
+Logs = _Logs()
+
+
+class _SendQueues(EnvConfig):
+    # Per-channel queues of the messages the bot sends on its own, see bot/utils/send_queue.py
+
+    EnvConfig.Config.env_prefix = "send_queues_"
+
+    capacity = 100  # Messages queued per channel, the oldest is dropped past it
+    max_concurrency = 8  # Sends running at the same time over all the channels
+    drain_timeout = 10.0  # Seconds given to the queues to drain on shutdown
+
+
+SendQueues = _SendQueues()
+
+
+class _Offload(EnvConfig):
+    # CPU-bound work off the event loop, see bot/utils/offload.py
+
+    EnvConfig.Config.env_prefix = "offload_"
+
+    mode = "thread"  # Or "process", to run the work outside of the GIL
+    workers = 2
+    threshold = 2000  # Input size (like characters diffed) from which work is offloaded
+    max_pending = 32  # Calls waiting for the pool, the next ones wait to be submitted
+    lag_interval = 0.5  # Seconds between the wake-ups timing the event loop lag
+
+
+Offload = _Offload()
+
+
+class _Messages(EnvConfig):
+    # Recent messages kept for the message log, see bot/utils/message_store.py
+
+    EnvConfig.Config.env_prefix = "messages_"
+
+    max_messages = 20_000  # Messages kept in memory, the least recently used are evicted first
+    ttl = 86400  # Seconds a message is kept
+    fetch_budget = 5  # API fetches per channel and period, for edits that can't be logged otherwise
+    fetch_period = 60  # Seconds over which the fetch budget refills
+    archive_path = "messages.sqlite3"  # Database of the messages of the guilds that opted in
+    archive_retention = 7 * 86400  # Seconds an archived message is kept
+    archive_max_messages = 1_000_000  # Archived messages, the least recently used are deleted first
+    archive_flush_interval = 5  # Seconds between the batched writes
+    archive_max_pending = 5000  # Messages waiting to be written that trigger an early flush
+    archive_max_backlog = 50_000  # Messages kept for the next flush after failed ones, the oldest are dropped
+    archive_maintenance_interval = 600  # Seconds between the deletions of the expired and excess messages
+    archive_cache_kib = 2048  # SQLite page cache per connection
+
+
+Messages = _Messages()
+
+
 class _BaseURLs(EnvConfig):
     EnvConfig.Config.env_prefix = "urls_"
     # CoinMarketCap API
@@ -0,0 +1,100 @@
+"""
+Redis connection and hash codec used by the cached models.
+
+The connection is opened once the bot is ready, with `connect_redis()`.
+Until then, or when Redis can't be reached, cached reads fall back to the database.
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Type
+from tortoise.models import Model
+from bot import constants
+from bot.log import get_logger
+
+log = get_logger(__name__)
+
+# aioredis.Redis, or fakeredis.aioredis.FakeRedis when `Redis.use_fakeredis` is set
+redis: Optional[Any] = None
+
+
+async def connect_redis() -> None:
+    """Connect to the Redis server set in `constants.Redis`, or to an in-process fakeredis."""
+    global redis
+
+    if redis is not None:
+        return
+
+    if constants.Redis.use_fakeredis:
+        import fakeredis.aioredis
+
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    else:
+        import aioredis
+
+        client = aioredis.from_url(
+            constants.Redis.uri, password=constants.Redis.password or None, decode_responses=True
+        )
+
+    try:
+        await client.ping()
+    except Exception:
+        log.warning("Could not connect to Redis, cached models will read from the database.", exc_info=True)
+        return
+
+    redis = client
+    log.info(f"Connected to {'fakeredis' if constants.Redis.use_fakeredis else constants.Redis.uri}")
+
+
+async def close_redis() -> None:
+    """Close the Redis connection, if any."""
+    global redis
+
+    if redis is not None:
+        await redis.close()
+        redis = None
+
+
+def redis_hashmap(instance: Model) -> Dict[str, str]:
+    """Encode the db columns of `instance` as a flat Redis hash. None values are left out."""
+    hashmap = {}
+    for field_name, column in instance._meta.fields_db_projection.items():
+        value = getattr(instance, field_name)
+        if value is None:
+            continue
+
+        field = instance._meta.fields_map[field_name]
+        value = field.to_db_value(value, instance)
+
+        if isinstance(value, bool):
+            hashmap[column] = "1" if value else "0"
+        elif isinstance(value, (datetime, date)):
+            hashmap[column] = value.isoformat()
+        elif isinstance(value, (list, dict)):
+            hashmap[column] = json.dumps(value)
+        else:
+            hashmap[column] = str(value)
+
+    return hashmap
+
+
+def from_redis_hash(cls: Type[Model], hashmap: Dict[str, str]) -> Model:
+    """Build a saved model instance back from a hash written by `redis_hashmap`."""
+    meta = cls._meta
+    row = {}
+    for field_name, column in meta.fields_db_projection.items():
+        value = hashmap.get(column)
+        if value is not None:
+            field_type = meta.fields_map[field_name].field_type
+            if field_type is bool:
+                value = value == "1"
+            elif field_type in (datetime, date):
+                value = field_type.fromisoformat(value)
+            elif field_type is None:
+                value = json.loads(value)
+            elif field_type is not str:
+                value = field_type(value)
+        row[column] = value
+
+    # `_init_from_db` flags the instance as saved, so `save()` issues an UPDATE and not an INSERT
+    return cls._init_from_db(**row)
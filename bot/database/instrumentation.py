@@ -0,0 +1,188 @@
+"""
+Per-template query statistics and a slow-query log for the Tortoise connections.
+
+`instrument_connections()` wraps the execute methods of every client class in use (and of its
+transaction wrapper), so each query is timed whatever backend runs it. Queries are grouped by
+template, literals and placeholders replaced by `?`, with a fixed-bucket latency histogram per
+template. The command or extension that issued a query is taken from `query_origin`, set before
+every command invocation, or else from the first `exts` frame on the stack of a slow query.
+"""
+
+import bisect
+import functools
+import os
+import re
+import sys
+import time
+import typing as t
+from contextvars import ContextVar
+from tortoise import connections
+from bot import constants
+from bot.log import get_logger
+
+log = get_logger(__name__)
+
+# "<Cog>.<command>" of the command being invoked in the current task, see `Bronn.set_query_origin`
+query_origin: ContextVar[t.Optional[str]] = ContextVar("query_origin", default=None)
+
+EXECUTE_METHODS = ("execute_query", "execute_query_dict", "execute_insert", "execute_many", "execute_script")
+
+# Upper bounds of the latency buckets, in milliseconds
+BUCKETS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+MAX_TEMPLATES = 1000
+OTHER_TEMPLATE = "<other>"
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w\"$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"\$\d+")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+_EXTS_DIR = f"{os.sep}exts{os.sep}"
+
+
+def normalize(sql: str) -> str:
+    """Reduce `sql` to its template, so queries differing only in their values are grouped."""
+    sql = _STRING.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _LIST.sub("(?...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class QueryStats:
+    """Counters and latency histogram of a single query template."""
+
+    __slots__ = ("count", "errors", "rows", "total", "max", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def record(self, ms: float, rows: int) -> None:
+        self.count += 1
+        self.rows += rows
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.buckets[bisect.bisect_left(BUCKETS, ms)] += 1
+
+    def percentile(self, q: float) -> float:
+        """Upper bound in milliseconds of the bucket holding the `q` quantile, capped at the max seen."""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for bound, hits in zip(BUCKETS, self.buckets):
+            seen += hits
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+stats: t.Dict[str, QueryStats] = {}
+
+
+def _entry(sql: str) -> QueryStats:
+    template = normalize(sql)
+    entry = stats.get(template)
+    if entry is None:
+        if len(stats) >= MAX_TEMPLATES:
+            template = OTHER_TEMPLATE
+        entry = stats.setdefault(template, QueryStats())
+    return entry
+
+
+def record(sql: str, ms: float, rows: int) -> None:
+    """Add a query run to the stats of its template, and log it if it was slow."""
+    _entry(sql).record(ms, rows)
+
+    if ms >= constants.Database.slow_query_ms:
+        log.warning(f"Slow query ({ms:.0f}ms, {rows} rows) from {origin()}: {sql[:1000]}")
+
+
+def origin() -> str:
+    """The command being invoked, or the innermost extension function on the stack."""
+    command = query_origin.get()
+    if command is not None:
+        return command
+
+    frame = sys._getframe(1)
+    while frame is not None:
+        if _EXTS_DIR in frame.f_code.co_filename:
+            return f"{frame.f_globals.get('__name__')}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def _count_rows(method: str, result: t.Any) -> int:
+    if method == "execute_query":
+        return len(result[1])
+    if method == "execute_query_dict":
+        return len(result)
+    if method == "execute_insert":
+        return 1
+    return 0
+
+
+def _instrument(method: str, func: t.Callable) -> t.Callable:
+    @functools.wraps(func)
+    async def wrapper(self, query: str, *args, **kwargs) -> t.Any:
+        start = time.perf_counter()
+        try:
+            result = await func(self, query, *args, **kwargs)
+        except Exception:
+            _entry(query).errors += 1
+            raise
+        if method == "execute_many" and args:
+            rows = len(args[0])
+        else:
+            rows = _count_rows(method, result)
+        record(query, (time.perf_counter() - start) * 1000, rows)
+        return result
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+def instrument_client_class(cls: type) -> None:
+    """Time every execute method of the client class `cls`. Calling it twice is harmless."""
+    for method in EXECUTE_METHODS:
+        func = getattr(cls, method, None)
+        if func is None or getattr(func, "__instrumented__", False):
+            continue
+        setattr(cls, method, _instrument(method, func))
+
+
+def instrument_connections() -> None:
+    """Instrument the client classes of every initialised Tortoise connection."""
+    if not constants.Database.instrument_queries:
+        return
+
+    for connection in connections.all():
+        client_class = type(connection)
+        instrument_client_class(client_class)
+
+        # The transaction wrapper overrides some methods, but lives next to its client class
+        transaction_class = getattr(sys.modules[client_class.__module__], "TransactionWrapper", None)
+        if transaction_class is not None:
+            instrument_client_class(transaction_class)
+
+        log.info(f"Instrumented {client_class.__module__}.{client_class.__name__} queries")
+
+
+def top(count: int = 10, key: str = "total") -> t.List[t.Tuple[str, QueryStats]]:
+    """The `count` templates with the highest `key` (total, mean, max or count)."""
+    return sorted(stats.items(), key=lambda item: getattr(item[1], key), reverse=True)[:count]
+
+
+def reset() -> None:
+    stats.clear()
@@ -1,116 +1,133 @@
-# import aioredis
+import asyncio
+import json
 from discord import Guild as GuildModel
 from discord.ext.commands import Context
 from tortoise import fields
-from tortoise.expressions import F
+from tortoise.expressions import F, Q
 from tortoise.models import Model
-from pypika.terms import Function
+from tortoise.transactions import in_transaction
+from tortoise.queryset import QuerySet, QuerySetSingle
+from pypika.enums import Dialects
+from pypika.terms import Function, Term, ValueWrapper
 from enum import Enum
-from typing import Any, List, Type, Union
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Type, Union
 from tortoise.exceptions import ConfigurationError
 from tortoise.fields.base import Field
+from bot.database import routing
+from bot.database.cache import from_redis_hash, redis_hashmap
+from bot.utils.cache import get_cache
 
 
-# aioredis.util._converters[bool] = lambda x: b"1" if x else b"0"
-# redis: aioredis.Redis
+async def c_save(obj, update_fields=None) -> None:
+    """Save `obj` and write it through to every cache registered on its model."""
+    await obj.save(update_fields=update_fields)
+    await asyncio.gather(*(c(obj) for c in obj._cache_updaters))
 
 
-# async def connect_redis() -> None:
-#     global redis
-
-#     redis = aioredis.Redis(await aioredis.create_connection(constants.Redis.uri))
-
+def cached_model(*, key: str, namespace: str):
+    """
+    Add read-through classmethods to a model, looked up by the `key` field in the `namespace` cache.
+
+    For `key="discord_id"` the model gets `c_get_by_discord_id`, `c_get_or_none_by_discord_id`
+    and `c_get_or_create_by_discord_id`, plus `c_save`, which writes the saved values to the cache.
+    Reads go through the in-process LRU, then Redis, then the database (see `bot.utils.cache`).
+    Every `save()` and `delete()` invalidates the cached row, so the next read repopulates it.
+    That read goes to the primary, as a lagging replica would cache the row from before the write
+    for every task.
+    `update_or_create()` saves inside a transaction, where a concurrent read could cache the row
+    again before the commit, so it invalidates once more after it.
+    Queryset `.update()` calls, and saves in other transactions, must invalidate by hand after the commit.
+    """
 
-# asyncio.ensure_future(connect_redis())
+    def predicate(cls: type) -> type:
+        nonlocal key
 
+        if "_cache_updaters" not in cls.__dict__:
+            cls._cache_updaters = []
+            cls._cache_invalidators = []
 
-# def from_redis_hash(cls, hashmap: dict) -> dict:
-#     return {
-#         k: v == "1" if isinstance(
-#             cls._meta.fields_map[k], fields.BooleanField) else v
-#         for k, v in hashmap.items()
-#     }
+            original_save = cls.save
+            original_delete = cls.delete
+            original_update_or_create = cls.update_or_create.__func__
 
+            async def save(self, *args, **kwargs) -> None:
+                await original_save(self, *args, **kwargs)
+                await asyncio.gather(*(c(self) for c in self._cache_invalidators))
 
-# def redis_hashmap(instance) -> dict:
-#     return {
-#         k: getattr(instance, k)
-#         for k in instance._meta.db_fields
-#         if getattr(instance, k) is not None
-#     }
+            async def delete(self, *args, **kwargs) -> None:
+                await original_delete(self, *args, **kwargs)
+                await asyncio.gather(*(c(self) for c in self._cache_invalidators))
 
+            async def update_or_create(cls, *args, **kwargs):
+                obj, created = await original_update_or_create(cls, *args, **kwargs)
+                # The transaction is committed now
+                await asyncio.gather(*(c(obj) for c in cls._cache_invalidators))
+                return obj, created
 
-# async def c_save(obj, update_fields=[]) -> None:
-#     redis_hashmap(obj)
-#     await asyncio.wait([c(obj) for c in obj.__cache_updaters])
-#     await obj.save(update_fields=update_fields)
+            cls.save = save
+            cls.delete = delete
+            cls.update_or_create = classmethod(update_or_create)
 
+        model_cache = get_cache(namespace)
 
-# def cached_model(*, key: str):
-#     def predicate(cls: type) -> type:
-#         nonlocal key
+        def cache_key(value: Any) -> str:
+            return f"{cls.__name__};{key};{value}"
 
-#         if not hasattr(cls, "__cache_updaters"):
-#             cls.__cache_updaters = []
+        async def c_get_or_create(cls=cls, cached_key=None, **kwargs):
+            created = False
 
-#         async def c_get_or_create(cls=cls, cached_key=None, **kwargs):
-#             cached = await c_get_from_cache(cached_key)
-#             if cached:
-#                 return cls(**from_redis_hash(cls, cached)), False
+            async def load() -> dict:
+                nonlocal created
+                with routing.read_from_primary():
+                    obj, created = await cls.get_or_create(**{key: cached_key}, **kwargs)
+                return redis_hashmap(obj)
 
-#             obj, created = await cls.get_or_create(**{key: cached_key}, **kwargs)
-#             await c_update_cache(obj)
-#             return obj, created
+            row = await model_cache.get(cache_key(cached_key), load)
+            return from_redis_hash(cls, row), created
 
-#         async def c_get_or_none(cls=cls, cached_key=None, **kwargs):
-#             cached = await c_get_from_cache(cached_key)
-#             if cached:
-#                 return cls(**from_redis_hash(cls, cached))
+        async def c_get_or_none(cls=cls, cached_key=None, **kwargs):
+            async def load() -> Optional[dict]:
+                with routing.read_from_primary():
+                    obj = await cls.get_or_none(**{key: cached_key}, **kwargs)
+                return None if obj is None else redis_hashmap(obj)
 
-#             obj = await cls.get_or_none(**{key: cached_key}, **kwargs)
-#             if obj is not None:
-#                 await c_update_cache(obj)
-#             return obj
+            row = await model_cache.get(cache_key(cached_key), load)
+            return None if row is None else from_redis_hash(cls, row)
 
-#         async def c_get(cls=cls, cached_key=None, **kwargs):
-#             cached = await c_get_from_cache(cached_key)
-#             if cached:
-#                 return cls(**from_redis_hash(cls, cached))
+        async def c_get(cls=cls, cached_key=None, **kwargs):
+            async def load() -> dict:
+                with routing.read_from_primary():
+                    return redis_hashmap(await cls.get(**{key: cached_key}, **kwargs))
 
-#             obj = await cls.get(**{key: cached_key}, **kwargs)
-#             await c_update_cache(obj)
-#             return obj
+            row = await model_cache.get(cache_key(cached_key), load)
+            return from_redis_hash(cls, row)
 
-#         async def c_get_from_cache(value):
-#             return await redis.hgetall(
-#                 f"{cls.__name__};{key};{value}", encoding="utf-8"
-#             )
+        async def c_update_cache(obj) -> None:
+            await model_cache.set(cache_key(getattr(obj, key)), redis_hashmap(obj))
 
-#         async def c_update_cache(obj) -> None:
-#             await redis.hmset_dict(
-#                 f"{cls.__name__};{key};{getattr(obj, key)}", redis_hashmap(obj)
-#             )
+        async def c_invalidate(obj) -> None:
+            await model_cache.invalidate(cache_key(getattr(obj, key)))
 
-#         cls.__cache_updaters.append(c_update_cache)
+        cls._cache_updaters.append(c_update_cache)
+        cls._cache_invalidators.append(c_invalidate)
 
-#         cleankey: str = key.replace("__", "_")
+        cleankey: str = key.replace("__", "_")
 
-#         # Internal methods added for possible use cases
-#         setattr(cls, "c_update_cache_by_" + cleankey, c_update_cache)
-#         setattr(cls, "c_get_from_cache_by_" + cleankey, c_get_from_cache)
+        # Internal methods added for possible use cases
+        setattr(cls, "c_update_cache_by_" + cleankey, c_update_cache)
+        setattr(cls, "c_invalidate_by_" + cleankey, c_invalidate)
 
-#         # The save method
-#         setattr(cls, "c_save", c_save)
+        # The save method
+        setattr(cls, "c_save", c_save)
 
-#         # The classmethods
-#         setattr(cls, "c_get_or_create_by_" + cleankey,
-#                 classmethod(c_get_or_create))
-#         setattr(cls, "c_get_or_none_by_" + cleankey,
-#                 classmethod(c_get_or_none))
-#         setattr(cls, "c_get_by_" + cleankey, classmethod(c_get))
-#         return cls
+        # The classmethods
+        setattr(cls, "c_get_or_create_by_" + cleankey, classmethod(c_get_or_create))
+        setattr(cls, "c_get_or_none_by_" + cleankey, classmethod(c_get_or_none))
+        setattr(cls, "c_get_by_" + cleankey, classmethod(c_get))
+        return cls
 
-#     return predicate
+    return predicate
 
 
 class ArrayField(Field):  # type: ignore
@@ -118,25 +135,48 @@ class ArrayField(Field):  # type: ignore
     Array field.
 
     This field can store array of integer or string or Enums of these.
-    Only postgres db supported.
+    Postgres stores a native array, other databases a compact JSON array in a TEXT column.
     """
 
     indexable = False
 
+    class _db_sqlite:
+        SQL_TYPE = "TEXT"
+
+    class _db_mysql:
+        SQL_TYPE = "LONGTEXT"
+
     def __init__(self, elem_type: Type, **kwargs: Any) -> None:
         if not issubclass(elem_type, (int, str)):
             raise ConfigurationError("ArrayField only supports integer or string or Enums of these!")
         super().__init__(**kwargs)
         self.elem_type = elem_type
 
-    def to_db_value(self, value: List[Union[int, str, Enum]], instance) -> List[Union[int, str]]:
-        if value and issubclass(self.elem_type, Enum):
-            return [v.value for v in value]
-        return value
-
-    def to_python_value(self, value: List[Union[int, str]]) -> List[Union[int, str, Enum]]:
-        if value and issubclass(self.elem_type, Enum):
-            return [self.elem_type(v) for v in value]
+        # Enum lookup tables, built once instead of calling the Enum constructor on every element
+        self._encode: Optional[dict] = None
+        self._decode: Optional[dict] = None
+        if issubclass(elem_type, Enum):
+            self._encode = {member: member.value for member in elem_type}
+            self._decode = {member.value: member for member in elem_type}
+
+    def _native(self) -> bool:
+        return self.model._meta.db.capabilities.dialect == "postgres"
+
+    def to_db_value(self, value: List[Union[int, str, Enum]], instance) -> Union[List[Union[int, str]], str, None]:
+        if value is None or isinstance(value, Term):
+            return value
+        if self._encode is not None:
+            encode = self._encode
+            value = [encode.get(v, v) for v in value]
+        if self._native():
+            return value
+        return json.dumps(value, separators=(",", ":"))
+
+    def to_python_value(self, value: Union[List[Union[int, str]], str, None]) -> List[Union[int, str, Enum]]:
+        if isinstance(value, str):
+            value = json.loads(value)
+        if value and self._decode is not None:
+            value = list(map(self._decode.__getitem__, value))
         return value
 
     @property
@@ -147,6 +187,35 @@ class ArrayField(Field):  # type: ignore
             return "TEXT ARRAY"
 
 
+class ArrayFunction(Function):
+    """
+    An array function of Postgres, emulated with the JSON1 functions on SQLite.
+
+    `sqlite` is a format string of the emulating expression, taking the SQL of the arguments.
+    List arguments become `ARRAY[...]` on Postgres and JSON arrays elsewhere.
+    """
+
+    sqlite: str = ""
+
+    def __init__(self, name: str, *args: Any) -> None:
+        # Keep lists whole, pypika would otherwise turn them into a tuple of terms
+        super().__init__(name, *(ValueWrapper(list(arg)) if isinstance(arg, (list, tuple)) else arg for arg in args))
+
+    def get_function_sql(self, **kwargs: Any) -> str:
+        dialect = kwargs.get("dialect")
+        if dialect == Dialects.POSTGRESQL:
+            args = [self._array_sql(arg, **kwargs) for arg in self.args]
+            return f"{self.name}({','.join(args)})"
+        if dialect == Dialects.SQLITE:
+            return self.sqlite.format(*(self.get_arg_sql(arg, **kwargs) for arg in self.args))
+        return super().get_function_sql(**kwargs)
+
+    def _array_sql(self, arg: Any, **kwargs: Any) -> str:
+        if isinstance(arg, ValueWrapper) and isinstance(arg.value, list):
+            return f"ARRAY[{','.join(ValueWrapper(v).get_sql(**kwargs) for v in arg.value)}]"
+        return self.get_arg_sql(arg, **kwargs)
+
+
 class BaseModel(Model):
     @classmethod
     async def update_by_guild(cls, field_name: str, value: Any, guild_id: int) -> bool:
@@ -154,23 +223,92 @@ class BaseModel(Model):
         await cls.update_or_create({field_name: value}, guild_id=guild_id)
         return value != 0
 
-    class ArrayAppend(Function):
+    @classmethod
+    async def iter_pages(
+        cls,
+        *,
+        query: Optional[QuerySet] = None,
+        page_size: int = 100,
+        order_by: str = "pk",
+        descending: bool = True,
+        **filters: Any,
+    ) -> AsyncIterator[list]:
+        """
+        Yield the rows matching `filters` in pages of `page_size`, seeking past the last row of each page.
+
+        `query`, like one of the model's query helpers, narrows the rows further; its ordering is replaced.
+
+        `order_by` is the primary key or a timestamp field, ties on the latter are broken by the primary key.
+        It can't be nullable, as the seek past the last row would skip the rows where it is NULL.
+        Unlike OFFSET pagination, every page costs the same index seek however deep it is.
+        """
+        pk = cls._meta.pk_attr
+        order_by = pk if order_by == "pk" else order_by
+        if cls._meta.fields_map[order_by].null:
+            raise ValueError(f"Can't seek pages of {cls.__name__} by the nullable field {order_by}")
+        ordering = [order_by] if order_by == pk else [order_by, pk]
+        query = query if query is not None else cls.all()
+        query = query.filter(**filters).order_by(*(f"-{field}" if descending else field for field in ordering))
+        op = "lt" if descending else "gt"
+
+        last = None
+        while True:
+            page_query = query
+            if last is not None:
+                seek = Q(**{f"{order_by}__{op}": getattr(last, order_by)})
+                if order_by != pk:
+                    seek |= Q(**{order_by: getattr(last, order_by), f"{pk}__{op}": last.pk})
+                page_query = query.filter(seek)
+
+            page = await page_query.limit(page_size)
+            if not page:
+                return
+
+            yield page
+
+            if len(page) < page_size:
+                return
+            last = page[-1]
+
+    class ArrayAppend(ArrayFunction):
+        sqlite = "json_insert(COALESCE({0},'[]'),'$[#]',{1})"
+
         def __init__(self, field: str, value: Any) -> None:
             super().__init__("ARRAY_APPEND", field, value)
 
-    class ArrayRemove(Function):
+    class ArrayRemove(ArrayFunction):
+        sqlite = (
+            "CASE WHEN {0} IS NULL THEN NULL ELSE (SELECT json_group_array(value) FROM "
+            "(SELECT value FROM json_each({0}) WHERE value IS NOT {1} ORDER BY key)) END"
+        )
+
         def __init__(self, field: str, value: Any) -> None:
             super().__init__("ARRAY_REMOVE", field, value)
 
-    class ArrayReplace(Function):
+    class ArrayReplace(ArrayFunction):
+        sqlite = (
+            "CASE WHEN {0} IS NULL THEN NULL ELSE (SELECT json_group_array(CASE WHEN value IS {1} THEN {2} "
+            "ELSE value END) FROM (SELECT value FROM json_each({0}) ORDER BY key)) END"
+        )
+
         def __init__(self, field: str, value: Any, newvalue: Any) -> None:
             super().__init__("ARRAY_REPLACE", field, value, newvalue)
 
-    class ArrayConcatenate(Function):
+    class ArrayConcatenate(ArrayFunction):
+        sqlite = (
+            "(SELECT json_group_array(value) FROM (SELECT 0 AS part, key, value FROM json_each(COALESCE({0},'[]')) "
+            "UNION ALL SELECT 1, key, value FROM json_each({1}) ORDER BY part, key))"
+        )
+
         def __init__(self, field: str, array: Any) -> None:
             super().__init__("ARRAY_CAT", field, array)
 
-    class ArrayPrepend(Function):
+    class ArrayPrepend(ArrayFunction):
+        sqlite = (
+            "(SELECT json_group_array(value) FROM (SELECT -1 AS key, {0} AS value "
+            "UNION ALL SELECT key, value FROM json_each(COALESCE({1},'[]')) ORDER BY key))"
+        )
+
         def __init__(self, field: str, value: Any) -> None:
             super().__init__("ARRAY_PREPEND", value, field)
 
@@ -223,7 +361,7 @@ class BaseModel(Model):
         abstract = True
 
 
-# @cached_model(key="discord_id")
+@cached_model(key="discord_id", namespace="guild")
 class Guild(BaseModel):
     # Core Components Of The Model
     discord_id = fields.BigIntField(pk=True)
@@ -235,6 +373,7 @@ class Guild(BaseModel):
     automod_log = fields.BigIntField(default=0)
     message_log = fields.BigIntField(default=0)
     mod_log = fields.BigIntField(default=0)
+    is_message_store = fields.BooleanField(default=False)  # Messages kept on disk for the message log
     suggestions = fields.BigIntField(default=0)
 
     changelog_enabled = fields.BooleanField(default=False)
@@ -252,8 +391,7 @@ class Guild(BaseModel):
 
     @classmethod
     async def from_id(cls, guild_id):
-        # TODO: Implement caching in here or override get method
-        return (await cls.get_or_create(discord_id=guild_id))[0]
+        return (await cls.c_get_or_create_by_discord_id(guild_id))[0]
 
     @classmethod
     async def from_guild_object(cls, guild: GuildModel):
@@ -267,7 +405,14 @@ class Guild(BaseModel):
     async def fetch_to_dict(self):
         d = {}
         objs = await Guild.all().values(
-            "discord_id", "is_bot_blacklisted", "is_automod", "automod_log", "message_log", "mod_log", "is_logging"
+            "discord_id",
+            "is_bot_blacklisted",
+            "is_automod",
+            "automod_log",
+            "message_log",
+            "mod_log",
+            "is_logging",
+            "is_message_store",
         )
         for obj in objs:
             d[obj["discord_id"]] = obj
@@ -283,6 +428,21 @@ class GuildEvent(BaseModel):
     timestamp = fields.DatetimeField(auto_now_add=True)
     guild = fields.ForeignKeyField("B0F.Guild", related_name="GuildEvent")
 
+    class Meta:
+        indexes = (("guild_id", "timestamp"),)
+
+    @classmethod
+    def history(
+        cls, guild_id: int, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> QuerySet["GuildEvent"]:
+        """Events of a guild, newest first, optionally bounded by timestamp (which prunes the monthly partitions)."""
+        query = cls.filter(guild_id=guild_id)
+        if since is not None:
+            query = query.filter(timestamp__gte=since)
+        if until is not None:
+            query = query.filter(timestamp__lt=until)
+        return query.order_by("-timestamp")
+
 
 class Roles(BaseModel):
     id = fields.BigIntField(pk=True)
@@ -292,6 +452,16 @@ class Roles(BaseModel):
     comment = fields.TextField(default=None, unique=False, null=True)
     guild = fields.ForeignKeyField("B0F.Guild", related_name="Roles")
 
+    class Meta:
+        indexes = (("guild_id", "role_id"),)
+
+    @classmethod
+    def for_guild(cls, guild_id: int, role_id: Optional[int] = None) -> QuerySet["Roles"]:
+        """Configured roles of a guild, or the entries of one role."""
+        if role_id is None:
+            return cls.filter(guild_id=guild_id)
+        return cls.filter(guild_id=guild_id, role_id=role_id)
+
 
 class Invite(BaseModel):
     id = fields.BigIntField(pk=True)
@@ -304,6 +474,53 @@ class Invite(BaseModel):
     enabled = fields.BooleanField(default=True)
     guild = fields.ForeignKeyField("B0F.Guild", related_name="Invites")
 
+    class Meta:
+        indexes = (("guild_id", "inviter_id"),)
+
+    @classmethod
+    def for_inviter(cls, guild_id: int, inviter_id: int) -> QuerySetSingle[Optional["Invite"]]:
+        """The invite counters of a member in a guild."""
+        return cls.get_or_none(guild_id=guild_id, inviter_id=inviter_id)
+
+    @classmethod
+    async def add_invites(cls, guild_id: int, invites: Dict[int, int]) -> None:
+        """
+        Add `invites[inviter_id]` to the invite totals of members of a guild.
+
+        Existing counters are all updated by a single UPDATE, the missing ones are bulk created.
+        """
+        if not invites:
+            return
+
+        existing = set(
+            await cls.filter(guild_id=guild_id, inviter_id__in=list(invites)).values_list("inviter_id", flat=True)
+        )
+        missing = [
+            cls(guild_id=guild_id, inviter_id=inviter_id, invite_count_total=count)
+            for inviter_id, count in invites.items()
+            if inviter_id not in existing
+        ]
+        if missing:
+            await cls.bulk_create(missing)
+
+        if existing:
+            db = cls._meta.db
+            params: List[int] = []
+
+            def param(value: int) -> str:
+                params.append(value)
+                return f"${len(params)}" if db.capabilities.dialect == "postgres" else "?"
+
+            # Placeholders are numbered in the order of the statement
+            cases = " ".join(f"WHEN {param(i)} THEN CAST({param(invites[i])} AS INTEGER)" for i in existing)
+            guild = param(guild_id)
+            inviters = ", ".join(param(i) for i in existing)
+            await db.execute_query(
+                f'UPDATE "{cls._meta.db_table}" SET "invite_count_total" = "invite_count_total" + '
+                f'CASE "inviter_id" {cases} ELSE 0 END WHERE "guild_id" = {guild} AND "inviter_id" IN ({inviters})',
+                params,
+            )
+
 
 class AFKModel(BaseModel):
     id = fields.BigIntField(pk=True)
@@ -314,6 +531,14 @@ class AFKModel(BaseModel):
     message = fields.TextField(default=None, null=True)
     guild = fields.ForeignKeyField("B0F.Guild", related_name="AFK")
 
+    class Meta:
+        indexes = (("guild_id", "afk_user_id"),)
+
+    @classmethod
+    def for_user(cls, guild_id: int, user_id: int) -> QuerySet["AFKModel"]:
+        """The active AFK entry of a member in a guild."""
+        return cls.filter(guild_id=guild_id, afk_user_id=user_id, enabled=True)
+
 
 class Warns(BaseModel):
     id = fields.BigIntField(pk=True)
@@ -322,7 +547,42 @@ class Warns(BaseModel):
     mod_id = fields.BigIntField()
     guild = fields.ForeignKeyField("B0F.Guild", related_name="Warns")
     reason = fields.TextField(null=True)
-    created_at = fields.DatetimeField(null=True, auto_now_add=True)
+    # Not null since the table is partitioned on it, migration 2 backfills the old rows
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = (("guild_id", "target_id"),)
+
+    @classmethod
+    def for_member(cls, guild_id: int, target_id: int, since: Optional[datetime] = None) -> QuerySet["Warns"]:
+        """Warns of a member in a guild, newest first. Bounding by `since` skips the older monthly partitions."""
+        query = cls.filter(guild_id=guild_id, target_id=target_id)
+        if since is not None:
+            query = query.filter(created_at__gte=since)
+        return query.order_by("-id")
+
+
+class Timer(BaseModel):
+    """A persisted timed action, run by the scheduler of `bot.utils.timers` once `expires_at` is reached."""
+
+    id = fields.BigIntField(pk=True)
+    action = fields.CharField(max_length=32)
+    target_id = fields.BigIntField()
+    data = fields.JSONField(null=True)
+    expires_at = fields.DatetimeField(index=True)
+    attempts = fields.IntField(default=0)
+    created_at = fields.DatetimeField(auto_now_add=True)
+    guild = fields.ForeignKeyField("B0F.Guild", related_name="Timers")
+
+    @classmethod
+    def pending(cls, guild_id: int, action: Optional[str] = None, target_id: Optional[int] = None) -> QuerySet["Timer"]:
+        """Timers of a guild, optionally of one action and target, soonest first."""
+        query = cls.filter(guild_id=guild_id)
+        if action is not None:
+            query = query.filter(action=action)
+        if target_id is not None:
+            query = query.filter(target_id=target_id)
+        return query.order_by("expires_at")
 
 
 class Users(BaseModel):
@@ -360,6 +620,52 @@ class Tags(BaseModel):
     content = fields.TextField()
     uses = fields.BigIntField()
 
+    class Meta:
+        indexes = (("guild_id", "name"),)
+
+    @classmethod
+    def get_by_name(cls, guild_id: int, name: str) -> QuerySetSingle[Optional["Tags"]]:
+        """A guild's tag by its exact name."""
+        return cls.get_or_none(guild_id=guild_id, name=name)
+
+    @classmethod
+    async def names(cls, guild_id: int) -> List[tuple]:
+        """(tag_id, name) of every tag of a guild."""
+        return await cls.filter(guild_id=guild_id).values_list("tag_id", "name")
+
+    @classmethod
+    async def add_uses(cls, uses: Dict[int, int]) -> None:
+        """
+        Add `uses[tag_id]` to the use count of every tag, with one UPDATE per distinct increment.
+
+        The UPDATEs run in one transaction, so uses put back after a failure aren't counted twice.
+        """
+        by_increment: Dict[int, List[int]] = {}
+        for tag_id, increment in uses.items():
+            by_increment.setdefault(increment, []).append(tag_id)
+
+        async with in_transaction(routing.PRIMARY) as connection:
+            for increment, tag_ids in by_increment.items():
+                await cls.filter(tag_id__in=tag_ids).using_db(connection).update(uses=F("uses") + increment)
+
+    @classmethod
+    async def similar(cls, guild_id: int, name: str, limit: int = 3) -> List[str]:
+        """
+        Names of a guild's tags similar to `name`, by the `pg_trgm` GIN index on lower(name).
+
+        Only Postgres has the index, other databases return no suggestions.
+        """
+        db = cls._meta.db
+        if db.capabilities.dialect != "postgres":
+            return []
+
+        _, rows = await db.execute_query(
+            'SELECT "name" FROM "tags" WHERE "guild_id" = $1 AND lower("name") % lower($2) '
+            'ORDER BY similarity(lower("name"), lower($2)) DESC LIMIT $3',
+            [guild_id, name, limit],
+        )
+        return [row["name"] for row in rows]
+
     def __str__(self):
         return self.content
 
@@ -0,0 +1,180 @@
+"""
+Monthly partitions and retention of the append-only `GuildEvent` and `Warns` tables.
+
+On Postgres both tables are range partitioned by month (migration 2). Every day the bot creates
+the partitions of the next `Database.partition_months_ahead` months, and drops the partitions
+that ended before the retention window, which is a metadata change and not a DELETE scan.
+Other backends, or a Postgres database that hasn't been migrated, get a plain DELETE instead.
+Retention is off (0 months) unless `Database.guild_event_retention_months` or
+`Database.warns_retention_months` are set.
+
+Rows dated past the partitions created so far land in the default partition. Creating the
+partition of their month moves them out of it, as Postgres refuses a partition whose rows are
+already in the default one.
+
+Queries bounded on the partition column (`GuildEvent.timestamp`, `Warns.created_at`) only read
+the matching partitions.
+"""
+
+import asyncio
+import re
+import typing as t
+from datetime import date, datetime
+from tortoise import connections
+from tortoise.timezone import get_use_tz, make_aware
+from tortoise.models import Model
+from bot import constants
+from bot.database.models import GuildEvent, Warns
+from bot.log import get_logger
+
+log = get_logger(__name__)
+
+# Model -> (partition column, retention in months, 0 keeps everything)
+PARTITIONED: t.Dict[t.Type[Model], t.Tuple[str, t.Callable[[], int]]] = {
+    GuildEvent: ("timestamp", lambda: constants.Database.guild_event_retention_months),
+    Warns: ("created_at", lambda: constants.Database.warns_retention_months),
+}
+
+MAINTENANCE_INTERVAL = 24 * 60 * 60
+
+_PARTITION_NAME = re.compile(r"_p(\d{4})(\d{2})$")
+
+_task: t.Optional[asyncio.Task] = None
+
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month `months` after the month of `month`."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def expired_partitions(names: t.Iterable[str], cutoff: date) -> t.List[str]:
+    """The monthly partitions in `names` whose whole range is before `cutoff`."""
+    expired = []
+    for name in names:
+        match = _PARTITION_NAME.search(name)
+        if match and add_months(date(int(match[1]), int(match[2]), 1), 1) <= cutoff:
+            expired.append(name)
+    return sorted(expired)
+
+
+async def is_partitioned(table: str) -> bool:
+    db = connections.get("default")
+    if db.capabilities.dialect != "postgres":
+        return False
+
+    _, rows = await db.execute_query(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = $1",
+        [table],
+    )
+    return bool(rows)
+
+
+async def list_partitions(table: str) -> t.List[str]:
+    _, rows = await connections.get("default").execute_query(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = $1",
+        [table],
+    )
+    return [row["relname"] for row in rows]
+
+
+def create_partition_sql(table: str, column: str, start: date, has_default: bool) -> str:
+    """The script creating the partition of the month of `start`, moving its rows out of the default partition."""
+    name = partition_name(table, start)
+    end = add_months(start, 1)
+    create = f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" FOR VALUES FROM (\'{start}\') TO (\'{end}\')'
+    if not has_default:
+        return create
+
+    default = f"{table}_default"
+    rows = f'"{column}" >= \'{start}\' AND "{column}" < \'{end}\''
+    return (
+        "BEGIN;"
+        f'ALTER TABLE "{table}" DETACH PARTITION "{default}";'
+        f"{create};"
+        f'WITH moved AS (DELETE FROM "{default}" WHERE {rows} RETURNING *) INSERT INTO "{table}" SELECT * FROM moved;'
+        f'ALTER TABLE "{table}" ATTACH PARTITION "{default}" DEFAULT;'
+        "COMMIT"
+    )
+
+
+async def create_future_partitions(
+    table: str, column: str, months_ahead: int, today: t.Optional[date] = None
+) -> int:
+    """Create the partitions from this month to `months_ahead` months ahead. Returns how many were missing."""
+    db = connections.get("default")
+    existing = set(await list_partitions(table))
+    has_default = f"{table}_default" in existing
+    month = (today or date.today()).replace(day=1)
+    created = 0
+
+    for offset in range(months_ahead + 1):
+        start = add_months(month, offset)
+        name = partition_name(table, start)
+        if name in existing:
+            continue
+
+        await db.execute_script(create_partition_sql(table, column, start, has_default))
+        created += 1
+        log.info(f"Created partition {name}")
+    return created
+
+
+async def drop_expired_partitions(table: str, retention_months: int, today: t.Optional[date] = None) -> int:
+    """Detach and drop the partitions older than the retention window. Returns how many were dropped."""
+    db = connections.get("default")
+    cutoff = add_months((today or date.today()).replace(day=1), -retention_months)
+
+    expired = expired_partitions(await list_partitions(table), cutoff)
+    for name in expired:
+        await db.execute_script(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"; DROP TABLE "{name}"')
+        log.info(f"Dropped expired partition {name}")
+    return len(expired)
+
+
+async def delete_expired_rows(model: t.Type[Model], column: str, retention_months: int) -> int:
+    """Retention for unpartitioned tables."""
+    cutoff = add_months(date.today().replace(day=1), -retention_months)
+    cutoff = datetime(cutoff.year, cutoff.month, 1)
+    if get_use_tz():
+        cutoff = make_aware(cutoff, "UTC")
+    return await model.filter(**{f"{column}__lt": cutoff}).delete()
+
+
+async def maintain_partitions() -> None:
+    """Create the upcoming partitions and apply the retention of every partitioned model."""
+    for model, (column, retention) in PARTITIONED.items():
+        table = model._meta.db_table
+        retention_months = retention()
+
+        if await is_partitioned(table):
+            await create_future_partitions(table, column, constants.Database.partition_months_ahead)
+            if retention_months:
+                await drop_expired_partitions(table, retention_months)
+        elif retention_months:
+            deleted = await delete_expired_rows(model, column, retention_months)
+            if deleted:
+                log.info(f"Deleted {deleted} expired {table} rows")
+
+
+async def run_maintenance() -> None:
+    while True:
+        try:
+            await maintain_partitions()
+        except Exception:
+            log.warning("Partition maintenance failed", exc_info=True)
+        await asyncio.sleep(MAINTENANCE_INTERVAL)
+
+
+def start_partition_maintenance() -> None:
+    """Start the daily maintenance task, if it isn't running yet."""
+    global _task
+
+    if _task is None or _task.done():
+        _task = asyncio.create_task(run_maintenance(), name="partition-maintenance")
@@ -0,0 +1,141 @@
+"""
+Tortoise engine for Postgres: the asyncpg backend with a tunable, metered connection pool.
+
+`connection_config()` turns a database URI into a Tortoise connection dict. Postgres URIs
+get this engine and the pool settings of `constants.Database`, overridden by the
+`DATABASE_POOL` mapping of config.yaml. Other URIs are passed through unchanged.
+
+The `metrics` of each pool count how long commands wait for a pooled connection, how many are in
+use and how many acquires timed out, to tell pool starvation apart from slow queries.
+"""
+
+import asyncio
+import time
+import typing as t
+import asyncpg
+from tortoise import connections
+from tortoise.backends.asyncpg.client import AsyncpgDBClient
+
+# Re-exported so query instrumentation finds the transaction class next to the client class
+from tortoise.backends.asyncpg.client import TransactionWrapper  # noqa: F401
+from tortoise.backends.base.config_generator import expand_db_url
+from bot import constants
+
+POSTGRES_SCHEMES = ("postgres", "asyncpg")
+
+
+class PoolMetrics:
+    """Acquire wait times and connection usage of a pool."""
+
+    __slots__ = ("acquires", "timeouts", "in_use", "peak_in_use", "wait_total", "wait_max")
+
+    def __init__(self) -> None:
+        self.acquires = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def wait_avg(self) -> float:
+        return self.wait_total / self.acquires if self.acquires else 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.acquires += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+
+class MeteredPool(asyncpg.Pool):
+    """An asyncpg pool that times every acquire and applies a default acquire timeout."""
+
+    def __init__(self, *args, acquire_timeout: t.Optional[float] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.acquire_timeout = acquire_timeout
+        self.metrics = PoolMetrics()
+
+    async def _acquire(self, timeout: t.Optional[float]) -> t.Any:
+        # Both `await pool.acquire()` and `async with pool.acquire()` go through here
+        metrics = self.metrics
+        start = time.perf_counter()
+        try:
+            connection = await super()._acquire(timeout if timeout is not None else self.acquire_timeout)
+        except asyncio.TimeoutError:
+            metrics.timeouts += 1
+            raise
+        finally:
+            metrics.record_wait(time.perf_counter() - start)
+
+        metrics.in_use += 1
+        metrics.peak_in_use = max(metrics.peak_in_use, metrics.in_use)
+        return connection
+
+    async def release(self, connection: t.Any, *, timeout: t.Optional[float] = None) -> None:
+        try:
+            await super().release(connection, timeout=timeout)
+        finally:
+            self.metrics.in_use -= 1
+
+
+class MeteredAsyncpgClient(AsyncpgDBClient):
+    """Tortoise asyncpg client creating a `MeteredPool`."""
+
+    async def create_pool(self, **kwargs) -> asyncpg.Pool:
+        acquire_timeout = kwargs.pop("acquire_timeout", None)
+        options = {
+            "max_queries": 50_000,
+            "max_inactive_connection_lifetime": 300.0,
+            "setup": None,
+            "init": None,
+            "record_class": asyncpg.Record,
+            **kwargs,
+        }
+        return await MeteredPool(None, acquire_timeout=acquire_timeout, **options)
+
+
+client_class = MeteredAsyncpgClient
+
+
+def pool_settings(overrides: t.Optional[dict] = None) -> dict:
+    """Pool credentials from `constants.Database`, with `overrides` (config.yaml keys) on top."""
+    settings = {
+        "minsize": constants.Database.pool_min_size,
+        "maxsize": constants.Database.pool_max_size,
+        "max_queries": constants.Database.pool_max_queries,
+        "max_inactive_connection_lifetime": constants.Database.pool_max_inactive_lifetime,
+        "statement_cache_size": constants.Database.statement_cache_size,
+        "command_timeout": constants.Database.command_timeout,
+        "acquire_timeout": constants.Database.pool_acquire_timeout,
+    }
+    for key, value in (overrides or {}).items():
+        key = key.lower()
+        settings[{"min_size": "minsize", "max_size": "maxsize"}.get(key, key)] = value
+    return settings
+
+
+def connection_config(uri: str, pool_overrides: t.Optional[dict] = None) -> t.Union[str, dict]:
+    """The Tortoise connection of `uri`, using this engine and the pool settings for Postgres."""
+    if uri.split("://", 1)[0] not in POSTGRES_SCHEMES:
+        return uri
+
+    config = expand_db_url(uri)
+    config["engine"] = __name__
+    config["credentials"].update(pool_settings(pool_overrides))
+    return config
+
+
+def pool_status() -> t.Dict[str, t.Dict[str, t.Any]]:
+    """Size, idle and in-use connections and the metrics of each live pool, by connection name."""
+    status = {}
+    for connection in connections.all():
+        pool = getattr(connection, "_pool", None)
+        if isinstance(pool, MeteredPool):
+            status[connection.connection_name] = {
+                "size": pool.get_size(),
+                "idle": pool.get_idle_size(),
+                "max": pool.get_max_size(),
+                "in_use": pool.metrics.in_use,
+                "metrics": pool.metrics,
+            }
+    return status
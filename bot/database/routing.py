@@ -0,0 +1,127 @@
+"""
+Read-replica routing for the Tortoise models.
+
+When a `replica` connection is configured (`DATABASE_REPLICA_URI` in config.yaml), `ReplicaRouter`
+sends reads to it and writes to the primary `default` connection. A task that has just
+written keeps reading from the primary for `Database.replica_pin_seconds`, so it sees its own
+writes. Reads also fall back to the primary while the replica lags more than
+`Database.replica_max_lag` seconds, or when the lag can't be measured.
+"""
+
+import asyncio
+import time
+import typing as t
+from contextlib import contextmanager
+from contextvars import ContextVar
+from tortoise import connections
+from tortoise.backends.base.client import BaseTransactionWrapper
+from bot import constants
+from bot.log import get_logger
+
+log = get_logger(__name__)
+
+PRIMARY = "default"
+REPLICA = "replica"
+
+# Monotonic time until which the current task reads from the primary
+_pinned_until: ContextVar[float] = ContextVar("pinned_until", default=0.0)
+
+# Last measured replication lag in seconds, None when unknown
+replica_lag: t.Optional[float] = None
+
+stats = {"replica_reads": 0, "primary_reads": 0, "writes": 0}
+
+_monitor: t.Optional[asyncio.Task] = None
+
+
+def replica_configured() -> bool:
+    return REPLICA in connections.db_config
+
+
+def replica_usable() -> bool:
+    """Whether the replica is configured and close enough behind the primary."""
+    return replica_configured() and replica_lag is not None and replica_lag <= constants.Database.replica_max_lag
+
+
+def pin_to_primary(seconds: t.Optional[float] = None) -> None:
+    """Read from the primary in the current task for `seconds` (by default `replica_pin_seconds`)."""
+    if seconds is None:
+        seconds = constants.Database.replica_pin_seconds
+    _pinned_until.set(max(_pinned_until.get(), time.monotonic() + seconds))
+
+
+@contextmanager
+def read_from_primary() -> t.Iterator[None]:
+    """Route every read in the block to the primary."""
+    token = _pinned_until.set(float("inf"))
+    try:
+        yield
+    finally:
+        _pinned_until.reset(token)
+
+
+def _in_transaction() -> bool:
+    # Reads inside a transaction must use the transaction's own connection
+    return isinstance(connections.get(PRIMARY), BaseTransactionWrapper)
+
+
+class ReplicaRouter:
+    """Tortoise router sending reads to the replica and writes to the primary."""
+
+    def db_for_read(self, model: type) -> str:
+        if _pinned_until.get() > time.monotonic() or not replica_usable() or _in_transaction():
+            stats["primary_reads"] += 1
+            return PRIMARY
+
+        stats["replica_reads"] += 1
+        return REPLICA
+
+    def db_for_write(self, model: type) -> str:
+        stats["writes"] += 1
+        pin_to_primary()
+        return PRIMARY
+
+
+async def measure_lag() -> t.Optional[float]:
+    """Seconds the replica is behind the primary. SQLite stand-ins don't replicate, so they report 0."""
+    replica = connections.get(REPLICA)
+    if replica.capabilities.dialect != "postgres":
+        return 0.0
+
+    # Without pending WAL to replay the replica is up to date, however old its last replayed commit is
+    _, rows = await replica.execute_query(
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END AS lag"
+    )
+    lag = rows[0]["lag"]
+    return 0.0 if lag is None else float(lag)
+
+
+async def monitor_lag() -> None:
+    """Refresh `replica_lag` every `replica_lag_interval` seconds. Failures make the replica unusable."""
+    global replica_lag
+
+    while True:
+        try:
+            replica_lag = await asyncio.wait_for(measure_lag(), timeout=constants.Database.replica_lag_interval)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if replica_lag is not None:
+                log.warning("Could not measure the replica lag, reading from the primary.", exc_info=True)
+            replica_lag = None
+        else:
+            if replica_lag > constants.Database.replica_max_lag:
+                log.warning(f"Replica is {replica_lag:.1f}s behind, reading from the primary.")
+
+        await asyncio.sleep(constants.Database.replica_lag_interval)
+
+
+def start_lag_monitor() -> None:
+    """Start the lag monitor task, if a replica is configured and it isn't running yet."""
+    global _monitor
+
+    if not replica_configured() or (_monitor is not None and not _monitor.done()):
+        return
+
+    _monitor = asyncio.create_task(monitor_lag(), name="replica-lag-monitor")
@@ -1,6 +1,7 @@
 from typing import Any
 import os
 import yaml
+from bot.database.pool import connection_config
 
 ROOT_DIR = os.path.abspath(os.curdir)
 
@@ -10,7 +11,7 @@ with open(CONFIG_PATH) as f:
     config = yaml.load(f, yaml.Loader)
 
 TORTOISE_CONFIG: dict[str, Any] = {
-    "connections": {"default": config["DATABASE_URI"]},
+    "connections": {"default": connection_config(config["DATABASE_URI"], config.get("DATABASE_POOL"))},
     "apps": {
         config["TORTOISE_APP_NAME"]: {
             "models": [config["DATABASE_MODEL_PATH"], "aerich.models"],
@@ -20,9 +21,16 @@ TORTOISE_CONFIG: dict[str, Any] = {
     "use_tz": config["DATABASE_USE_TZ"],
 }
 
+# Reads go to the replica when one is configured, see bot/database/routing.py
+if config.get("DATABASE_REPLICA_URI"):
+    TORTOISE_CONFIG["connections"]["replica"] = connection_config(
+        config["DATABASE_REPLICA_URI"], config.get("DATABASE_POOL")
+    )
+    TORTOISE_CONFIG["routers"] = ["bot.database.routing.ReplicaRouter"]
+
 
 DBTEST_CONFIG: dict[str, Any] = {
-    "connections": {"default": config["DATABASE_URI_TEST"]},
+    "connections": {"default": connection_config(config["DATABASE_URI_TEST"], config.get("DATABASE_POOL"))},
     "apps": {
         config["TORTOISE_APP_NAME"]: {
             "models": [config["DATABASE_MODELS_TEST"], "aerich.models"],
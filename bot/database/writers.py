@@ -0,0 +1,177 @@
+"""
+Batched, append-only writers for high-volume audit tables.
+
+A `BatchedWriter` buffers rows in a bounded queue and writes them in one statement per batch,
+as soon as `batch_size` rows are waiting or `flush_interval` seconds after the first one.
+On Postgres a batch is a single `COPY` (asyncpg `copy_records_to_table`), elsewhere an
+`executemany` INSERT. A batch that fails, say on a row of a deleted guild, is written again row
+by row, and the rows that still fail are logged with their values. When the queue is full `put()`
+waits, so a raid slows its producers down instead of growing memory. `close()` drains what is left,
+the batch being gathered included, and runs when the bot shuts down. Rows put after that are
+logged and dropped, until the writer is started again.
+"""
+
+import asyncio
+import time
+import typing as t
+from datetime import datetime
+from tortoise import connections, timezone
+from tortoise.models import Model
+from bot import constants
+from bot.database import instrumentation
+from bot.database.models import GuildEvent
+from bot.log import get_logger
+
+log = get_logger(__name__)
+
+
+class BatchedWriter:
+    """Buffer rows of `model` and insert them in batches."""
+
+    def __init__(
+        self,
+        model: t.Type[Model],
+        columns: t.Sequence[str],
+        *,
+        batch_size: int,
+        flush_interval: float,
+        max_pending: int,
+    ) -> None:
+        self.model = model
+        self.columns = tuple(columns)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.failed = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._task: t.Optional[asyncio.Task] = None
+        self._inflight: t.Optional[asyncio.Future] = None
+        # Rows taken off the queue by the task, until their batch is flushed
+        self._batch: t.List[tuple] = []
+        self._fields: t.Optional[list] = None
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def put(self, *row: t.Any) -> None:
+        """Queue a row, given in `columns` order. Waits while the queue is full."""
+        if self._closed:
+            self.failed += 1
+            log.warning(f"Dropped the {self.model.__name__} row {row!r}, its writer is closed")
+            return
+
+        if self._fields is None:
+            # Columns are db column names, converted like the ORM would convert the matching fields.
+            # Foreign key columns are only known once Tortoise is initialised, so not on import
+            db_fields = {column: name for name, column in self.model._meta.fields_db_projection.items()}
+            self._fields = [self.model._meta.fields_map[db_fields[column]] for column in self.columns]
+        await self._queue.put(tuple(field.to_db_value(value, None) for field, value in zip(self._fields, row)))
+
+    def start(self) -> None:
+        self._closed = False
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"{self.model.__name__}-writer")
+
+    async def close(self) -> None:
+        """Stop the writer task and write every queued row."""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._inflight is not None:
+            await self._inflight
+            self._inflight = None
+
+        batch, self._batch = self._batch, []
+        await self._flush(batch)
+        while not self._queue.empty():
+            await self._flush(self._take(self.batch_size))
+
+    def _take(self, count: int) -> t.List[tuple]:
+        rows = []
+        while len(rows) < count and not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+        return rows
+
+    async def _run(self) -> None:
+        while True:
+            rows = self._batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+
+            while len(rows) < self.batch_size:
+                rows.extend(self._take(self.batch_size - len(rows)))
+                timeout = deadline - time.monotonic()
+                if len(rows) >= self.batch_size or timeout <= 0:
+                    break
+                try:
+                    rows.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Shielded so that close() never interrupts a batch half-way, it waits for it instead
+            self._batch = []
+            self._inflight = asyncio.ensure_future(self._flush(rows))
+            await asyncio.shield(self._inflight)
+            self._inflight = None
+
+    async def _flush(self, rows: t.List[tuple]) -> None:
+        if not rows:
+            return
+
+        try:
+            await self._write(rows)
+        except Exception:
+            if len(rows) == 1:
+                self.failed += 1
+                log.warning(f"Could not write the {self.model.__name__} row {rows[0]!r}", exc_info=True)
+                return
+
+            log.warning(
+                f"Could not write {len(rows)} {self.model.__name__} rows, writing them one by one", exc_info=True
+            )
+            for row in rows:
+                await self._flush([row])
+        else:
+            self.written += len(rows)
+
+    async def _write(self, rows: t.List[tuple]) -> None:
+        db = connections.get(self.model._meta.default_connection or "default")
+        table = self.model._meta.db_table
+        start = time.perf_counter()
+        if db.capabilities.dialect == "postgres":
+            async with db.acquire_connection() as connection:
+                await connection.copy_records_to_table(table, records=rows, columns=self.columns)
+            instrumentation.record(f'COPY "{table}"', (time.perf_counter() - start) * 1000, len(rows))
+        else:
+            columns = ", ".join(f'"{column}"' for column in self.columns)
+            placeholders = ", ".join("?" for _ in self.columns)
+            await db.execute_many(f'INSERT INTO "{table}" ({columns}) VALUES ({placeholders})', rows)
+
+
+class GuildEventWriter(BatchedWriter):
+    """Batched writer of the `GuildEvent` audit rows."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            GuildEvent,
+            ("guild_id", "description", "old", "new", "timestamp"),
+            batch_size=constants.Database.event_batch_size,
+            flush_interval=constants.Database.event_flush_interval,
+            max_pending=constants.Database.event_max_pending,
+        )
+
+    async def record(
+        self, guild_id: int, description: str, old: t.Any = "", new: t.Any = "", timestamp: datetime = None
+    ) -> None:
+        """Queue a guild event, timestamped now unless `timestamp` is given."""
+        await self.put(guild_id, description, str(old), str(new), timestamp or timezone.now())
+
+
+guild_events = GuildEventWriter()
@@ -8,6 +8,7 @@ import discord
 from sentry_sdk import push_scope
 from bot.Bronn import Bot
 from bot.constants import Colours, Icons, MODERATION_ROLES, Emojis
+from bot.utils.tags import tag_index
 
 # from utils.custommetacog import CustomCog as Cog
 
@@ -202,16 +203,10 @@ class ErrorHandler(Cog, command_attrs=dict(hidden=True), emoji=Emojis.pycord):
     async def try_get_tag(self, ctx: Context) -> None:
         """
         Attempt to display a tag by interpreting the command name as a tag name.
-        The invocation of tags get respects its checks. Any CommandErrors raised will be handled
+        The fallback respects the bot's global checks. Any CommandErrors raised will be handled
         by `on_command_error`, but the `invoked_from_error_handler` attribute will be added to
         the context to prevent infinite recursion in the case of a CommandNotFound exception.
         """
-        tags_cog = self.bot.get_cog("Tags")
-        if not tags_cog:
-            log.debug("Not attempting to parse message as a tag as could not find `Tags` cog.")
-            return
-        tags_get_command = tags_cog.get_command_ctx
-
         maybe_tag_name = ctx.invoked_with
         if not maybe_tag_name or not isinstance(ctx.author, Member):
             return
@@ -222,11 +217,18 @@ class ErrorHandler(Cog, command_attrs=dict(hidden=True), emoji=Emojis.pycord):
                 log.debug("Cancelling attempt to fall back to a tag due to failed checks.")
                 return
 
-            if await tags_get_command(ctx, maybe_tag_name):
+            # The tag index answers from memory, so neither a tag nor a mistyped command queries the tags table
+            used = await tag_index.use(ctx.guild.id, maybe_tag_name)
+            if used is not None:
+                tag, content = used
+                await ctx.send(
+                    embed=Embed(title=tag.name, description=content), allowed_mentions=discord.AllowedMentions.none()
+                )
                 return
 
             if not any(role.id in MODERATION_ROLES for role in ctx.author.roles):
-                await self.send_command_suggestion(ctx, maybe_tag_name)
+                if not await self.send_command_suggestion(ctx, maybe_tag_name):
+                    await self.send_tag_suggestion(ctx, maybe_tag_name)
         except Exception as err:
             log.debug("Error while attempting to invoke tag fallback.")
             if isinstance(err, errors.CommandError):
@@ -234,8 +236,8 @@ class ErrorHandler(Cog, command_attrs=dict(hidden=True), emoji=Emojis.pycord):
             else:
                 await self.on_command_error(ctx, errors.CommandInvokeError(err))
 
-    async def send_command_suggestion(self, ctx: Context, command_name: str) -> None:
-        """Sends user similar commands if any can be found."""
+    async def send_command_suggestion(self, ctx: Context, command_name: str) -> bool:
+        """Sends user similar commands if any can be found. Return whether a suggestion was sent."""
         # No similar tag found, or tag on cooldown -
         # searching for a similar command
         raw_commands = []
@@ -247,23 +249,36 @@ class ErrorHandler(Cog, command_attrs=dict(hidden=True), emoji=Emojis.pycord):
             similar_command = self.bot.get_command(similar_command_name)
 
             if not similar_command:
-                return
+                return False
 
             log_msg = "Cancelling attempt to suggest a command due to failed checks."
             try:
                 if not await similar_command.can_run(ctx):
                     log.debug(log_msg)
-                    return
+                    return False
             except errors.CommandError as cmd_error:
                 log.debug(log_msg)
                 await self.on_command_error(ctx, cmd_error)
-                return
+                return True
 
             misspelled_content = ctx.message.content
             e = Embed()
             e.set_author(name="Did you mean:", icon_url=Icons.questionmark)
             e.description = f"{misspelled_content.replace(command_name, similar_command_name, 1)}"
             await ctx.send(embed=e, delete_after=10.0)
+            return True
+        return False
+
+    async def send_tag_suggestion(self, ctx: Context, tag_name: str) -> None:
+        """Sends user the names of similar tags, if any."""
+        similar_tags = await tag_index.suggest(ctx.guild.id, tag_name)
+        if not similar_tags:
+            return
+
+        e = Embed()
+        e.set_author(name="Did you mean:", icon_url=Icons.questionmark)
+        e.description = "\n".join(f"{ctx.prefix}{name}" for name in similar_tags)
+        await ctx.send(embed=e, delete_after=10.0)
 
     async def handle_user_input_error(self, ctx: Context, e: errors.UserInputError) -> None:
         """
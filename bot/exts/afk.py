@@ -0,0 +1,82 @@
+from typing import Optional
+import discord
+from discord import AllowedMentions, Embed, Member, Message
+from discord.ext.commands import Cog, Context, command, guild_only
+from discord.utils import escape_markdown, format_dt
+from constants import Colours, Emojis
+from log import get_logger
+from Bronn import Bot
+from bot.utils.afk import AFKRecord, afk_index
+
+log = get_logger(__name__)
+
+AFK_PREFIX = "[AFK] "
+
+
+class AFK(Cog):
+    """Let members leave a note for whoever mentions them while they are away."""
+
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+
+    @guild_only()
+    @command(name="afk")
+    async def afk(self, ctx: Context, *, message: Optional[str] = None) -> None:
+        """Mark yourself as AFK until your next message, with an optional note for those who mention you."""
+        await afk_index.set(ctx.guild.id, ctx.author.id, message=message, nickname=ctx.author.nick)
+        await self._set_nickname(ctx.author, f"{AFK_PREFIX}{ctx.author.display_name}"[:32])
+        await ctx.reply(f"{Emojis.afk} You are now AFK.", allowed_mentions=AllowedMentions.none())
+
+    @Cog.listener()
+    async def on_message(self, message: Message) -> None:
+        """Welcome back AFK authors and tell who mentioned an AFK member that they are away."""
+        if message.guild is None or message.author.bot:
+            return
+
+        # Nobody is AFK in most guilds, which costs a single lookup
+        afk_members = self.bot.cache["afk"].get(message.guild.id)
+        if not afk_members:
+            return
+
+        setting_afk = False
+        if message.author.id in afk_members:
+            # The command runs alongside this listener, and its own message would clear the AFK it sets
+            ctx = await self.bot.get_context(message)
+            setting_afk = ctx.command is self.afk
+
+        back, mentioned = await afk_index.process(
+            message.guild.id, message.author.id, (user.id for user in message.mentions), setting_afk=setting_afk
+        )
+        if back is not None:
+            await self._welcome_back(message, back)
+
+        if mentioned:
+            lines = []
+            for record in mentioned:
+                note = f": {escape_markdown(record.message)}" if record.message else ""
+                lines.append(f"<@{record.user_id}> is AFK{note} ({format_dt(record.since, 'R')})")
+
+            embed = Embed(description="\n".join(lines), colour=Colours.blue)
+            await message.reply(embed=embed, allowed_mentions=AllowedMentions.none(), delete_after=30)
+
+    async def _welcome_back(self, message: Message, record: AFKRecord) -> None:
+        if isinstance(message.author, Member) and (message.author.nick or "").startswith(AFK_PREFIX):
+            await self._set_nickname(message.author, record.nickname)
+
+        await message.reply(
+            f"Welcome back, you were AFK since {format_dt(record.since, 'R')}.",
+            allowed_mentions=AllowedMentions.none(),
+            delete_after=10,
+        )
+
+    @staticmethod
+    async def _set_nickname(member: Member, nickname: Optional[str]) -> None:
+        try:
+            await member.edit(nick=nickname)
+        except discord.HTTPException:
+            log.debug(f"Could not change the nickname of {member} ({member.id})")
+
+
+def setup(bot: Bot) -> None:
+    """Load the AFK cog."""
+    bot.add_cog(AFK(bot))
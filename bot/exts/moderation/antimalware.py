@@ -1,10 +1,12 @@
 import typing as t
+from functools import partial
 from os.path import splitext
 from discord import Embed, Message, NotFound
 from discord.ext.commands import Cog
 from Bronn import Bot
 from log import get_logger
 import discord
+from bot.utils.send_queue import send_queues
 
 log = get_logger(__name__)
 
@@ -67,7 +69,8 @@ class AntiMalware(discord.Cog):
                 extra={"attachment_list": [attachment.filename for attachment in message.attachments]},
             )
 
-            await message.channel.send(f"Hey {message.author.mention}!", embed=embed)
+            notice = partial(message.channel.send, f"Hey {message.author.mention}!", embed=embed)
+            send_queues.enqueue(message.channel, notice)
 
             # Delete the offending message:
             try:
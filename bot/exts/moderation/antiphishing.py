@@ -6,6 +6,8 @@ from converters import is_scam_link, is_valid_url
 import constants
 from log import get_logger
 import typing as t
+from functools import partial
+from bot.utils.send_queue import send_queues
 
 log = get_logger(__name__)
 
@@ -35,7 +37,8 @@ class Antiphishing(discord.Cog):
         if await is_valid_url(link):
             if await is_scam_link(link):
                 await message.delete()
-                await message.channel.send(DELETION_MESSAGE.format(user=message.author.mention))
+                notice = DELETION_MESSAGE.format(user=message.author.mention)
+                send_queues.enqueue(message.channel, partial(message.channel.send, notice))
             else:
                 return
 
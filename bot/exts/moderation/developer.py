@@ -14,6 +14,12 @@ from discord.ext.commands import command, Cog
 from jishaku.codeblocks import codeblock_converter
 from jishaku.cog import Jishaku
 from jishaku.modules import ExtensionConverter
+from bot.database import instrumentation, pool, routing
+from bot.utils.cache import caches
+from bot.utils.log_dispatch import log_dispatcher
+from bot.utils.message_store import fetch_budget, message_archive, message_store
+from bot.utils.offload import loop_lag, offload
+from bot.utils.send_queue import send_queues
 
 
 log = get_logger(__name__)
@@ -127,6 +133,143 @@ class Developer(Cog, command_attrs={"hidden": True}):
             embed.add_field(name="Signature", value=full_command_signature, inline=False)
         await ctx.send(embed=embed)
 
+    @command(name="cachestats", aliases=["cache"])
+    @commands.is_owner()
+    async def cache_stats(self, ctx: commands.Context) -> None:
+        """Shows hit ratios and load latencies of every cache namespace."""
+        embed: Embed = discord.Embed(title="Cache Stats", color=constants.Colours.blue)
+        for namespace, cache in caches.items():
+            stats = cache.stats
+            embed.add_field(
+                name=namespace,
+                value=(
+                    f"**Hit ratio:** {stats.hit_ratio:.1%} of {stats.requests}\n"
+                    f"**Local/Redis hits:** {stats.local_hits}/{stats.remote_hits}\n"
+                    f"**Coalesced:** {stats.coalesced}\n"
+                    f"**Loads:** {stats.misses} (avg {stats.load_time_avg * 1000:.1f}ms, "
+                    f"max {stats.load_time_max * 1000:.1f}ms)\n"
+                    f"**Size:** {len(cache)}"
+                ),
+            )
+        embed.add_field(
+            name="messages",
+            value=(
+                f"**Hits (on disk)/misses:** {message_store.hits + message_store.archive_hits} "
+                f"({message_store.archive_hits})/{message_store.misses}\n"
+                f"**Fetched/over budget:** {fetch_budget.granted}/{fetch_budget.denied}\n"
+                f"**Archived/expired/evicted/dropped:** {message_archive.flushed}/{message_archive.expired}/"
+                f"{message_archive.evicted}/{message_archive.dropped}\n"
+                f"**Size:** {len(message_store)} ({message_archive.pending} waiting for disk)"
+            ),
+        )
+        await ctx.send(embed=embed)
+
+    @command(name="queries", aliases=["slowqueries"])
+    @commands.is_owner()
+    async def queries(self, ctx: commands.Context, count: int = 10, order: str = "total") -> None:
+        """Shows the query templates with the highest total (or mean, max, count) time."""
+        if order not in ("total", "mean", "max", "count"):
+            order = "total"
+
+        embed: Embed = discord.Embed(title=f"Top Queries by {order}", color=constants.Colours.blue)
+        for template, stats in instrumentation.top(min(count, 10), order):
+            embed.add_field(
+                name=f"{stats.count} runs, {stats.total:.0f}ms total",
+                value=(
+                    f"```sql\n{template[:300]}```"
+                    f"**p50/p95/p99:** {stats.percentile(0.5):.1f}/{stats.percentile(0.95):.1f}/"
+                    f"{stats.percentile(0.99):.1f}ms, **max:** {stats.max:.1f}ms\n"
+                    f"**Rows:** {stats.rows} ({stats.rows / max(stats.count, 1):.1f} avg), **errors:** {stats.errors}"
+                ),
+                inline=False,
+            )
+
+        if not embed.fields:
+            embed.description = "No queries recorded yet."
+        await ctx.send(embed=embed)
+
+    @command(name="dbpool", aliases=["pool"])
+    @commands.is_owner()
+    async def db_pool(self, ctx: commands.Context) -> None:
+        """Shows the database pool usage and how long queries wait for a connection."""
+        embed: Embed = discord.Embed(title="Database Pool", color=constants.Colours.blue)
+        status = pool.pool_status()
+        if not status:
+            embed.description = "Not running on a Postgres pool."
+        for name, connection in status.items():
+            metrics = connection["metrics"]
+            embed.add_field(
+                name=f"Connections ({name})",
+                value=(
+                    f"**In use:** {connection['in_use']} (peak {metrics.peak_in_use})\n"
+                    f"**Open/idle:** {connection['size']}/{connection['idle']} of {connection['max']}"
+                ),
+            )
+            embed.add_field(
+                name=f"Acquires ({name})",
+                value=(
+                    f"**Count:** {metrics.acquires}\n"
+                    f"**Wait:** avg {metrics.wait_avg * 1000:.1f}ms, max {metrics.wait_max * 1000:.1f}ms\n"
+                    f"**Timeouts:** {metrics.timeouts}"
+                ),
+            )
+        if routing.replica_configured():
+            lag = "unknown" if routing.replica_lag is None else f"{routing.replica_lag:.1f}s"
+            embed.add_field(
+                name="Replica",
+                value=(
+                    f"**Lag:** {lag}\n"
+                    f"**Reads replica/primary:** {routing.stats['replica_reads']}/{routing.stats['primary_reads']}\n"
+                    f"**Writes:** {routing.stats['writes']}"
+                ),
+                inline=False,
+            )
+        await ctx.send(embed=embed)
+
+    @command(name="sendqueues", aliases=["queues"])
+    @commands.is_owner()
+    async def queue_stats(self, ctx: commands.Context) -> None:
+        """Shows the depth, delays and drops of the send queues, and how well log entries are packed."""
+        metrics = send_queues.metrics
+        embed: Embed = discord.Embed(title="Send Queues", color=constants.Colours.blue)
+        embed.add_field(
+            name="Queues",
+            value=(
+                f"**Depth:** {metrics.depth} (peak {metrics.peak_depth})\n"
+                f"**Wait:** avg {metrics.wait_avg * 1000:.0f}ms, max {metrics.wait_max * 1000:.0f}ms\n"
+                f"**Sent/failed/dropped:** {metrics.sent}/{metrics.failed}/{metrics.dropped}"
+            ),
+        )
+        embed.add_field(
+            name="Logs",
+            value=f"**Entries/messages:** {log_dispatcher.entries}/{log_dispatcher.messages}",
+        )
+        await ctx.send(embed=embed)
+
+    @command(name="looplag", aliases=["lag"])
+    @commands.is_owner()
+    async def loop_lag(self, ctx: commands.Context, reset: bool = False) -> None:
+        """Shows how long the event loop was blocked, and how much work was offloaded from it."""
+        embed: Embed = discord.Embed(title="Event Loop", color=constants.Colours.blue)
+        embed.add_field(
+            name="Lag",
+            value=(
+                f"**Last:** {loop_lag.last * 1000:.1f}ms\n"
+                f"**Avg/max:** {loop_lag.avg * 1000:.1f}/{loop_lag.max * 1000:.1f}ms over {loop_lag.samples} samples"
+            ),
+        )
+        offload_avg = offload.offload_time / offload.offloaded if offload.offloaded else 0.0
+        embed.add_field(
+            name=f"Offload ({offload.mode}s)",
+            value=(
+                f"**Inline/offloaded:** {offload.inline}/{offload.offloaded}\n"
+                f"**Offloaded avg:** {offload_avg * 1000:.1f}ms"
+            ),
+        )
+        if reset:
+            loop_lag.reset()
+        await ctx.send(embed=embed)
+
     @command()
     async def shutdown(self, ctx):
         await ctx.send("Shutting down.")
@@ -0,0 +1,81 @@
+import typing as t
+import discord
+from discord import Guild, Invite, Member
+from discord.ext.commands import Cog, Context, command, guild_only
+from constants import Colours
+from log import get_logger
+from Bronn import Bot
+from bot.database.models import Invite as InviteCounters
+from bot.utils.invites import invite_tracker
+
+log = get_logger(__name__)
+
+
+class InviteTracking(Cog):
+    """Count the members each member invited, from the invite uses before and after joins."""
+
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+
+    async def _take_snapshot(self, guild: Guild) -> None:
+        if guild.me is not None and guild.me.guild_permissions.manage_guild:
+            await invite_tracker.refresh(guild)
+
+    @Cog.listener()
+    async def on_ready(self) -> None:
+        """Take the invite snapshot of every guild the bot can see the invites of."""
+        for guild in self.bot.guilds:
+            if guild.id not in invite_tracker.snapshots:
+                await self._take_snapshot(guild)
+        log.info(f"Took the invite snapshots of {len(invite_tracker.snapshots)} guilds")
+
+    @Cog.listener()
+    async def on_guild_join(self, guild: Guild) -> None:
+        await self._take_snapshot(guild)
+
+    @Cog.listener()
+    async def on_invite_create(self, invite: Invite) -> None:
+        invite_tracker.invite_created(invite)
+
+    @Cog.listener()
+    async def on_invite_delete(self, invite: Invite) -> None:
+        invite_tracker.invite_deleted(invite)
+
+    @Cog.listener()
+    async def on_member_join(self, member: Member) -> None:
+        """Attribute the join to an inviter, once the invites of the guild have been compared."""
+        if member.bot or member.guild.id not in invite_tracker.snapshots:
+            return
+
+        try:
+            inviter_id = await invite_tracker.member_joined(member)
+        except discord.HTTPException:
+            log.debug(f"Could not attribute the join of {member} ({member.id})", exc_info=True)
+            return
+
+        if inviter_id is not None:
+            log.debug(f"{member} ({member.id}) joined {member.guild.id} invited by {inviter_id}")
+
+    @guild_only()
+    @command(
+        name="invites",
+        description="Show how many members a member invited",
+        extras={"Examples": "invites\ninvites @member"},
+    )
+    async def invites(self, ctx: Context, member: t.Optional[Member] = None) -> None:
+        member = member or ctx.author
+        counters = await InviteCounters.for_inviter(ctx.guild.id, member.id)
+
+        embed = discord.Embed(title=f"Invites of {member}", color=Colours.DEFAULT)
+        if counters is None:
+            embed.description = "No member joined through their invites yet."
+        else:
+            embed.add_field(name="Total", value=str(counters.invite_count_total))
+            embed.add_field(name="Left", value=str(counters.invite_count_left))
+            embed.add_field(name="Bonus", value=str(counters.invite_count_bonus))
+        await ctx.send(embed=embed)
+
+
+def setup(bot: Bot) -> None:
+    """Load the InviteTracking cog."""
+    bot.add_cog(InviteTracking(bot))
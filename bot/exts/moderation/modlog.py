@@ -1,17 +1,13 @@
-import asyncio
-import difflib
-import itertools
 import typing as t
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import converters
 import discord
 from dateutil.relativedelta import relativedelta
-from deepdiff import DeepDiff
 from discord import Colour, Message, Thread
 from discord.abc import GuildChannel
 from discord.ext.commands import Cog, Context, BucketType, Greedy, command  # Bot
 from discord.utils import escape_markdown, format_dt, snowflake_time
-from constants import Colours, Emojis, Event, Icons
+from constants import Colours, Emojis, Event, Icons, Logs, Messages
 from log import get_logger
 from Bronn import Bot
 from database.models import Guild, Roles
@@ -19,25 +15,35 @@ from discord import AuditLogAction, AuditLogEntry
 from discord.ext import commands
 from utils.views import SetLogs, SetLogsButton
 from converters import format_user
+from bot.database.models import GuildEvent, Warns
+from bot.database.writers import guild_events
+from bot.utils import deleted_messages
+from bot.utils.cache import ExpiringSet
+from bot.utils.deleted_messages import DeleteRuns, unignored
+from bot.utils.diffing import CHANNEL_DIFF, GUILD_DIFF, MEMBER_DIFF, ROLE_DIFF, word_diff
+from bot.utils.log_dispatch import log_dispatcher
+from bot.utils.message_store import fetch_budget, message_archive, message_store
+from bot.utils.offload import offload
+from bot.utils.paginator import LinePaginator
 
 log = get_logger(__name__)
 
 
 GUILD_CHANNEL = t.Union[discord.CategoryChannel, discord.TextChannel, discord.VoiceChannel]
 
-CHANNEL_CHANGES_UNSUPPORTED = ("permissions",)
-CHANNEL_CHANGES_SUPPRESSED = ("_overwrites", "position")
-ROLE_CHANGES_UNSUPPORTED = ("colour", "permissions")
-
 
 class ModLog(Cog, name="ModLog"):
     """Logging for server events and staff actions."""
 
     def __init__(self, bot: Bot):
         self.bot = bot
-        self._ignored = {event: [] for event in Event}
+        self._ignored = {event: ExpiringSet(Logs.dedupe_ttl) for event in Event}
+        self._delete_runs = DeleteRuns(
+            Logs.delete_run_window, Logs.delete_run_threshold, self.log_deleted_message, self.log_deleted_messages
+        )
 
-        self._cached_edits = []
+    def cog_unload(self) -> None:
+        self._delete_runs.close()
 
     async def send_log_message(
         self,
@@ -53,8 +59,14 @@ class ModLog(Cog, name="ModLog"):
         additional_embeds: t.Optional[t.List[discord.Embed]] = None,
         timestamp_override: t.Optional[datetime] = None,
         footer: t.Optional[str] = None,
-    ) -> Context:
-        """Generate log embed and send to logging channel."""
+        wait: bool = False,
+    ) -> t.Optional[Context]:
+        """
+        Generate log embed and queue it for the logging channel.
+
+        Returns right away, unless `wait` is set: then it returns the context of the sent message,
+        or None if it could not be sent.
+        """
         await self.bot.wait_until_guild_available()
         # Truncate string directly here to avoid removing newlines
         embed = discord.Embed(description=text[:4093] + "..." if len(text) > 4096 else text)
@@ -81,13 +93,15 @@ class ModLog(Cog, name="ModLog"):
         if content and len(content) > 2000:
             content = content[: 2000 - 3] + "..."
 
+        # Packed with the other entries logged to the channel within the coalescing window
         channel = self.bot.get_channel(channel_id)
-        log_message = await channel.send(content=content, embed=embed, files=files)
-
-        if additional_embeds:
-            for additional_embed in additional_embeds:
-                await channel.send(embed=additional_embed)
+        sent = log_dispatcher.send(channel, [embed, *(additional_embeds or ())], content=content, files=files)
+        if not wait:
+            return None
 
+        log_message = await sent
+        if log_message is None:
+            return None
         return await self.bot.get_context(log_message)  # Optionally return for use with antispam
 
     async def get_audit_log_entry(
@@ -194,6 +208,39 @@ class ModLog(Cog, name="ModLog"):
 
         await ctx.send(embed=embed)
 
+    @commands.has_permissions(manage_guild=True)
+    @commands.cooldown(1, 2, BucketType.user)
+    @command(
+        name="messagestore",
+        aliases=("msgstore",),
+        description="Keep the server's messages on disk, to log edits of older messages",
+        extras={"Examples": "messagestore on\nmessagestore off"},
+    )
+    async def message_store_toggle(self, ctx: commands.Context, toggle: bool):
+        guild = await Guild.from_context(ctx)
+
+        guild.is_message_store = toggle
+        await guild.save(update_fields=["is_message_store"])
+        self.bot.guilds_info_cache[f"{ctx.guild.id}"]["message_store"] = toggle
+        if toggle:
+            message_archive.start()
+        else:
+            message_archive.purge(ctx.guild.id)
+
+        embed = discord.Embed(
+            color=Colours.DEFAULT,
+            description=(
+                f"**Message Store Toggled To:** `{toggle}`\n"
+                + (
+                    f"Messages are kept for {Messages.archive_retention // 86400} days."
+                    if toggle
+                    else "The stored messages were deleted."
+                )
+            ),
+        )
+
+        await ctx.send(embed=embed)
+
     @commands.cooldown(1, 2, BucketType.user)
     @command(
         name="modlogs",
@@ -222,6 +269,46 @@ class ModLog(Cog, name="ModLog"):
 
         await ctx.send(embed=embed)
 
+    @commands.has_permissions(view_audit_log=True)
+    @commands.cooldown(1, 5, BucketType.guild)
+    @command(
+        name="events",
+        aliases=("serverevents",),
+        description="Show the server events logged in the last days, newest first",
+        extras={"Examples": "events\nevents 30"},
+    )
+    async def guild_events(self, ctx: commands.Context, days: int = 7):
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        # Bounded by timestamp, so only the monthly partitions since then are read
+        query = GuildEvent.history(ctx.guild.id, since=since)
+
+        async def lines() -> t.AsyncIterator[str]:
+            async for page in GuildEvent.iter_pages(query=query, order_by="timestamp", page_size=50):
+                for event in page:
+                    yield f"{format_dt(event.timestamp, 'f')} {escape_markdown(event.description)}"
+
+        embed = discord.Embed(title=f"Server events of the last {days} days", color=Colours.DEFAULT)
+        await LinePaginator.paginate_stream(lines(), ctx, embed, max_lines=10, empty=False)
+
+    @commands.has_permissions(moderate_members=True)
+    @commands.cooldown(1, 2, BucketType.user)
+    @command(
+        name="warns",
+        aliases=("warnings",),
+        description="Show the warns of a member, newest first, optionally of the last days only",
+        extras={"Examples": "warns @member\nwarns @member 30"},
+    )
+    async def member_warns(self, ctx: commands.Context, member: discord.Member, days: t.Optional[int] = None):
+        since = datetime.now(timezone.utc) - timedelta(days=days) if days is not None else None
+        warns = await Warns.for_member(ctx.guild.id, member.id, since=since)
+
+        lines = [
+            f"**{warn.warn_id}** {format_dt(warn.created_at, 'd')} by <@{warn.mod_id}>: {warn.reason or 'No reason'}"
+            for warn in warns
+        ]
+        embed = discord.Embed(title=f"Warns of {member}", color=Colours.DEFAULT)
+        await LinePaginator.paginate(lines, ctx, embed, max_lines=10, empty=False)
+
     # @commands.cooldown(1, 2, BucketType.user)
     # @logging.command(
     #     name="view",
@@ -311,6 +398,7 @@ class ModLog(Cog, name="ModLog"):
             else:
                 message = f"{channel.name} (`{channel.id}`)"
 
+        await guild_events.record(channel.guild.id, title, new=message)
         await self.send_log_message(Icons.hash_green, Colours.soft_green, title, message)
 
     @Cog.listener()
@@ -331,6 +419,7 @@ class ModLog(Cog, name="ModLog"):
         else:
             message = f"{channel.name} (`{channel.id}`)"
 
+        await guild_events.record(channel.guild.id, title, old=message)
         await self.send_log_message(
             Icons.hash_red,
             Colours.soft_red,
@@ -346,43 +435,22 @@ class ModLog(Cog, name="ModLog"):
             return
 
         if before.id in self._ignored[Event.guild_channel_update]:
-            self._ignored[Event.guild_channel_update].remove(before.id)
+            self._ignored[Event.guild_channel_update].discard(before.id)
             return
 
-        diff = DeepDiff(before, after)
         changes = []
-        done = []
-
-        diff_values = diff.get("values_changed", {})
-        diff_values.update(diff.get("type_changes", {}))
-
-        for key, value in diff_values.items():
-            if not key:  # Not sure why, but it happens
-                continue
-
-            key = key[5:]  # Remove "root." prefix
-
-            if "[" in key:
-                key = key.split("[", 1)[0]
-
-            if "." in key:
-                key = key.split(".", 1)[0]
-
-            if key in done or key in CHANNEL_CHANGES_SUPPRESSED:
-                continue
-
-            if key in CHANNEL_CHANGES_UNSUPPORTED:
-                changes.append(f"**{key.title()}** updated")
+        for change in CHANNEL_DIFF.diff(before, after):
+            if change.summary:
+                changes.append(f"**{change.label}** updated")
+                await guild_events.record(after.guild.id, f"Channel {after.id} {change.attr} updated")
             else:
-                new = value["new_value"]
-                old = value["old_value"]
+                old, new = change.old, change.new
+                await guild_events.record(after.guild.id, f"Channel {after.id} {change.attr} updated", old, new)
 
                 # Discord does not treat consecutive backticks ("``") as an empty inline code block, so the markdown
                 # formatting is broken when `new` and/or `old` are empty values. "None" is used for these cases so
                 # formatting is preserved.
-                changes.append(f"**{key.title()}:** `{old or 'None'}` **→** `{new or 'None'}`")
-
-            done.append(key)
+                changes.append(f"**{change.label}:** `{old or 'None'}` **→** `{new or 'None'}`")
 
         if not changes:
             return
@@ -411,6 +479,7 @@ class ModLog(Cog, name="ModLog"):
         if not self.bot.guilds_info_cache[f"{role.guild.id}"]:
             return
 
+        await guild_events.record(role.guild.id, "Role created", new=f"{role.name} ({role.id})")
         await self.send_log_message(
             Icons.crown_green,
             Colours.soft_green,
@@ -425,6 +494,7 @@ class ModLog(Cog, name="ModLog"):
         if not self.bot.guilds_info_cache[f"{role.guild.id}"]:
             return
 
+        await guild_events.record(role.guild.id, "Role removed", old=f"{role.name} ({role.id})")
         await self.send_log_message(
             Icons.crown_red,
             Colours.soft_red,
@@ -439,37 +509,16 @@ class ModLog(Cog, name="ModLog"):
         if not self.bot.guilds_info_cache[f"{before.guild.id}"]:
             return
 
-        diff = DeepDiff(before, after)
         changes = []
-        done = []
-
-        diff_values = diff.get("values_changed", {})
-        diff_values.update(diff.get("type_changes", {}))
-
-        for key, value in diff_values.items():
-            if not key:  # Not sure why, but it happens
-                continue
-
-            key = key[5:]  # Remove "root." prefix
-
-            if "[" in key:
-                key = key.split("[", 1)[0]
-
-            if "." in key:
-                key = key.split(".", 1)[0]
-
-            if key in done or key == "color":
-                continue
-
-            if key in ROLE_CHANGES_UNSUPPORTED:
-                changes.append(f"**{key.title()}** updated")
+        for change in ROLE_DIFF.diff(before, after):
+            if change.summary:
+                changes.append(f"**{change.label}** updated")
+                await guild_events.record(after.guild.id, f"Role {after.id} {change.attr} updated")
             else:
-                new = value["new_value"]
-                old = value["old_value"]
-
-                changes.append(f"**{key.title()}:** `{old}` **→** `{new}`")
-
-            done.append(key)
+                changes.append(f"**{change.label}:** `{change.old}` **→** `{change.new}`")
+                await guild_events.record(
+                    after.guild.id, f"Role {after.id} {change.attr} updated", change.old, change.new
+                )
 
         if not changes:
             return
@@ -492,37 +541,13 @@ class ModLog(Cog, name="ModLog"):
     @Cog.listener()
     async def on_guild_update(self, before: discord.Guild, after: discord.Guild) -> None:
         """Log guild update event to mod log."""
-        if not self.bot.guilds_info_cache[f"{before.guild.id}"]:
+        if not self.bot.guilds_info_cache[f"{before.id}"]:
             return
 
-        diff = DeepDiff(before, after)
         changes = []
-        done = []
-
-        diff_values = diff.get("values_changed", {})
-        diff_values.update(diff.get("type_changes", {}))
-
-        for key, value in diff_values.items():
-            if not key:  # Not sure why, but it happens
-                continue
-
-            key = key[5:]  # Remove "root." prefix
-
-            if "[" in key:
-                key = key.split("[", 1)[0]
-
-            if "." in key:
-                key = key.split(".", 1)[0]
-
-            if key in done:
-                continue
-
-            new = value["new_value"]
-            old = value["old_value"]
-
-            changes.append(f"**{key.title()}:** `{old}` **→** `{new}`")
-
-            done.append(key)
+        for change in GUILD_DIFF.diff(before, after):
+            changes.append(f"**{change.label}:** `{change.old}` **→** `{change.new}`")
+            await guild_events.record(after.id, f"Guild {change.attr} updated", change.old, change.new)
 
         if not changes:
             return
@@ -550,7 +575,7 @@ class ModLog(Cog, name="ModLog"):
             return
 
         if member.id in self._ignored[Event.member_ban]:
-            self._ignored[Event.member_ban].remove(member.id)
+            self._ignored[Event.member_ban].discard(member.id)
             return
 
         await self.send_log_message(
@@ -592,7 +617,7 @@ class ModLog(Cog, name="ModLog"):
             return
 
         if member.id in self._ignored[Event.member_remove]:
-            self._ignored[Event.member_remove].remove(member.id)
+            self._ignored[Event.member_remove].discard(member.id)
             return
 
         await self.send_log_message(
@@ -611,7 +636,7 @@ class ModLog(Cog, name="ModLog"):
             return
 
         if member.id in self._ignored[Event.member_unban]:
-            self._ignored[Event.member_unban].remove(member.id)
+            self._ignored[Event.member_unban].discard(member.id)
             return
 
         await self.send_log_message(
@@ -645,30 +670,13 @@ class ModLog(Cog, name="ModLog"):
             return
 
         if before.id in self._ignored[Event.member_update]:
-            self._ignored[Event.member_update].remove(before.id)
+            self._ignored[Event.member_update].discard(before.id)
             return
 
         changes = self.get_role_diff(before.roles, after.roles)
 
-        # The regex is a simple way to exclude all sequence and mapping types.
-        diff = DeepDiff(before, after, exclude_regex_paths=r".*\[.*")
-
-        # A type change seems to always take precedent over a value change. Furthermore, it will
-        # include the value change along with the type change anyway. Therefore, it's OK to
-        # "overwrite" values_changed; in practice there will never even be anything to overwrite.
-        diff_values = {**diff.get("values_changed", {}), **diff.get("type_changes", {})}
-
-        for attr, value in diff_values.items():
-            if not attr:  # Not sure why, but it happens.
-                continue
-
-            attr = attr[5:]  # Remove "root." prefix.
-            attr = attr.replace("_", " ").replace(".", " ").capitalize()
-
-            new = value.get("new_value")
-            old = value.get("old_value")
-
-            changes.append(f"**{attr}:** `{old}` **→** `{new}`")
+        for change in MEMBER_DIFF.diff(before, after):
+            changes.append(f"**{change.label}:** `{change.old}` **→** `{change.new}`")
 
         if not changes:
             return
@@ -689,6 +697,10 @@ class ModLog(Cog, name="ModLog"):
             channel_id=self.bot.guilds_info_cache[f"{before.guild.id}"]["mod_log"],
         )
 
+    def persists_messages(self, guild_id: int) -> bool:
+        """Return true if the guild opted in to keep its messages on disk."""
+        return bool(self.bot.guilds_info_cache.get(f"{guild_id}", {}).get("message_store"))
+
     def is_message_blacklisted(self, message: Message) -> bool:
         """Return true if the message is in a blacklisted thread or channel."""
         # Ignore bots or DMs
@@ -733,7 +745,7 @@ class ModLog(Cog, name="ModLog"):
             return
 
         if message.id in self._ignored[Event.message_delete]:
-            self._ignored[Event.message_delete].remove(message.id)
+            self._ignored[Event.message_delete].discard(message.id)
             return
 
         if channel.category:
@@ -776,17 +788,18 @@ class ModLog(Cog, name="ModLog"):
         """
         Log the message's details to message change log.
         This is called when a message absent from the cache is deleted.
-        Hence, the message contents aren't logged.
+        Hence, the message contents are only logged if the message store kept them.
         """
         await self.bot.wait_until_guild_available()
         if self.is_channel_ignored(event.channel_id):
             return
 
         if event.message_id in self._ignored[Event.message_delete]:
-            self._ignored[Event.message_delete].remove(event.message_id)
+            self._ignored[Event.message_delete].discard(event.message_id)
             return
 
         channel = self.bot.get_channel(event.channel_id)
+        stored = await message_store.get(event.message_id)
 
         if channel.category:
             response = (
@@ -794,7 +807,6 @@ class ModLog(Cog, name="ModLog"):
                 f"**Message ID:** `{event.message_id}`\n"
                 f"**Sent at:** {format_dt(snowflake_time(event.message_id))}\n"
                 "\n"
-                "This message was not cached, so the message content cannot be displayed."
             )
         else:
             response = (
@@ -802,9 +814,17 @@ class ModLog(Cog, name="ModLog"):
                 f"**Message ID:** `{event.message_id}`\n"
                 f"**Sent at:** {format_dt(snowflake_time(event.message_id))}\n"
                 "\n"
-                "This message was not cached, so the message content cannot be displayed."
             )
 
+        if stored is None:
+            response += "This message was not cached, so the message content cannot be displayed."
+        else:
+            author = channel.guild.get_member(stored.author_id)
+            author = format_user(author) if author else f"`{stored.author_id}`"
+            response = f"**Author:** {author}\n" + response + stored.content
+            if stored.attachments:
+                response = f"**Attachments:** {', '.join(stored.attachments)}\n" + response
+
         await self.send_log_message(
             Icons.message_delete,
             Colours.soft_red,
@@ -813,78 +833,132 @@ class ModLog(Cog, name="ModLog"):
             channel_id=self.bot.guilds_info_cache[f"{event.guild_id}"]["message_log"],
         )
 
-    @Cog.listener()
-    async def on_raw_message_delete(self, event: discord.RawMessageDeleteEvent) -> None:
-        """Log message deletions to message change log."""
+    async def log_deleted_messages(
+        self,
+        guild_id: int,
+        channel_id: int,
+        message_ids: t.Iterable[int],
+        cached: t.Dict[int, discord.Message],
+    ) -> None:
+        """
+        Log many deleted messages as one entry to message change log, with their transcript attached.
+        This is called for bulk deletes and runs of deletes in a channel.
+        """
+        await self.bot.wait_until_guild_available()
+        if self.is_channel_ignored(channel_id):
+            return
+
+        message_ids = unignored(self._ignored[Event.message_delete], message_ids)
+        if not message_ids:
+            return
+
+        channel = self.bot.get_channel(channel_id)
+        stored = await message_store.get_many(message_id for message_id in message_ids if message_id not in cached)
+        transcript, count = deleted_messages.transcript(channel.guild, message_ids, cached, stored)
+        if not count:
+            return
+
+        channel_name = f"{channel.category}/#{channel.name}" if channel.category else f"#{channel.name}"
+        response = (
+            f"**Channel:** {channel_name} (`{channel.id}`)\n"
+            f"**Messages:** {count}\n"
+            f"**Sent from:** {format_dt(snowflake_time(min(message_ids)))}\n"
+            "\n"
+            "The deleted messages are in the attached transcript."
+        )
+        filename = f"deleted-messages-{channel.id}-{max(message_ids)}.txt"
+
+        await self.send_log_message(
+            Icons.message_bulk_delete,
+            Colours.soft_red,
+            "Messages deleted",
+            response,
+            channel_id=self.bot.guilds_info_cache[f"{guild_id}"]["message_log"],
+            files=[discord.File(transcript, filename=filename)],
+        )
+
+    async def log_deleted_message(self, event: discord.RawMessageDeleteEvent) -> None:
         if event.cached_message is not None:
             await self.log_cached_deleted_message(event.cached_message)
         else:
             await self.log_uncached_deleted_message(event)
 
+    @Cog.listener()
+    async def on_raw_message_delete(self, event: discord.RawMessageDeleteEvent) -> None:
+        """Log message deletions to message change log, after the deletes that follow in the channel."""
+        if event.guild_id is None:
+            return  # ignore DM deletes
+
+        self._delete_runs.add(event)
+
+    @Cog.listener()
+    async def on_raw_bulk_message_delete(self, event: discord.RawBulkMessageDeleteEvent) -> None:
+        """Log bulk message deletions to message change log, as one transcript."""
+        if event.guild_id is None:
+            return
+
+        cached = {message.id: message for message in event.cached_messages}
+        await self.log_deleted_messages(event.guild_id, event.channel_id, event.message_ids, cached)
+
+    @Cog.listener()
+    async def on_message(self, message: discord.Message) -> None:
+        """Store the message, for its edits to be logged once it is out of the bot's message cache."""
+        if self.is_message_blacklisted(message):
+            return
+
+        message_store.add(message, persist=self.persists_messages(message.guild.id))
+
     @Cog.listener()
     async def on_message_edit(self, msg_before: discord.Message, msg_after: discord.Message) -> None:
         """Log message edit event to message change log."""
         if self.is_message_blacklisted(msg_before):
             return
 
-        self._cached_edits.append(msg_before.id)
-
         if msg_before.content == msg_after.content:
             return
 
-        channel = msg_before.channel
+        message_store.add(msg_after, persist=self.persists_messages(msg_after.guild.id))
+        await self.log_message_edit(msg_after, msg_before.clean_content, msg_before.created_at, msg_before.edited_at)
+
+    async def log_message_edit(
+        self,
+        message: discord.Message,
+        content_before: str,
+        created_at: datetime,
+        edited_at: t.Optional[datetime],
+    ) -> None:
+        """Log the word diff of an edit of `message`, from `content_before` (its clean content before the edit)."""
+        channel = message.channel
         channel_name = f"{channel.category}/#{channel.name}" if channel.category else f"#{channel.name}"
 
-        cleaned_contents = (escape_markdown(msg.clean_content).split() for msg in (msg_before, msg_after))
-        # Getting the difference per words and group them by type - add, remove, same
-        # Note that this is intended grouping without sorting
-        diff = difflib.ndiff(*cleaned_contents)
-        diff_groups = tuple(
-            (diff_type, tuple(s[2:] for s in diff_words))
-            for diff_type, diff_words in itertools.groupby(diff, key=lambda s: s[0])
+        cleaned_before, cleaned_after = escape_markdown(content_before), escape_markdown(message.clean_content)
+        # Long edits are diffed off the event loop
+        content_before, content_after = await offload.run(
+            word_diff, cleaned_before, cleaned_after, size=len(cleaned_before) + len(cleaned_after)
         )
 
-        content_before: t.List[str] = []
-        content_after: t.List[str] = []
-
-        for index, (diff_type, words) in enumerate(diff_groups):
-            sub = " ".join(words)
-            if diff_type == "-":
-                content_before.append(f"[{sub}](http://o.hi)")
-            elif diff_type == "+":
-                content_after.append(f"[{sub}](http://o.hi)")
-            elif diff_type == " ":
-                if len(words) > 2:
-                    sub = (
-                        f"{words[0] if index > 0 else ''}"
-                        " ... "
-                        f"{words[-1] if index < len(diff_groups) - 1 else ''}"
-                    )
-                content_before.append(sub)
-                content_after.append(sub)
-
         response = (
-            f"**Author:** {format_user(msg_before.author)}\n"
+            f"**Author:** {format_user(message.author)}\n"
             f"**Channel:** {channel_name} (`{channel.id}`)\n"
-            f"**Message ID:** `{msg_before.id}`\n"
+            f"**Message ID:** `{message.id}`\n"
             "\n"
-            f"**Before**:\n{' '.join(content_before)}\n"
-            f"**After**:\n{' '.join(content_after)}\n"
+            f"**Before**:\n{content_before}\n"
+            f"**After**:\n{content_after}\n"
             "\n"
-            f"[Jump to message]({msg_after.jump_url})"
+            f"[Jump to message]({message.jump_url})"
         )
 
-        if msg_before.edited_at:
+        if edited_at:
             # Message was previously edited, to assist with self-bot detection, use the edited_at
             # datetime as the baseline and create a human-readable delta between this edit event
             # and the last time the message was edited
-            timestamp = msg_before.edited_at
-            delta = converters.humanize_delta(msg_after.edited_at, msg_before.edited_at)
+            timestamp = edited_at
+            delta = converters.humanize_delta(message.edited_at, edited_at)
             footer = f"Last edited {delta} ago"
         else:
             # Message was not previously edited, use the created_at datetime as the baseline, no
             # delta calculation needed
-            timestamp = msg_before.created_at
+            timestamp = created_at
             footer = None
 
         await self.send_log_message(
@@ -892,32 +966,63 @@ class ModLog(Cog, name="ModLog"):
             Colour.og_blurple(),
             "Message edited",
             response,
-            channel_id=self.bot.guilds_info_cache[f"{msg_before.guild.id}"]["message_log"],
+            channel_id=self.bot.guilds_info_cache[f"{message.guild.id}"]["message_log"],
             timestamp_override=timestamp,
             footer=footer,
         )
 
+    async def message_from_payload(self, event: discord.RawMessageUpdateEvent) -> t.Optional[discord.Message]:
+        """
+        Return the edited message of an uncached edit event.
+
+        The message is built from the gateway payload, which holds all of it for an edit by its
+        author. It is only fetched through the API, within the channel's fetch budget, when the
+        payload is partial.
+        """
+        channel = self.bot.get_channel(event.channel_id)
+        if channel is None:
+            return None
+
+        try:
+            return discord.Message(state=self.bot._connection, channel=channel, data=event.data)
+        except KeyError:
+            pass
+
+        if not fetch_budget.take(channel.id):
+            log.debug(f"Not fetching edited message {event.message_id}, the fetch budget of #{channel} is spent")
+            return None
+
+        try:
+            return await channel.fetch_message(event.message_id)
+        except discord.NotFound:  # Was deleted before we got the event
+            return None
+
     @Cog.listener()
     async def on_raw_message_edit(self, event: discord.RawMessageUpdateEvent) -> None:
         """Log raw message edit event to message change log."""
         if event.guild_id is None:
             return  # ignore DM edits
 
-        await self.bot.wait_until_guild_available()
-        try:
-            channel = self.bot.get_channel(int(event.data["channel_id"]))
-            message = await channel.fetch_message(event.message_id)
-        except discord.NotFound:  # Was deleted before we got the event
+        if event.cached_message is not None:
+            return  # on_message_edit logs it
+
+        # Embeds resolved from links update the message without editing it
+        if "content" not in event.data or not event.data.get("edited_timestamp"):
             return
 
-        if self.is_message_blacklisted(message):
+        await self.bot.wait_until_guild_available()
+        if self.is_channel_ignored(event.channel_id):
             return
 
-        await asyncio.sleep(1)  # Wait here in case the normal event was fired
+        message = await self.message_from_payload(event)
+        if message is None or self.is_message_blacklisted(message):
+            return
 
-        if event.message_id in self._cached_edits:
-            # It was in the cache and the normal event was fired, so we can just ignore it
-            self._cached_edits.remove(event.message_id)
+        stored = await message_store.get(message.id)
+        message_store.add(message, persist=self.persists_messages(message.guild.id))
+        if stored is not None:
+            if stored.content != message.clean_content:
+                await self.log_message_edit(message, stored.content, stored.created_at, stored.edited_at)
             return
 
         channel = message.channel
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import discord
+from discord import Member
+from discord.ext.commands import BadArgument, Cog, Context, command, guild_only, has_any_role
+from discord.utils import format_dt
+import constants
+import converters
+from log import get_logger
+from Bronn import Bot
+from bot.database.models import Timer
+from bot.utils.timers import timers
+
+log = get_logger(__name__)
+
+UNMUTE = "unmute"
+
+
+class Mutes(Cog):
+    """Timed mutes, lifted by the persisted timers of `bot.utils.timers`."""
+
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+        timers.register(UNMUTE, self.lift_mute)
+
+    def cog_unload(self) -> None:
+        timers.unregister(UNMUTE)
+
+    @guild_only()
+    @command(name="mute")
+    async def mute(self, ctx: Context, member: Member, duration: Optional[str] = None, *, reason: str = None) -> None:
+        """Give a member the mute role, for `duration` (like 1h30M) or `Punishment.remove_after` seconds."""
+        if duration is None:
+            delta = timedelta(seconds=constants.Punishment.remove_after)
+        else:
+            parsed = converters.parse_duration_string(duration)
+            if not parsed:
+                raise BadArgument(f"`{duration}` is not a valid duration.")
+            delta = converters.relativedelta_to_timedelta(parsed)
+
+        role = ctx.guild.get_role(constants.Punishment.role_id)
+        if role is None:
+            raise BadArgument("This server has no mute role.")
+
+        await member.add_roles(role, reason=reason)
+        await timers.cancel(ctx.guild.id, UNMUTE, member.id)
+        timer = await timers.schedule(
+            UNMUTE,
+            ctx.guild.id,
+            member.id,
+            datetime.now(timezone.utc) + delta,
+            data={"role_id": role.id},
+        )
+        await ctx.reply(f"{member.mention} is muted until {format_dt(timer.expires_at)}.")
+
+    @guild_only()
+    @command(name="unmute")
+    async def unmute(self, ctx: Context, member: Member) -> None:
+        """Lift the mute of a member now."""
+        role = ctx.guild.get_role(constants.Punishment.role_id)
+        if role is not None and role in member.roles:
+            await member.remove_roles(role, reason=f"Unmuted by {ctx.author}")
+        await timers.cancel(ctx.guild.id, UNMUTE, member.id)
+        await ctx.reply(f"{member.mention} is no longer muted.")
+
+    async def lift_mute(self, timer: Timer) -> None:
+        """Remove the mute role given by `mute` when its timer expires."""
+        guild = self.bot.get_guild(timer.guild_id)
+        if guild is None:
+            return
+
+        member = guild.get_member(timer.target_id)
+        if member is None:
+            try:
+                member = await guild.fetch_member(timer.target_id)
+            except discord.NotFound:
+                return  # Left the guild, the role went with them
+
+        role = guild.get_role((timer.data or {}).get("role_id", constants.Punishment.role_id))
+        if role is not None and role in member.roles:
+            await member.remove_roles(role, reason="Mute expired")
+            log.info(f"Lifted the mute of {member} ({member.id}) in {guild.id}")
+
+    async def cog_check(self, ctx: Context) -> bool:
+        """Only allow moderators to invoke the commands in this cog."""
+        return await has_any_role(*constants.MODERATION_ROLES).predicate(ctx)
+
+
+def setup(bot: Bot) -> None:
+    """Load the Mutes cog."""
+    bot.add_cog(Mutes(bot))
@@ -0,0 +1,132 @@
+"""
+In-memory index of the members who are AFK, by guild and user ID.
+
+The active `AFKModel` rows are loaded once when the bot is ready, into `Bot.cache["afk"]`
+(guild ID -> user ID -> `AFKRecord`). Checking a message then costs one dict lookup for its
+author and one per mention, and only a member coming back from AFK writes to the database.
+
+AFK entries created, saved or deleted through the ORM update the index right away.
+"""
+
+import typing as t
+from datetime import datetime
+from tortoise.signals import post_delete, post_save
+from bot.database.models import AFKModel
+from bot.log import get_logger
+
+log = get_logger(__name__)
+
+
+class AFKRecord:
+    """An active AFK entry."""
+
+    __slots__ = ("id", "user_id", "since", "nickname", "message")
+
+    def __init__(
+        self, id: int, user_id: int, since: datetime, nickname: t.Optional[str], message: t.Optional[str]
+    ) -> None:
+        self.id = id
+        self.user_id = user_id
+        self.since = since
+        self.nickname = nickname
+        self.message = message
+
+    @classmethod
+    def from_model(cls, afk: AFKModel) -> "AFKRecord":
+        return cls(afk.id, afk.afk_user_id, afk.start_time, afk.nickname, afk.message)
+
+
+class AFKIndex:
+    """The `AFKRecord` of every AFK member, by guild ID and user ID."""
+
+    FIELDS = ("id", "guild_id", "afk_user_id", "start_time", "nickname", "message")
+
+    def __init__(self) -> None:
+        self.guilds: t.Dict[int, t.Dict[int, AFKRecord]] = {}
+
+    async def load(self) -> None:
+        """Replace the index with the active AFK entries of the database."""
+        guilds: t.Dict[int, t.Dict[int, AFKRecord]] = {}
+        rows = await AFKModel.filter(enabled=True).order_by("id").values_list(*self.FIELDS)
+        for id, guild_id, user_id, since, nickname, message in rows:
+            guilds.setdefault(guild_id, {})[user_id] = AFKRecord(id, user_id, since, nickname, message)
+
+        # Mutated in place, the dict is shared as `Bot.cache["afk"]`
+        self.guilds.clear()
+        self.guilds.update(guilds)
+        log.info(f"Loaded {len(rows)} AFK members of {len(guilds)} guilds")
+
+    def get(self, guild_id: int, user_id: int) -> t.Optional[AFKRecord]:
+        members = self.guilds.get(guild_id)
+        return members.get(user_id) if members else None
+
+    def mentioned(self, guild_id: int, user_ids: t.Iterable[int]) -> t.List[AFKRecord]:
+        """The AFK records of the AFK members among `user_ids`, in order and without repeats."""
+        members = self.guilds.get(guild_id)
+        if not members:
+            return []
+
+        records = {}
+        for user_id in user_ids:
+            record = members.get(user_id)
+            if record is not None:
+                records[user_id] = record
+        return list(records.values())
+
+    async def set(
+        self, guild_id: int, user_id: int, message: t.Optional[str] = None, nickname: t.Optional[str] = None
+    ) -> AFKRecord:
+        """Mark a member as AFK, replacing their previous entry."""
+        await AFKModel.for_user(guild_id, user_id).update(enabled=False)
+        await AFKModel.create(guild_id=guild_id, afk_user_id=user_id, message=message, nickname=nickname)
+        return self.guilds[guild_id][user_id]  # Added by the post_save signal
+
+    async def clear(self, guild_id: int, user_id: int) -> t.Optional[AFKRecord]:
+        """Mark a member as back, returning their AFK record if they were AFK."""
+        members = self.guilds.get(guild_id)
+        record = members.pop(user_id, None) if members else None
+        if record is None:
+            return None
+
+        if not members:
+            del self.guilds[guild_id]
+        await AFKModel.for_user(guild_id, user_id).update(enabled=False)
+        return record
+
+    async def process(
+        self, guild_id: int, author_id: int, mention_ids: t.Iterable[int], *, setting_afk: bool = False
+    ) -> t.Tuple[t.Optional[AFKRecord], t.List[AFKRecord]]:
+        """
+        The AFK record of a message's author, who is back, and those of the AFK members it mentions.
+
+        `setting_afk` is set for the message invoking the `afk` command, which must not clear the AFK it sets.
+        """
+        back = None if setting_afk else await self.clear(guild_id, author_id)
+        return back, self.mentioned(guild_id, mention_ids)
+
+    def _put(self, afk: AFKModel) -> None:
+        self.guilds.setdefault(afk.guild_id, {})[afk.afk_user_id] = AFKRecord.from_model(afk)
+
+    def _discard(self, afk: AFKModel) -> None:
+        members = self.guilds.get(afk.guild_id)
+        record = members.get(afk.afk_user_id) if members else None
+        if record is not None and record.id == afk.id:
+            del members[afk.afk_user_id]
+            if not members:
+                del self.guilds[afk.guild_id]
+
+
+afk_index = AFKIndex()
+
+
+@post_save(AFKModel)
+async def _afk_saved(sender: t.Type[AFKModel], instance: AFKModel, created: bool, using_db, update_fields) -> None:
+    if instance.enabled:
+        afk_index._put(instance)
+    else:
+        afk_index._discard(instance)
+
+
+@post_delete(AFKModel)
+async def _afk_deleted(sender: t.Type[AFKModel], instance: AFKModel, using_db) -> None:
+    afk_index._discard(instance)
@@ -0,0 +1,374 @@
+"""
+Two-tier async cache: a bounded in-process LRU in front of the shared Redis tier.
+
+Each namespace gets its own `TwoTierCache`, created on first use through `get_cache()`. Only
+"guild", for the cached models, is used: the filter list, tags and AFK members are read from
+in-memory indexes kept up to date on every write, so they never miss. Concurrent misses for one
+key are coalesced into a single load, and invalidations are published over Redis pub/sub so
+every process drops its local copy. When the subscription is lost, the listener subscribes
+again and drops the whole in-process tier, as the invalidations published in between were missed.
+Values must be JSON serialisable, and callers must not mutate what they get back.
+"""
+
+import asyncio
+import json
+import time
+import typing as t
+from collections import OrderedDict
+from bot import constants
+from bot.database import cache as redis_cache
+from bot.log import get_logger
+
+log = get_logger(__name__)
+
+MISSING = object()
+
+
+class LRUCache:
+    """A bounded mapping whose entries expire after `ttl` seconds, evicting the least recently used first."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key: t.Hashable, default: t.Any = None) -> t.Any:
+        """Return the value of `key`, or `default` if it is missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: t.Hashable, value: t.Any) -> None:
+        """Store `value` under `key`, evicting the oldest entry if the cache is full."""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: t.Hashable, default: t.Any = None) -> t.Any:
+        """Remove `key` and return its value, or `default`."""
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: t.Hashable) -> bool:
+        return self.get(key, MISSING) is not MISSING
+
+
+class ExpiringSet:
+    """
+    A set whose members expire `ttl` seconds after they were added.
+
+    Members are indexed by the time bucket (`ttl / buckets` seconds wide) they expire in, and the
+    expired buckets are dropped whole on every operation, so add, contains and discard are O(1)
+    amortised and the set never holds more than the members of the last `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float, buckets: int = 10) -> None:
+        self.ttl = ttl
+        self._width = ttl / buckets
+        # One more bucket than the ttl spans, as the current one is partly elapsed
+        self._span = buckets + 1
+        self._expiry: t.Dict[t.Hashable, int] = {}
+        self._buckets: OrderedDict = OrderedDict()
+
+    def _bucket(self) -> int:
+        return int(time.monotonic() // self._width)
+
+    def _evict(self, now: int) -> None:
+        while self._buckets:
+            bucket = next(iter(self._buckets))
+            if bucket > now:
+                break
+            for item in self._buckets.pop(bucket):
+                del self._expiry[item]
+
+    def add(self, item: t.Hashable) -> None:
+        now = self._bucket()
+        self._evict(now)
+        self.discard(item)
+
+        bucket = now + self._span
+        self._expiry[item] = bucket
+        if bucket not in self._buckets:
+            self._buckets[bucket] = set()
+        self._buckets[bucket].add(item)
+
+    def discard(self, item: t.Hashable) -> None:
+        bucket = self._expiry.pop(item, None)
+        if bucket is not None:
+            self._buckets[bucket].discard(item)
+
+    def __contains__(self, item: t.Hashable) -> bool:
+        self._evict(self._bucket())
+        return item in self._expiry
+
+    def __len__(self) -> int:
+        self._evict(self._bucket())
+        return len(self._expiry)
+
+
+class CacheStats:
+    """Hit and load counters of a single cache namespace."""
+
+    __slots__ = ("local_hits", "remote_hits", "coalesced", "misses", "load_time_total", "load_time_max")
+
+    def __init__(self) -> None:
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        self.load_time_total = 0.0
+        self.load_time_max = 0.0
+
+    @property
+    def requests(self) -> int:
+        return self.local_hits + self.remote_hits + self.coalesced + self.misses
+
+    @property
+    def hit_ratio(self) -> float:
+        """Share of requests that did not run the loader."""
+        return 1 - self.misses / self.requests if self.requests else 0.0
+
+    @property
+    def load_time_avg(self) -> float:
+        return self.load_time_total / self.misses if self.misses else 0.0
+
+    def record_load(self, seconds: float) -> None:
+        self.misses += 1
+        self.load_time_total += seconds
+        self.load_time_max = max(self.load_time_max, seconds)
+
+
+class TwoTierCache:
+    """A namespaced in-process LRU backed by Redis, with single-flight loading."""
+
+    def __init__(self, namespace: str, *, maxsize: int, ttl: float, remote_ttl: int) -> None:
+        self.namespace = namespace
+        self.remote_ttl = remote_ttl
+        self.stats = CacheStats()
+        self._local = LRUCache(maxsize, ttl)
+        self._inflight: t.Dict[str, asyncio.Future] = {}
+        # Loads whose key was written or invalidated while they ran, so their result isn't cached
+        self._outdated: t.Set[asyncio.Future] = set()
+
+    def _remote_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: t.Any, loader: t.Callable[[], t.Awaitable[t.Any]]) -> t.Any:
+        """
+        Return the value cached under `key`, calling `loader` on a miss of both tiers.
+
+        Only one `loader` call runs per key at a time; concurrent callers wait for its result.
+        A `None` result is returned but not cached, and neither is a result whose key was written
+        or invalidated while it loaded, as it may predate the change.
+        """
+        key = str(key)
+        value = self._local.get(key, MISSING)
+        if value is not MISSING:
+            self.stats.local_hits += 1
+            return value
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled():  # The leading caller was cancelled, not us
+                    return await self.get(key, loader)
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._load(key, loader, future)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark as retrieved when nobody else is waiting
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            self._outdated.discard(future)
+
+    async def _load(self, key: str, loader: t.Callable[[], t.Awaitable[t.Any]], future: asyncio.Future) -> t.Any:
+        """Load `key` from Redis or else `loader`, and cache it unless the key changed in the meantime."""
+        raw = await self._remote_get(key)
+        if raw is not None:
+            self.stats.remote_hits += 1
+            value = json.loads(raw)
+            if future not in self._outdated:
+                self._local.set(key, value)
+            return value
+
+        start = time.perf_counter()
+        value = await loader()
+        self.stats.record_load(time.perf_counter() - start)
+        if value is None or future in self._outdated:
+            return value
+
+        await self._remote_set(key, json.dumps(value))
+        if future in self._outdated:
+            # Invalidated while it was written, which may have landed after the invalidation's delete
+            await self._remote_delete(key)
+            return value
+
+        self._local.set(key, value)
+        return value
+
+    def _outdate(self, key: str) -> None:
+        """Keep the running load of `key` from caching its result, and have the next request load again."""
+        future = self._inflight.pop(key, None)
+        if future is not None:
+            self._outdated.add(future)
+
+    async def set(self, key: t.Any, value: t.Any) -> None:
+        """Write `value` to both tiers and tell the other processes to drop their copy."""
+        key = str(key)
+        self._outdate(key)
+        self._local.set(key, value)
+        await self._remote_set(key, json.dumps(value), publish=True)
+
+    async def invalidate(self, key: t.Any) -> None:
+        """Drop `key` from both tiers, in this process and every other one."""
+        key = str(key)
+        self._outdate(key)
+        self._local.pop(key)
+
+        redis = redis_cache.redis
+        if redis is None:
+            return
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.delete(self._remote_key(key))
+                pipe.publish(constants.Cache.invalidation_channel, self._remote_key(key))
+                await pipe.execute()
+        except Exception:
+            log.warning(f"Redis invalidation failed for {self._remote_key(key)}", exc_info=True)
+
+    async def _remote_get(self, key: str) -> t.Optional[str]:
+        redis = redis_cache.redis
+        if redis is None:
+            return None
+        try:
+            return await redis.get(self._remote_key(key))
+        except Exception:
+            log.warning(f"Redis read failed for {self._remote_key(key)}", exc_info=True)
+            return None
+
+    async def _remote_delete(self, key: str) -> None:
+        redis = redis_cache.redis
+        if redis is None:
+            return
+        try:
+            await redis.delete(self._remote_key(key))
+        except Exception:
+            log.warning(f"Redis delete failed for {self._remote_key(key)}", exc_info=True)
+
+    async def _remote_set(self, key: str, raw: str, publish: bool = False) -> None:
+        redis = redis_cache.redis
+        if redis is None:
+            return
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.set(self._remote_key(key), raw, ex=self.remote_ttl)
+                if publish:
+                    pipe.publish(constants.Cache.invalidation_channel, self._remote_key(key))
+                await pipe.execute()
+        except Exception:
+            log.warning(f"Redis write failed for {self._remote_key(key)}", exc_info=True)
+
+    def evict_local(self, key: str) -> None:
+        """Drop `key` from the in-process tier only."""
+        self._outdate(key)
+        self._local.pop(key)
+
+    def clear_local(self) -> None:
+        for key in list(self._inflight):
+            self._outdate(key)
+        self._local.clear()
+
+    def __len__(self) -> int:
+        return len(self._local)
+
+
+caches: t.Dict[str, TwoTierCache] = {}
+_listener: t.Optional[asyncio.Task] = None
+
+
+def get_cache(namespace: str) -> TwoTierCache:
+    """Return the cache of `namespace`, creating it on first use."""
+    if namespace not in caches:
+        caches[namespace] = TwoTierCache(
+            namespace,
+            maxsize=constants.Cache.maxsize,
+            ttl=constants.Cache.ttl,
+            remote_ttl=constants.Redis.ttl,
+        )
+    return caches[namespace]
+
+
+async def listen_for_invalidations() -> None:
+    """Evict local entries whenever any process publishes an invalidation, subscribing again if Redis drops."""
+    subscribed_before = False
+    while True:
+        pubsub = redis_cache.redis.pubsub()
+        try:
+            await pubsub.subscribe(constants.Cache.invalidation_channel)
+            log.info(f"Listening for cache invalidations on {constants.Cache.invalidation_channel}")
+            if subscribed_before:
+                # Invalidations published while we were unsubscribed are lost
+                for cache in caches.values():
+                    cache.clear_local()
+            subscribed_before = True
+
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                namespace, _, key = message["data"].partition(":")
+                if namespace in caches:
+                    caches[namespace].evict_local(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.warning(
+                f"Lost the cache invalidation subscription, retrying in {constants.Cache.listener_retry}s",
+                exc_info=True,
+            )
+        finally:
+            try:
+                await pubsub.close()
+            except Exception:
+                pass
+
+        await asyncio.sleep(constants.Cache.listener_retry)
+
+
+def start_invalidation_listener() -> None:
+    """Start the pub/sub listener task, if Redis is connected and it isn't running yet."""
+    global _listener
+
+    if redis_cache.redis is None or (_listener is not None and not _listener.done()):
+        return
+
+    _listener = asyncio.create_task(listen_for_invalidations(), name="cache-invalidation-listener")
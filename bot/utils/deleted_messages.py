@@ -0,0 +1,118 @@
+"""
+Deleted messages for the message log, grouped into runs and written out as transcripts.
+
+A message deleted in a channel opens a run of `Logs.delete_run_window` seconds, which collects the
+deletes that follow in that channel. A run of fewer than `Logs.delete_run_threshold` deletes is
+logged one message at a time, and a longer one, like a bulk delete, as one transcript. The content
+of a transcript comes from the bot's message cache, or else the message store, and messages of
+bots are left out.
+"""
+
+import asyncio
+import io
+import typing as t
+import discord
+from discord.utils import snowflake_time
+from bot.log import get_logger
+from bot.utils.cache import ExpiringSet
+from bot.utils.message_store import StoredMessage
+
+log = get_logger(__name__)
+
+LogOne = t.Callable[[discord.RawMessageDeleteEvent], t.Awaitable[None]]
+LogMany = t.Callable[[int, int, t.List[int], t.Dict[int, discord.Message]], t.Awaitable[None]]
+
+
+def unignored(ignored: ExpiringSet, message_ids: t.Iterable[int]) -> t.List[int]:
+    """Return the message ids not in `ignored`, and discard the others from it, as they are skipped once."""
+    logged = []
+    for message_id in message_ids:
+        if message_id in ignored:
+            ignored.discard(message_id)
+        else:
+            logged.append(message_id)
+    return logged
+
+
+def transcript(
+    guild: discord.Guild,
+    message_ids: t.Iterable[int],
+    cached: t.Dict[int, discord.Message],
+    stored_messages: t.Dict[int, StoredMessage],
+) -> t.Tuple[io.BytesIO, int]:
+    """
+    Write the deleted messages, oldest first, to an in-memory transcript, and return it with its length.
+
+    `cached` and `stored_messages` are the messages in the bot's cache and in the message store, by id.
+    """
+    written = io.BytesIO()
+    count = 0
+    for message_id in sorted(message_ids):
+        message = cached.get(message_id)
+        if message is not None:
+            if message.author.bot:
+                continue
+            author = f"{message.author} ({message.author.id})"
+            content = message.clean_content
+            attachments = [attachment.filename for attachment in message.attachments]
+        else:
+            stored = stored_messages.get(message_id)
+            if stored is None:
+                author, content, attachments = "Unknown", "This message was not cached.", ()
+            else:
+                member = guild.get_member(stored.author_id)
+                author = f"{member} ({stored.author_id})" if member else f"{stored.author_id}"
+                content, attachments = stored.content, stored.attachments
+
+        sent_at = snowflake_time(message_id).strftime("%Y-%m-%d %H:%M:%S UTC")
+        written.write(f"[{sent_at}] {author} [{message_id}]: {content}\n".encode())
+        if attachments:
+            written.write(f"    Attachments: {', '.join(attachments)}\n".encode())
+        count += 1
+
+    written.seek(0)
+    return written, count
+
+
+class DeleteRuns:
+    """The runs of deletes of every channel, logged by `log_one` one by one or by `log_many` together."""
+
+    def __init__(self, window: float, threshold: int, log_one: LogOne, log_many: LogMany) -> None:
+        self.window = window
+        self.threshold = threshold
+        self.log_one = log_one
+        self.log_many = log_many
+        self._runs: t.Dict[int, t.List[discord.RawMessageDeleteEvent]] = {}
+        self._tasks: t.Set[asyncio.Task] = set()
+
+    def add(self, event: discord.RawMessageDeleteEvent) -> None:
+        """Add the delete to the run of its channel, or open one."""
+        run = self._runs.get(event.channel_id)
+        if run is not None:
+            run.append(event)
+            return
+
+        self._runs[event.channel_id] = [event]
+        task = asyncio.create_task(self._log_run(event.channel_id), name=f"delete-run-{event.channel_id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+    async def _log_run(self, channel_id: int) -> None:
+        await asyncio.sleep(self.window)
+        events = self._runs.pop(channel_id)
+
+        try:
+            if len(events) >= self.threshold:
+                cached = {event.message_id: event.cached_message for event in events if event.cached_message}
+                message_ids = [event.message_id for event in events]
+                await self.log_many(events[0].guild_id, channel_id, message_ids, cached)
+                return
+
+            for event in events:
+                await self.log_one(event)
+        except Exception:
+            log.exception(f"Could not log the {len(events)} messages deleted in channel {channel_id}")
@@ -0,0 +1,342 @@
+"""
+Declarative diffs of discord objects, for the update events of the mod log.
+
+A `DiffSpec` lists the attributes worth logging for a type of object, each as a `Field` with
+its label and formatter. On first use with a class, the spec compiles the fields that class
+has into a single `operator.attrgetter`, so a diff reads every attribute of both objects in
+one call, and an update that changed none of them (most member updates) is rejected with one
+tuple comparison.
+
+Only the listed attributes are read. Walking whole objects instead reaches their guild, its
+caches and connection state, and costs milliseconds per event on the event loop.
+
+`word_diff()` renders the before and after of an edited message, for the message log. It
+only takes and returns strings, so it can run in a worker process. Its word diff is Myers'
+linear-space algorithm, capped at `MAX_DIFF_COST` edits: past the cap, which costs a few
+milliseconds on a 4000 characters message, everything between the common prefix and suffix
+is shown as one changed region instead.
+"""
+
+import operator
+import typing as t
+import discord
+
+
+def _identity(value: t.Any) -> t.Any:
+    return value
+
+
+def format_asset(asset: t.Optional[discord.Asset]) -> t.Optional[str]:
+    return asset.url if asset is not None else None
+
+
+def format_mentionable(value: t.Optional[discord.abc.Snowflake]) -> t.Optional[str]:
+    return f"{value} ({value.id})" if value is not None else None
+
+
+def format_enum(value: t.Any) -> t.Any:
+    return getattr(value, "name", value)
+
+
+def overwrite_pairs(overwrites: t.List[t.Any]) -> t.List[t.Tuple[int, int, int]]:
+    """The comparable content of a channel's raw permission overwrites."""
+    return [(overwrite.id, overwrite.allow, overwrite.deny) for overwrite in overwrites]
+
+
+class Field(t.NamedTuple):
+    attr: str
+    label: t.Optional[str] = None  # Defaults to the title-cased attribute name
+    format: t.Callable[[t.Any], t.Any] = _identity
+    summary: bool = False  # Log that the field changed, without its values
+    key: t.Optional[t.Callable[[t.Any], t.Any]] = None  # What is compared, for values without equality
+
+
+class Change(t.NamedTuple):
+    attr: str
+    label: str
+    old: t.Any
+    new: t.Any
+    summary: bool
+
+
+class _Compiled(t.NamedTuple):
+    fields: t.Tuple[Field, ...]
+    labels: t.Tuple[str, ...]
+    get: t.Callable[[t.Any], tuple]
+    keys: t.Optional[t.Tuple[t.Callable[[t.Any], t.Any], ...]]
+
+
+class DiffSpec:
+    """The attributes compared between two versions of an object, compiled into one getter per type."""
+
+    __slots__ = ("fields", "_compiled")
+
+    def __init__(self, *fields: Field) -> None:
+        self.fields = fields
+        self._compiled: t.Dict[type, _Compiled] = {}
+
+    def _compile(self, obj: t.Any) -> _Compiled:
+        # Channel types share a spec, the fields a type doesn't have are left out of its getter
+        cls = type(obj)
+        fields = tuple(field for field in self.fields if hasattr(cls, field.attr) or hasattr(obj, field.attr))
+        getter = operator.attrgetter(*(field.attr for field in fields)) if fields else lambda obj: ()
+        if len(fields) == 1:
+            # attrgetter returns a bare value, not a tuple, for a single attribute
+            single = getter
+            getter = lambda obj: (single(obj),)  # noqa: E731
+
+        keys = None
+        if any(field.key for field in fields):
+            keys = tuple(field.key or _identity for field in fields)
+
+        compiled = self._compiled[cls] = _Compiled(
+            fields, tuple(field.label or field.attr.title() for field in fields), getter, keys
+        )
+        return compiled
+
+    def diff(self, before: t.Any, after: t.Any) -> t.List[Change]:
+        """Return the changes of the fields of `before` in `after`, in the order of the spec."""
+        compiled = self._compiled.get(type(after)) or self._compile(after)
+        old_values, new_values = compiled.get(before), compiled.get(after)
+        if compiled.keys is not None:
+            old_values = tuple(key(value) for key, value in zip(compiled.keys, old_values))
+            new_values = tuple(key(value) for key, value in zip(compiled.keys, new_values))
+        if old_values == new_values:
+            return []
+
+        return [
+            Change(field.attr, label, field.format(old), field.format(new), field.summary)
+            for field, label, old, new in zip(compiled.fields, compiled.labels, old_values, new_values)
+            if old != new
+        ]
+
+
+CHANNEL_DIFF = DiffSpec(
+    Field("name"),
+    Field("category", format=format_mentionable),
+    Field("topic"),
+    Field("nsfw", "NSFW"),
+    Field("slowmode_delay", "Slowmode delay"),
+    Field("default_auto_archive_duration", "Default archive duration"),
+    Field("bitrate"),
+    Field("user_limit", "User limit"),
+    Field("rtc_region", "Region", format=format_enum),
+    Field("type", format=format_enum),
+    Field("_overwrites", "Permissions", summary=True, key=overwrite_pairs),
+)
+
+ROLE_DIFF = DiffSpec(
+    Field("name"),
+    Field("colour", summary=True),
+    Field("permissions", summary=True),
+    Field("hoist"),
+    Field("mentionable"),
+    Field("icon", format=format_asset),
+    Field("unicode_emoji", "Emoji"),
+)
+
+GUILD_DIFF = DiffSpec(
+    Field("name"),
+    Field("description"),
+    Field("icon", format=format_asset),
+    Field("banner", format=format_asset),
+    Field("splash", format=format_asset),
+    Field("owner_id", "Owner"),
+    Field("afk_channel", "AFK channel", format=format_mentionable),
+    Field("afk_timeout", "AFK timeout"),
+    Field("system_channel", "System channel", format=format_mentionable),
+    Field("rules_channel", "Rules channel", format=format_mentionable),
+    Field("public_updates_channel", "Public updates channel", format=format_mentionable),
+    Field("verification_level", "Verification level", format=format_enum),
+    Field("explicit_content_filter", "Explicit content filter", format=format_enum),
+    Field("default_notifications", "Default notifications", format=format_enum),
+    Field("mfa_level", "2FA requirement", format=format_enum),
+    Field("nsfw_level", "NSFW level", format=format_enum),
+    Field("preferred_locale", "Locale"),
+    Field("premium_tier", "Boost level"),
+)
+
+MEMBER_DIFF = DiffSpec(
+    Field("name"),
+    Field("discriminator"),
+    Field("nick", "Nickname"),
+    Field("avatar", format=format_asset),
+    Field("guild_avatar", "Server avatar", format=format_asset),
+    Field("pending", "Pending verification"),
+    Field("premium_since", "Boosting since"),
+    Field("communication_disabled_until", "Timed out until"),
+)
+
+
+Words = t.List[str]
+Groups = t.List[t.Tuple[str, Words]]
+
+# Edits (removed plus added words) past which an edited message gets a coarse diff
+MAX_DIFF_COST = 200
+
+
+def _bisect(a: Words, b: Words, max_d: t.Optional[int]) -> t.Optional[t.Tuple[int, int]]:
+    """
+    Find where a shortest edit script of `a` into `b` crosses its middle, in linear space.
+
+    Runs Myers' greedy search from both ends at once until the two paths overlap, and returns
+    the overlap point. Returns None when the edit distance is over twice `max_d`.
+    """
+    len_a, len_b = len(a), len(b)
+    half = (len_a + len_b + 1) // 2
+    if max_d is not None and half > max_d:
+        half = max_d
+    offset = (len_a + len_b + 1) // 2
+    forward = [-1] * (2 * offset + 2)
+    backward = forward[:]
+    forward[offset + 1] = backward[offset + 1] = 0
+    delta = len_a - len_b
+    # With an odd delta the forward path is the one to find the overlap, the backward one otherwise
+    front = delta % 2 != 0
+    k1_start = k1_end = k2_start = k2_end = 0
+
+    for d in range(half):
+        for k1 in range(-d + k1_start, d + 1 - k1_end, 2):
+            k1_offset = offset + k1
+            if k1 == -d or (k1 != d and forward[k1_offset - 1] < forward[k1_offset + 1]):
+                x1 = forward[k1_offset + 1]
+            else:
+                x1 = forward[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < len_a and y1 < len_b and a[x1] == b[y1]:
+                x1 += 1
+                y1 += 1
+            forward[k1_offset] = x1
+            if x1 > len_a:
+                k1_end += 2  # Ran off the right of the grid
+            elif y1 > len_b:
+                k1_start += 2  # Ran off the bottom of the grid
+            elif front:
+                k2_offset = offset + delta - k1
+                if 0 <= k2_offset < len(backward) and backward[k2_offset] != -1:
+                    if x1 >= len_a - backward[k2_offset]:
+                        return x1, y1
+
+        for k2 in range(-d + k2_start, d + 1 - k2_end, 2):
+            k2_offset = offset + k2
+            if k2 == -d or (k2 != d and backward[k2_offset - 1] < backward[k2_offset + 1]):
+                x2 = backward[k2_offset + 1]
+            else:
+                x2 = backward[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < len_a and y2 < len_b and a[-x2 - 1] == b[-y2 - 1]:
+                x2 += 1
+                y2 += 1
+            backward[k2_offset] = x2
+            if x2 > len_a:
+                k2_end += 2
+            elif y2 > len_b:
+                k2_start += 2
+            elif not front:
+                k1_offset = offset + delta - k2
+                if 0 <= k1_offset < len(forward) and forward[k1_offset] != -1:
+                    x1 = forward[k1_offset]
+                    if x1 >= len_a - x2:
+                        return x1, offset + x1 - k1_offset
+
+    if max_d is not None and half == max_d:
+        return None
+    return 0, 0  # Nothing in common
+
+
+def _diff(a: Words, b: Words, max_d: t.Optional[int] = None) -> t.Optional[Groups]:
+    """
+    Return a shortest edit script of `a` into `b`, as groups of equal ("="), removed ("-") and added ("+") words.
+
+    Returns None when it would take more than about `2 * max_d` edits. With a `max_d` of 0,
+    returns the coarse diff: everything between the common prefix and suffix is changed.
+    """
+    prefix = 0
+    while prefix < len(a) and prefix < len(b) and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < len(a) - prefix and suffix < len(b) - prefix and a[-suffix - 1] == b[-suffix - 1]:
+        suffix += 1
+    middle_a, middle_b = a[prefix : len(a) - suffix], b[prefix : len(b) - suffix]
+
+    groups: Groups = [("=", a[:prefix])]
+    split = None
+    if middle_a and middle_b and max_d != 0:
+        split = _bisect(middle_a, middle_b, max_d)
+        if split is None:
+            return None
+
+    if split is None or split in ((0, 0), (len(middle_a), len(middle_b))):
+        groups += [("-", middle_a), ("+", middle_b)]
+    else:
+        # The halves cost at most the distance of the whole, so they are not capped again
+        x, y = split
+        groups += _diff(middle_a[:x], middle_b[:y]) + _diff(middle_a[x:], middle_b[y:])
+    groups.append(("=", a[len(a) - suffix :]))
+    return [group for group in groups if group[1]]
+
+
+def _changed_regions(groups: Groups) -> Groups:
+    """Merge the groups into runs of equal words and changed regions, each a removal then an addition."""
+    merged: Groups = []
+    removed: Words = []
+    added: Words = []
+    for kind, words in groups + [("=", [])]:
+        if kind == "-":
+            removed += words
+        elif kind == "+":
+            added += words
+        else:
+            if removed:
+                merged.append(("-", removed))
+            if added:
+                merged.append(("+", added))
+            removed, added = [], []
+            if merged and merged[-1][0] == "=":
+                merged[-1] = ("=", merged[-1][1] + words)
+            elif words:
+                merged.append(("=", words))
+    return merged
+
+
+def word_groups(before: Words, after: Words, max_cost: int = MAX_DIFF_COST) -> Groups:
+    """
+    Diff two lists of words into runs of equal words and changed regions.
+
+    Past `max_cost` edits the diff is coarse: everything between the common prefix and suffix
+    is one changed region.
+    """
+    groups = _diff(before, after, max_cost // 2 + 1)
+    if groups is None:
+        groups = _diff(before, after, 0)
+    return _changed_regions(groups)
+
+
+def word_diff(before: str, after: str, max_cost: int = MAX_DIFF_COST) -> t.Tuple[str, str]:
+    """
+    Render the words removed from `before` and added in `after` as links, between the unchanged words.
+
+    Runs of more than two unchanged words are shortened to their first and last words.
+    """
+    diff_groups = word_groups(before.split(), after.split(), max_cost)
+
+    content_before: t.List[str] = []
+    content_after: t.List[str] = []
+
+    for index, (diff_type, words) in enumerate(diff_groups):
+        sub = " ".join(words)
+        if diff_type == "-":
+            content_before.append(f"[{sub}](http://o.hi)")
+        elif diff_type == "+":
+            content_after.append(f"[{sub}](http://o.hi)")
+        else:
+            if len(words) > 2:
+                sub = (
+                    f"{words[0] if index > 0 else ''}"
+                    " ... "
+                    f"{words[-1] if index < len(diff_groups) - 1 else ''}"
+                )
+            content_before.append(sub)
+            content_after.append(sub)
+
+    return " ".join(content_before), " ".join(content_after)
@@ -0,0 +1,186 @@
+"""
+Join attribution from snapshots of the invites of every guild.
+
+A snapshot maps each invite code of a guild to its uses, inviter and max uses. It is taken once
+per guild, then kept up to date by `on_invite_create` and `on_invite_delete`. When members join,
+the invites are fetched again and the uses that went up tell who invited them. Joins in a burst
+share one fetch: it runs once no member joined for `Invites.join_debounce` seconds, or after
+`Invites.join_max_wait` seconds. The uses attributed to each inviter are then added to the
+`Invite` counters in one batch.
+
+A failed fetch is retried `Invites.refresh_retries` times, and a snapshot is only dropped when
+the bot is forbidden to see the invites: otherwise the next fetch counts the uses since the old
+one. Fetches and attributions of a guild run one at a time, so a burst never diffs against a
+snapshot that another one is replacing, and no use is counted twice.
+"""
+
+import asyncio
+import time
+import typing as t
+import discord
+from bot import constants
+from bot.database.models import Invite
+from bot.log import get_logger
+
+log = get_logger(__name__)
+
+
+class InviteUse(t.NamedTuple):
+    uses: int
+    inviter_id: t.Optional[int]
+    max_uses: int  # 0 for unlimited
+
+
+Snapshot = t.Dict[str, InviteUse]
+
+
+def snapshot_of(invite: discord.Invite) -> InviteUse:
+    return InviteUse(invite.uses or 0, invite.inviter.id if invite.inviter else None, invite.max_uses or 0)
+
+
+def used_invites(before: Snapshot, after: Snapshot, deleted: Snapshot) -> t.Dict[str, t.Tuple[int, InviteUse]]:
+    """
+    The invites used between two snapshots, with how many times.
+
+    An invite missing from `after` that was deleted one use short of its max uses was used up by a join.
+    """
+    used = {}
+    for code, invite in after.items():
+        previous = before.get(code)
+        count = invite.uses - (previous.uses if previous else 0)
+        if count > 0:
+            used[code] = (count, invite)
+
+    for code, invite in deleted.items():
+        if code not in after and invite.max_uses and invite.uses + 1 == invite.max_uses:
+            used[code] = (1, invite)
+    return used
+
+
+class _JoinBurst:
+    __slots__ = ("member_ids", "future", "started", "last_join")
+
+    def __init__(self) -> None:
+        self.member_ids: t.List[int] = []
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.started = self.last_join = time.monotonic()
+
+
+class InviteTracker:
+    """Invite snapshots of every guild and the attribution of the members joining them."""
+
+    def __init__(self, debounce: float, max_wait: float, retries: int = 0, retry_delay: float = 0.0) -> None:
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.snapshots: t.Dict[int, Snapshot] = {}
+        self._deleted: t.Dict[int, Snapshot] = {}
+        self._bursts: t.Dict[int, _JoinBurst] = {}
+        self._locks: t.Dict[int, asyncio.Lock] = {}
+
+    def _lock(self, guild_id: int) -> asyncio.Lock:
+        lock = self._locks.get(guild_id)
+        if lock is None:
+            lock = self._locks[guild_id] = asyncio.Lock()
+        return lock
+
+    async def refresh(self, guild: discord.Guild) -> t.Optional[Snapshot]:
+        """Fetch the invites of the guild into a new snapshot. None when they couldn't be fetched."""
+        async with self._lock(guild.id):
+            return await self._refresh(guild)
+
+    async def _refresh(self, guild: discord.Guild) -> t.Optional[Snapshot]:
+        for attempt in range(self.retries + 1):
+            try:
+                invites = await guild.invites()
+                break
+            except discord.Forbidden:
+                log.debug(f"Not allowed to fetch the invites of guild {guild.id}, dropping its snapshot")
+                self.snapshots.pop(guild.id, None)
+                return None
+            except discord.HTTPException:
+                if attempt == self.retries:
+                    log.debug(f"Could not fetch the invites of guild {guild.id}, keeping its snapshot", exc_info=True)
+                    return None
+                await asyncio.sleep(self.retry_delay * 2**attempt)
+
+        snapshot = {invite.code: snapshot_of(invite) for invite in invites}
+        self.snapshots[guild.id] = snapshot
+        return snapshot
+
+    def invite_created(self, invite: discord.Invite) -> None:
+        snapshot = self.snapshots.get(invite.guild.id)
+        if snapshot is not None:
+            snapshot[invite.code] = snapshot_of(invite)
+
+    def invite_deleted(self, invite: discord.Invite) -> None:
+        snapshot = self.snapshots.get(invite.guild.id)
+        previous = snapshot.pop(invite.code, None) if snapshot is not None else None
+        if previous is not None:
+            # Kept until the next join fetch, the invite may have been used up by a join
+            self._deleted.setdefault(invite.guild.id, {})[invite.code] = previous
+
+    async def member_joined(self, member: discord.Member) -> t.Optional[int]:
+        """The ID of the member who invited `member`, or None if it can't be told apart."""
+        guild_id = member.guild.id
+        burst = self._bursts.get(guild_id)
+        if burst is None:
+            burst = self._bursts[guild_id] = _JoinBurst()
+            asyncio.create_task(self._attribute(member.guild, burst), name=f"invite-attribution-{guild_id}")
+
+        burst.member_ids.append(member.id)
+        burst.last_join = time.monotonic()
+        attribution = await asyncio.shield(burst.future)
+        return attribution.get(member.id)
+
+    async def _attribute(self, guild: discord.Guild, burst: _JoinBurst) -> None:
+        try:
+            while True:
+                now = time.monotonic()
+                wait = min(burst.last_join + self.debounce, burst.started + self.max_wait) - now
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+
+            # Members joining from now on start a new burst
+            del self._bursts[guild.id]
+            burst.future.set_result(await self._attribute_burst(guild, burst.member_ids))
+        except Exception:
+            if self._bursts.get(guild.id) is burst:
+                del self._bursts[guild.id]
+            log.warning(f"Could not attribute {len(burst.member_ids)} joins of guild {guild.id}", exc_info=True)
+            if not burst.future.done():
+                burst.future.set_result({})
+
+    async def _attribute_burst(self, guild: discord.Guild, member_ids: t.List[int]) -> t.Dict[int, int]:
+        async with self._lock(guild.id):
+            before = self.snapshots.get(guild.id)
+            deleted = self._deleted.pop(guild.id, {})
+            after = await self._refresh(guild)
+            if after is None and guild.id in self.snapshots:
+                # The old snapshot is kept, the next fetch needs the invites deleted since too
+                self._deleted[guild.id] = {**deleted, **self._deleted.get(guild.id, {})}
+        if before is None or after is None:
+            return {}
+
+        used = used_invites(before, after, deleted)
+        invites: t.Dict[int, int] = {}
+        for count, invite in used.values():
+            if invite.inviter_id is not None:
+                invites[invite.inviter_id] = invites.get(invite.inviter_id, 0) + count
+        await Invite.add_invites(guild.id, invites)
+
+        # Members can only be told apart when every join of the burst came through invites of one inviter
+        if len(invites) == 1 and sum(count for count, _ in used.values()) == len(member_ids):
+            inviter_id = next(iter(invites))
+            return {member_id: inviter_id for member_id in member_ids}
+        return {}
+
+
+invite_tracker = InviteTracker(
+    constants.Invites.join_debounce,
+    constants.Invites.join_max_wait,
+    constants.Invites.refresh_retries,
+    constants.Invites.refresh_retry_delay,
+)
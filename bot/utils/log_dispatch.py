@@ -0,0 +1,185 @@
+"""
+Coalesced delivery of the log channel embeds.
+
+A raid or a channel purge logs hundreds of events within seconds, and one message per event
+is one REST call each, all on the same rate-limited route. `LogDispatcher` buffers the embeds
+of each log channel instead, and sends them packed `Logs.max_embeds` (and `Logs.max_chars`
+characters) to a message: as soon as a message is full, or `Logs.coalesce_window` seconds
+after the first embed was buffered, which bounds the latency of a log entry.
+
+Entries with a content (a ping) or files are sent in their own message, right after the
+embeds buffered before them. The messages go through the channel's send queue of
+`bot.utils.send_queue`, which sends them in order.
+
+With `Logs.webhooks` set, the messages are posted through a `WebhookPool` of the channel
+instead, or by the bot where its webhooks can't be set up.
+"""
+
+import asyncio
+import functools
+import typing as t
+import discord
+from bot import constants
+from bot.log import get_logger
+from bot.utils.send_queue import SendQueues, send_queues
+from bot.utils.webhooks import WebhookPool
+
+log = get_logger(__name__)
+
+
+class _ChannelBuffer:
+    __slots__ = ("channel", "embeds", "waiters", "chars", "timer")
+
+    def __init__(self, channel: discord.abc.Messageable) -> None:
+        self.channel = channel
+        self.embeds: t.List[discord.Embed] = []
+        # Futures of the entries whose first embed is in `embeds`
+        self.waiters: t.List[asyncio.Future] = []
+        self.chars = 0
+        self.timer: t.Optional[asyncio.TimerHandle] = None
+
+
+class LogDispatcher:
+    """Per-channel buffers of log embeds, sent several to a message."""
+
+    def __init__(self, *, window: float, max_embeds: int, max_chars: int, queues: SendQueues) -> None:
+        self.window = window
+        self.max_embeds = max_embeds
+        self.max_chars = max_chars
+        self.entries = 0
+        self.messages = 0
+        self.queues = queues
+        self.webhooks: t.Optional[WebhookPool] = None
+
+        self._buffers: t.Dict[int, _ChannelBuffer] = {}
+        self._unsent: t.Set[asyncio.Future] = set()
+
+    def _buffer(self, channel: discord.abc.Messageable) -> _ChannelBuffer:
+        buffer = self._buffers.get(channel.id)
+        if buffer is None:
+            buffer = self._buffers[channel.id] = _ChannelBuffer(channel)
+        else:
+            buffer.channel = channel
+        return buffer
+
+    def send(
+        self,
+        channel: discord.abc.Messageable,
+        embeds: t.Sequence[discord.Embed],
+        *,
+        content: t.Optional[str] = None,
+        files: t.Optional[t.List[discord.File]] = None,
+    ) -> "asyncio.Future[discord.Message]":
+        """
+        Queue a log entry for `channel`.
+
+        Returns a future of the message its first embed was sent in, or of None when it could not be sent.
+        """
+        self.entries += 1
+        future = asyncio.get_running_loop().create_future()
+        buffer = self._buffer(channel)
+
+        if content or files:
+            self._flush(buffer)
+            self._deliver(buffer, list(embeds), [future], content=content, files=files)
+            return future
+
+        waiters = [future]
+        for embed in embeds:
+            size = len(embed)
+            if buffer.embeds and (len(buffer.embeds) >= self.max_embeds or buffer.chars + size > self.max_chars):
+                self._flush(buffer)
+            buffer.embeds.append(embed)
+            buffer.chars += size
+            buffer.waiters.extend(waiters)
+            waiters = []
+
+        if len(buffer.embeds) >= self.max_embeds:
+            self._flush(buffer)
+        elif buffer.embeds and buffer.timer is None:
+            buffer.timer = asyncio.get_running_loop().call_later(self.window, self._flush, buffer)
+        return future
+
+    def _flush(self, buffer: _ChannelBuffer) -> None:
+        """Hand the buffered embeds of a channel to its send queue."""
+        if buffer.timer is not None:
+            buffer.timer.cancel()
+            buffer.timer = None
+        if not buffer.embeds:
+            return
+
+        embeds, waiters = buffer.embeds, buffer.waiters
+        buffer.embeds, buffer.waiters, buffer.chars = [], [], 0
+        self._deliver(buffer, embeds, waiters)
+
+    def _deliver(
+        self,
+        buffer: _ChannelBuffer,
+        embeds: t.List[discord.Embed],
+        waiters: t.List[asyncio.Future],
+        **kwargs: t.Any,
+    ) -> None:
+        done = asyncio.get_running_loop().create_future()
+        waiters.append(done)
+        self._unsent.add(done)
+        done.add_done_callback(self._unsent.discard)
+
+        send = functools.partial(self._send, buffer.channel, embeds, waiters, **kwargs)
+        self.queues.enqueue(buffer.channel, send, on_drop=functools.partial(_resolve, waiters, None))
+
+    async def _send(
+        self,
+        channel: discord.abc.Messageable,
+        embeds: t.List[discord.Embed],
+        waiters: t.List[asyncio.Future],
+        **kwargs: t.Any,
+    ) -> None:
+        message = None
+        try:
+            # Only loops for entries sent on their own, as the buffers are flushed when full
+            for start in range(0, max(len(embeds), 1), self.max_embeds):
+                sent = await self._post(channel, embeds=embeds[start : start + self.max_embeds], **kwargs)
+                kwargs = {}
+                message = message or sent
+                self.messages += 1
+        finally:
+            # Failures are logged by the send queue
+            _resolve(waiters, message)
+
+    async def _post(self, channel: discord.abc.Messageable, **kwargs: t.Any) -> discord.Message:
+        webhooks = self.webhooks
+        if webhooks is not None and isinstance(channel, discord.TextChannel) and webhooks.usable(channel.id):
+            try:
+                return await webhooks.send(channel, **kwargs)
+            except discord.HTTPException:
+                # A send that failed through a webhook is not sent again by the bot
+                if webhooks.usable(channel.id):
+                    raise
+        return await channel.send(**kwargs)
+
+    async def flush(self) -> None:
+        """Send everything buffered and wait for it to be sent."""
+        for buffer in self._buffers.values():
+            self._flush(buffer)
+        if self._unsent:
+            await asyncio.wait(set(self._unsent))
+
+    def close(self) -> None:
+        """Hand everything buffered to the send queues, which are drained when they close."""
+        for buffer in self._buffers.values():
+            self._flush(buffer)
+        self._buffers.clear()
+
+
+def _resolve(waiters: t.List[asyncio.Future], message: t.Optional[discord.Message]) -> None:
+    for waiter in waiters:
+        if not waiter.done():
+            waiter.set_result(message)
+
+
+log_dispatcher = LogDispatcher(
+    window=constants.Logs.coalesce_window,
+    max_embeds=constants.Logs.max_embeds,
+    max_chars=constants.Logs.max_chars,
+    queues=send_queues,
+)
@@ -0,0 +1,437 @@
+"""
+The recent messages of the guilds, for the message log to show what an edited message said before.
+
+The bot's own message cache holds `max_messages` whole `discord.Message` objects, and a message
+edited after it was evicted used to be fetched back through the API. `message_store` keeps the
+few fields the message log shows for many more messages, so an edit of an uncached message is
+logged from the gateway payload and the stored content alone.
+
+`FetchBudget` is what is left of the API fetches: a token bucket per channel, for the payloads
+that don't hold the message, so a burst of those can't spend the bot's rate limits.
+
+Guilds can opt in (the `messagestore` command) to keep their messages in `message_archive` too,
+a SQLite database on disk, so the messages of the last `Messages.archive_retention` seconds
+survive the in-memory LRU and restarts. Messages are looked up by id, the table's integer
+primary key, many at once for a transcript, and written in batches every
+`Messages.archive_flush_interval` seconds; both run in worker threads. A batch that fails to be
+written is kept for the next flush, up to `Messages.archive_max_backlog` messages, past which the
+oldest are dropped. Content is zlib-compressed when that makes it smaller. Every
+`Messages.archive_maintenance_interval` seconds the messages past the retention window are
+deleted, a range of primary keys as message ids are snowflakes, and so are the least recently
+used ones over `Messages.archive_max_messages`. The memory it takes is capped by the page
+cache size and the writes waiting for a flush. The database is only opened once a guild opted in.
+"""
+
+import asyncio
+import itertools
+import json
+import sqlite3
+import time
+import typing as t
+import zlib
+from datetime import datetime, timedelta, timezone
+import discord
+from discord.utils import snowflake_time, time_snowflake
+from bot import constants
+from bot.log import get_logger
+from bot.utils.cache import LRUCache
+
+log = get_logger(__name__)
+
+# Content shorter than this rarely compresses
+COMPRESS_FROM = 64
+
+# Ids per lookup, under SQLite's limit of 999 parameters before 3.32
+READ_BATCH = 500
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS message (
+        id INTEGER PRIMARY KEY,
+        guild_id INTEGER NOT NULL,
+        channel_id INTEGER NOT NULL,
+        author_id INTEGER NOT NULL,
+        content BLOB NOT NULL,
+        attachments TEXT NOT NULL,
+        edited_at REAL,
+        used_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS message_used_at ON message (used_at);
+    CREATE INDEX IF NOT EXISTS message_guild_id ON message (guild_id);
+"""
+
+
+class StoredMessage:
+    """What the message log shows of a message: its author, channel, content and timestamps."""
+
+    __slots__ = ("id", "guild_id", "channel_id", "author_id", "content", "attachments", "created_at", "edited_at")
+
+    def __init__(
+        self,
+        id: int,
+        guild_id: int,
+        channel_id: int,
+        author_id: int,
+        content: str,
+        attachments: t.Tuple[str, ...],
+        created_at: datetime,
+        edited_at: t.Optional[datetime],
+    ) -> None:
+        self.id = id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.author_id = author_id
+        self.content = content
+        self.attachments = attachments
+        self.created_at = created_at
+        self.edited_at = edited_at
+
+    @classmethod
+    def from_message(cls, message: discord.Message) -> "StoredMessage":
+        return cls(
+            message.id,
+            message.guild.id,
+            message.channel.id,
+            message.author.id,
+            message.clean_content,
+            tuple(attachment.filename for attachment in message.attachments),
+            message.created_at,
+            message.edited_at,
+        )
+
+
+def pack(content: str) -> bytes:
+    """Encode `content`, compressed when that makes it smaller, behind a one byte flag."""
+    data = content.encode()
+    if len(data) >= COMPRESS_FROM:
+        compressed = zlib.compress(data)
+        if len(compressed) < len(data):
+            return b"\x01" + compressed
+    return b"\x00" + data
+
+
+def unpack(data: bytes) -> str:
+    if data[:1] == b"\x01":
+        return zlib.decompress(data[1:]).decode()
+    return data[1:].decode()
+
+
+def _from_row(row: tuple) -> StoredMessage:
+    id_, guild_id, channel_id, author_id, content, attachments, edited_at, _ = row
+    return StoredMessage(
+        id_,
+        guild_id,
+        channel_id,
+        author_id,
+        unpack(content),
+        tuple(json.loads(attachments)),
+        snowflake_time(id_),
+        datetime.fromtimestamp(edited_at, timezone.utc) if edited_at else None,
+    )
+
+
+class MessageArchive:
+    """The stored messages of the guilds that opted in, in a SQLite database on disk."""
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        retention: float,
+        max_messages: int,
+        flush_interval: float,
+        max_pending: int,
+        max_backlog: int,
+        maintenance_interval: float,
+        cache_kib: int,
+    ) -> None:
+        self.path = path
+        self.retention = retention
+        self.max_messages = max_messages
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_backlog = max_backlog
+        self.maintenance_interval = maintenance_interval
+        self.cache_kib = cache_kib
+        self.flushed = 0
+        self.expired = 0
+        self.evicted = 0
+        self.dropped = 0
+
+        self._reader: t.Optional[sqlite3.Connection] = None
+        self._writer: t.Optional[sqlite3.Connection] = None
+        self._pending: t.Dict[int, tuple] = {}
+        self._writing: t.Dict[int, tuple] = {}
+        self._touched: t.Dict[int, float] = {}
+        # The guilds whose messages are deleted with the next flush, and the number of their purge
+        self._purged: t.Dict[int, int] = {}
+        self._purges = 0
+        self._maintained_at = 0.0
+        self._wakeup: t.Optional[asyncio.Event] = None
+        self._lock = asyncio.Lock()
+        # Held while a worker thread reads, so that close() never closes the reader under it
+        self._reading = asyncio.Lock()
+        self._task: t.Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute(f"PRAGMA cache_size = -{int(self.cache_kib)}")
+        return connection
+
+    def open(self) -> None:
+        if self._writer is None:
+            self._writer = self._connect()
+            self._writer.executescript(_SCHEMA)
+            self._reader = self._connect()
+
+    def add(self, message: StoredMessage) -> None:
+        """Queue `message` to be written, or rewritten with its new content."""
+        if self._writer is None:
+            return
+
+        self._pending[message.id] = (
+            message.id,
+            message.guild_id,
+            message.channel_id,
+            message.author_id,
+            pack(message.content),
+            json.dumps(message.attachments),
+            message.edited_at.timestamp() if message.edited_at else None,
+            time.time(),
+        )
+        if len(self._pending) >= self.max_pending and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def get(self, message_id: int) -> t.Optional[StoredMessage]:
+        """Return the stored message `message_id`, if it is kept and within the retention window."""
+        return (await self.get_many([message_id])).get(message_id)
+
+    async def get_many(self, message_ids: t.Iterable[int]) -> t.Dict[int, StoredMessage]:
+        """Return the stored messages of `message_ids` that are kept and within the retention window, by id."""
+        oldest = time.time() - self.retention
+        rows = {}
+        missing = []
+        for message_id in message_ids:
+            if snowflake_time(message_id).timestamp() < oldest:
+                continue
+            # The rows in hand were all added after their guild's last purge
+            row = self._pending.get(message_id) or self._writing.get(message_id)
+            if row is not None:
+                rows[message_id] = row
+            else:
+                missing.append(message_id)
+
+        if missing and self._reader is not None:
+            async with self._reading:
+                if self._reader is not None:
+                    read = await asyncio.to_thread(self._read, missing)
+                    rows.update((row[0], row) for row in read if row[1] not in self._purged)
+
+        now = time.time()
+        for message_id in rows:
+            self._touched[message_id] = now
+        return {message_id: _from_row(row) for message_id, row in rows.items()}
+
+    def _read(self, message_ids: t.List[int]) -> t.List[tuple]:
+        """Read the rows of `message_ids`, in a worker thread."""
+        rows = []
+        for start in range(0, len(message_ids), READ_BATCH):
+            batch = message_ids[start : start + READ_BATCH]
+            placeholders = ", ".join("?" * len(batch))
+            rows += self._reader.execute(f"SELECT * FROM message WHERE id IN ({placeholders})", batch).fetchall()
+        return rows
+
+    def purge(self, guild_id: int) -> None:
+        """
+        Forget the messages of `guild_id`, when it opts out.
+
+        The messages on disk are deleted with the next flush, before the batch is inserted, so the
+        guild's messages stored after it opts back in are kept.
+        """
+        self._pending = {id_: row for id_, row in self._pending.items() if row[1] != guild_id}
+        self._writing = {id_: row for id_, row in self._writing.items() if row[1] != guild_id}
+        self._purges += 1
+        self._purged[guild_id] = self._purges
+
+    def start(self) -> None:
+        """Open the database and start the flush task, once a guild opted in."""
+        self.open()
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="message-archive")
+
+    async def close(self) -> None:
+        """Stop the flush task, write the pending messages and close the database."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writer is not None:
+            await self.flush()
+            async with self._reading:
+                self._writer.close()
+                self._reader.close()
+                self._writer = self._reader = None
+
+    async def flush(self) -> None:
+        # One batch at a time, as close() flushes while the task may still be flushing
+        async with self._lock:
+            if self._writer is None or not (self._pending or self._touched or self._purged):
+                return
+
+            rows, touched, purged = list(self._pending.values()), list(self._touched.items()), dict(self._purged)
+            # Still found by get() until they are committed
+            self._writing, self._pending, self._touched = self._pending, {}, {}
+            maintain = time.monotonic() - self._maintained_at >= self.maintenance_interval
+            try:
+                await asyncio.to_thread(self._write, rows, touched, purged, maintain)
+            except Exception:
+                # Put them back ahead of the newer rows, they are written with the next flush
+                self._pending = {**{row[0]: row for row in rows}, **self._pending}
+                log.warning(f"Could not write {len(rows)} messages to the message archive", exc_info=True)
+                self._drop_backlog()
+            else:
+                # Unless the guild opted out again while the batch was written
+                for guild_id, purge in purged.items():
+                    if self._purged.get(guild_id) == purge:
+                        del self._purged[guild_id]
+                self.flushed += len(rows)
+                if maintain:
+                    self._maintained_at = time.monotonic()
+            finally:
+                self._writing = {}
+
+    def _drop_backlog(self) -> None:
+        """Drop the oldest rows waiting for a flush past `max_backlog`, while writes keep failing."""
+        excess = len(self._pending) - self.max_backlog
+        if excess <= 0:
+            return
+
+        for message_id in list(itertools.islice(self._pending, excess)):
+            del self._pending[message_id]
+        self.dropped += excess
+        log.warning(f"Dropped the {excess} oldest messages waiting for the message archive")
+
+    def _write(
+        self, rows: t.List[tuple], touched: t.List[t.Tuple[int, float]], purged: t.Iterable[int], maintain: bool
+    ) -> None:
+        """Write a batch in one transaction, in a worker thread."""
+        with self._writer as connection:
+            connection.executemany("DELETE FROM message WHERE guild_id = ?", [(guild_id,) for guild_id in purged])
+            connection.executemany("INSERT OR REPLACE INTO message VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            connection.executemany("UPDATE message SET used_at = ? WHERE id = ?", [(at, id_) for id_, at in touched])
+            if not maintain:
+                return
+
+            cutoff = time_snowflake(datetime.now(timezone.utc) - timedelta(seconds=self.retention))
+            self.expired += connection.execute("DELETE FROM message WHERE id < ?", (cutoff,)).rowcount
+            (count,) = connection.execute("SELECT count(*) FROM message").fetchone()
+            if count > self.max_messages:
+                self.evicted += connection.execute(
+                    "DELETE FROM message WHERE id IN (SELECT id FROM message ORDER BY used_at LIMIT ?)",
+                    (count - self.max_messages,),
+                ).rowcount
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await asyncio.shield(self.flush())
+
+
+class MessageStore:
+    """The last `maxsize` messages seen, by id, for `ttl` seconds, and those of `archive`."""
+
+    def __init__(self, maxsize: int, ttl: float, archive: t.Optional[MessageArchive] = None) -> None:
+        self._messages = LRUCache(maxsize, ttl)
+        self.archive = archive
+        self.hits = 0
+        self.archive_hits = 0
+        self.misses = 0
+
+    def add(self, message: discord.Message, *, persist: bool = False) -> None:
+        """Store `message`, or its new content if it is already stored, on disk too if `persist` is set."""
+        stored = StoredMessage.from_message(message)
+        self._messages.set(message.id, stored)
+        if persist and self.archive is not None:
+            self.archive.add(stored)
+
+    async def get(self, message_id: int) -> t.Optional[StoredMessage]:
+        return (await self.get_many([message_id])).get(message_id)
+
+    async def get_many(self, message_ids: t.Iterable[int]) -> t.Dict[int, StoredMessage]:
+        """Return the stored messages of `message_ids` by id, looking up those not in memory on disk at once."""
+        found = {}
+        missing = []
+        for message_id in message_ids:
+            stored = self._messages.get(message_id)
+            if stored is not None:
+                found[message_id] = stored
+            else:
+                missing.append(message_id)
+        self.hits += len(found)
+
+        archived = await self.archive.get_many(missing) if missing and self.archive is not None else {}
+        for message_id, stored in archived.items():
+            self._messages.set(message_id, stored)
+        found.update(archived)
+        self.archive_hits += len(archived)
+        self.misses += len(missing) - len(archived)
+        return found
+
+    def discard(self, message_id: int) -> None:
+        self._messages.pop(message_id)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+
+class FetchBudget:
+    """A token bucket per channel: `rate` fetches, refilled evenly over `per` seconds."""
+
+    def __init__(self, rate: int, per: float) -> None:
+        self.rate = rate
+        self.per = per
+        self.granted = 0
+        self.denied = 0
+        self._buckets: t.Dict[int, t.Tuple[float, float]] = {}
+
+    def take(self, channel_id: int) -> bool:
+        """Spend a fetch in `channel_id`, return False if its budget is spent."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(channel_id, (self.rate, now))
+        tokens = min(self.rate, tokens + (now - updated) * self.rate / self.per)
+
+        if tokens < 1:
+            self._buckets[channel_id] = (tokens, now)
+            self.denied += 1
+            return False
+
+        self._buckets[channel_id] = (tokens - 1, now)
+        self.granted += 1
+        return True
+
+
+message_archive = MessageArchive(
+    constants.Messages.archive_path,
+    retention=constants.Messages.archive_retention,
+    max_messages=constants.Messages.archive_max_messages,
+    flush_interval=constants.Messages.archive_flush_interval,
+    max_pending=constants.Messages.archive_max_pending,
+    max_backlog=constants.Messages.archive_max_backlog,
+    maintenance_interval=constants.Messages.archive_maintenance_interval,
+    cache_kib=constants.Messages.archive_cache_kib,
+)
+message_store = MessageStore(constants.Messages.max_messages, constants.Messages.ttl, message_archive)
+fetch_budget = FetchBudget(constants.Messages.fetch_budget, constants.Messages.fetch_period)
@@ -0,0 +1,124 @@
+"""
+CPU-bound work off the event loop, and a measure of how late the loop runs.
+
+`offload.run(func, *args, size=n)` calls `func` inline when its input is smaller than
+`Offload.threshold`, where a round trip to a worker would cost more than the call itself,
+and in a pool of `Offload.workers` threads (or processes, with `Offload.mode = "process"`)
+otherwise. At most `Offload.max_pending` calls wait for the pool, the next ones wait to be
+submitted, so a burst of large edits can't queue unbounded work.
+
+Threads still share the GIL with the loop, but the interpreter switches back to it every few
+milliseconds, where an inline call holds it until it returns. Processes take the work off
+the GIL entirely, for functions and arguments that can be pickled.
+
+`loop_lag` wakes up every `Offload.lag_interval` seconds and records how late it woke up,
+which is how long the loop was blocked.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import time
+import typing as t
+from bot import constants
+from bot.log import get_logger
+
+log = get_logger(__name__)
+
+T = t.TypeVar("T")
+
+
+class Offloader:
+    """Runs large CPU-bound calls in a bounded pool, and small ones inline."""
+
+    def __init__(self, *, mode: str, workers: int, threshold: int, max_pending: int) -> None:
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown offload mode {mode!r}, expected 'thread' or 'process'")
+        self.mode = mode
+        self.workers = workers
+        self.threshold = threshold
+        self.inline = 0
+        self.offloaded = 0
+        self.offload_time = 0.0
+
+        self._pool: t.Optional[concurrent.futures.Executor] = None
+        self._slots = asyncio.Semaphore(max_pending)
+
+    def _executor(self) -> concurrent.futures.Executor:
+        if self._pool is None:
+            if self.mode == "process":
+                self._pool = concurrent.futures.ProcessPoolExecutor(self.workers)
+            else:
+                self._pool = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="offload")
+        return self._pool
+
+    async def run(self, func: t.Callable[..., T], *args: t.Any, size: int) -> T:
+        """Return `func(*args)`, computed in the pool when `size` reaches the threshold."""
+        if size < self.threshold:
+            self.inline += 1
+            return func(*args)
+
+        async with self._slots:
+            start = time.perf_counter()
+            result = await asyncio.get_running_loop().run_in_executor(self._executor(), functools.partial(func, *args))
+            self.offloaded += 1
+            self.offload_time += time.perf_counter() - start
+            return result
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class LoopLag:
+    """How late a periodic wake-up of the event loop runs, as a measure of how long it is blocked."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.last = 0.0
+        self.max = 0.0
+        self.total = 0.0
+        self.samples = 0
+        self._task: t.Optional[asyncio.Task] = None
+
+    @property
+    def avg(self) -> float:
+        return self.total / self.samples if self.samples else 0.0
+
+    def record(self, lag: float) -> None:
+        self.last = lag
+        self.max = max(self.max, lag)
+        self.total += lag
+        self.samples += 1
+
+    def reset(self) -> None:
+        self.last = self.max = self.total = 0.0
+        self.samples = 0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="loop-lag")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+            self.record(max(lag, 0.0))
+            if lag > 1.0:
+                log.warning(f"The event loop was blocked for {lag:.1f}s")
+
+
+offload = Offloader(
+    mode=constants.Offload.mode,
+    workers=constants.Offload.workers,
+    threshold=constants.Offload.threshold,
+    max_pending=constants.Offload.max_pending,
+)
+loop_lag = LoopLag(constants.Offload.lag_interval)
@@ -239,13 +239,6 @@ class LinePaginator(Paginator):
         paginator = cls(
             prefix=prefix, suffix=suffix, max_size=max_size, max_lines=max_lines, scale_to_size=scale_to_size
         )
-        current_page = 0
-
-        if not restrict_to_user:
-            if isinstance(ctx, discord.Interaction):
-                restrict_to_user = ctx.user
-            else:
-                restrict_to_user = ctx.author
 
         if not lines:
             if exception_on_empty_embed:
@@ -267,42 +260,125 @@ class LinePaginator(Paginator):
 
         log.debug(f"Paginator created with {len(paginator.pages)} pages")
 
-        embed.description = paginator.pages[current_page]
+        return await cls._paginate_pages(
+            _ListPages(paginator.pages),
+            ctx,
+            embed,
+            restrict_to_user=restrict_to_user,
+            timeout=timeout,
+            footer_text=footer_text,
+            url=url,
+        )
+
+    @classmethod
+    async def paginate_stream(
+        cls,
+        lines: t.AsyncIterator[str],
+        ctx: Context | discord.Interaction,
+        embed: discord.Embed,
+        prefix: str = "",
+        suffix: str = "",
+        max_lines: t.Optional[int] = None,
+        max_size: int = 500,
+        scale_to_size: int = 4000,
+        empty: bool = True,
+        restrict_to_user: User = None,
+        timeout: int = 300,
+        footer_text: str = None,
+        url: str = None,
+    ) -> t.Optional[discord.Message]:
+        """
+        Like `paginate`, but pull the lines from an async iterator only as the pages are flipped.
+
+        Pages are built one ahead of the page shown, so a query feeding `lines` (e.g. one page of
+        `BaseModel.iter_pages`) is only run when the user reaches it. The total is unknown until the
+        iterator is exhausted, so there is no last page reaction and the footer reads "Page n/?".
+        Example:
+        >>> async def warn_lines():
+        ...     async for page in Warns.iter_pages(guild_id=guild.id, target_id=member.id):
+        ...         for warn in page:
+        ...             yield f"**{warn.warn_id}** {warn.reason}"
+        >>> await LinePaginator.paginate_stream(warn_lines(), ctx, embed)
+        """
+        paginator = cls(
+            prefix=prefix, suffix=suffix, max_size=max_size, max_lines=max_lines, scale_to_size=scale_to_size
+        )
+        pages = _StreamPages(paginator, lines, empty)
+
+        if not await pages.fetch(0):
+            log.debug("No lines to add to paginator, adding '(nothing to display)' message")
+            paginator.add_line("*(nothing to display)*", empty=empty)
+            paginator.close_page()
+
+        return await cls._paginate_pages(
+            pages,
+            ctx,
+            embed,
+            restrict_to_user=restrict_to_user,
+            timeout=timeout,
+            footer_text=footer_text,
+            url=url,
+        )
+
+    @staticmethod
+    async def _paginate_pages(
+        pages: t.Union["_ListPages", "_StreamPages"],
+        ctx: Context | discord.Interaction,
+        embed: discord.Embed,
+        *,
+        restrict_to_user: t.Optional[User],
+        timeout: int,
+        footer_text: t.Optional[str],
+        url: t.Optional[str],
+    ) -> t.Optional[discord.Message]:
+        """Send the first of `pages`, and switch pages with reactions until they time out, see `paginate`."""
+        current_page = 0
+
+        if not restrict_to_user:
+            if isinstance(ctx, discord.Interaction):
+                restrict_to_user = ctx.user
+            else:
+                restrict_to_user = ctx.author
+
+        def set_footer() -> None:
+            total = pages.total or "?"
+            if footer_text:
+                embed.set_footer(text=f"{footer_text} (Page {current_page + 1}/{total})")
+            else:
+                embed.set_footer(text=f"Page {current_page + 1}/{total}")
+            log.trace(f"Setting embed footer to '{embed.footer.text}'")
 
-        if len(paginator.pages) <= 1:
+        embed.description = pages[current_page]
+
+        if url:
+            embed.url = url
+            log.trace(f"Setting embed url to '{url}'")
+
+        if not await pages.fetch(1):
             if footer_text:
                 embed.set_footer(text=footer_text)
                 log.trace(f"Setting embed footer to '{footer_text}'")
 
-            if url:
-                embed.url = url
-                log.trace(f"Setting embed url to '{url}'")
-
             log.debug("There's less than two pages, so we won't paginate - sending single page on its own")
             if isinstance(ctx, discord.Interaction):
                 return await ctx.response.send_message(embed=embed)
             return await ctx.send(embed=embed)
-        else:
-            if footer_text:
-                embed.set_footer(text=f"{footer_text} (Page {current_page + 1}/{len(paginator.pages)})")
-            else:
-                embed.set_footer(text=f"Page {current_page + 1}/{len(paginator.pages)}")
-            log.trace(f"Setting embed footer to '{embed.footer.text}'")
 
-            if url:
-                embed.url = url
-                log.trace(f"Setting embed url to '{url}'")
+        set_footer()
+        log.debug("Sending first page to channel...")
+        if isinstance(ctx, discord.Interaction):
+            await ctx.response.send_message(embed=embed)
+            message = await ctx.original_response()
+        else:
+            message = await ctx.send(embed=embed)
 
-            log.debug("Sending first page to channel...")
-            if isinstance(ctx, discord.Interaction):
-                await ctx.response.send_message(embed=embed)
-                message = await ctx.original_response()
-            else:
-                message = await ctx.send(embed=embed)
+        # There is no last page to jump to while the total is unknown
+        pagination_emoji = tuple(
+            emoji for emoji in PAGINATION_EMOJI if emoji != LAST_EMOJI or pages.total is not None
+        )
 
         log.debug("Adding emoji reactions to message...")
-
-        for emoji in PAGINATION_EMOJI:
+        for emoji in pagination_emoji:
             # Add all the applicable emoji to the message
             log.trace(f"Adding reaction: {repr(emoji)}")
             await message.add_reaction(emoji)
@@ -310,16 +386,14 @@ class LinePaginator(Paginator):
         check = partial(
             reaction_check,
             message_id=message.id,
-            allowed_emoji=PAGINATION_EMOJI,
+            allowed_emoji=pagination_emoji,
             allowed_users=(restrict_to_user.id,),
         )
+        client = ctx.client if isinstance(ctx, discord.Interaction) else ctx.bot
 
         while True:
             try:
-                if isinstance(ctx, discord.Interaction):
-                    reaction, user = await ctx.client.wait_for("reaction_add", timeout=timeout, check=check)
-                else:
-                    reaction, user = await ctx.bot.wait_for("reaction_add", timeout=timeout, check=check)
+                reaction, user = await client.wait_for("reaction_add", timeout=timeout, check=check)
                 log.trace(f"Got reaction: {reaction}")
             except asyncio.TimeoutError:
                 log.debug("Timed out waiting for a reaction")
@@ -328,51 +402,48 @@ class LinePaginator(Paginator):
             if str(reaction.emoji) == DELETE_EMOJI:
                 log.debug("Got delete reaction")
                 return await message.delete()
-            elif reaction.emoji in PAGINATION_EMOJI:
-                total_pages = len(paginator.pages)
-                try:
-                    await message.remove_reaction(reaction.emoji, user)
-                except discord.HTTPException as e:
-                    # Suppress if trying to act on an archived thread.
-                    if e.code != 50083:
-                        raise e
-
-                if reaction.emoji == FIRST_EMOJI:
-                    current_page = 0
-                    log.debug(f"Got first page reaction - changing to page 1/{total_pages}")
-                elif reaction.emoji == LAST_EMOJI:
-                    current_page = len(paginator.pages) - 1
-                    log.debug(f"Got last page reaction - changing to page {current_page + 1}/{total_pages}")
-                elif reaction.emoji == LEFT_EMOJI:
-                    if current_page <= 0:
-                        log.debug("Got previous page reaction, but we're on the first page - ignoring")
-                        continue
-
-                    current_page -= 1
-                    log.debug(f"Got previous page reaction - changing to page {current_page + 1}/{total_pages}")
-                elif reaction.emoji == RIGHT_EMOJI:
-                    if current_page >= len(paginator.pages) - 1:
-                        log.debug("Got next page reaction, but we're on the last page - ignoring")
-                        continue
-
-                    current_page += 1
-                    log.debug(f"Got next page reaction - changing to page {current_page + 1}/{total_pages}")
-
-                embed.description = paginator.pages[current_page]
-
-                if footer_text:
-                    embed.set_footer(text=f"{footer_text} (Page {current_page + 1}/{len(paginator.pages)})")
-                else:
-                    embed.set_footer(text=f"Page {current_page + 1}/{len(paginator.pages)}")
 
-                try:
-                    await message.edit(embed=embed)
-                except discord.HTTPException as e:
-                    if e.code == 50083:
-                        # Trying to act on an archived thread, just ignore and abort
-                        break
-                    else:
-                        raise e
+            try:
+                await message.remove_reaction(reaction.emoji, user)
+            except discord.HTTPException as e:
+                # Suppress if trying to act on an archived thread.
+                if e.code != 50083:
+                    raise e
+
+            if reaction.emoji == FIRST_EMOJI:
+                current_page = 0
+                log.debug("Got first page reaction - changing to page 1")
+            elif reaction.emoji == LAST_EMOJI:
+                current_page = pages.total - 1
+                log.debug(f"Got last page reaction - changing to page {current_page + 1}")
+            elif reaction.emoji == LEFT_EMOJI:
+                if current_page <= 0:
+                    log.debug("Got previous page reaction, but we're on the first page - ignoring")
+                    continue
+
+                current_page -= 1
+                log.debug(f"Got previous page reaction - changing to page {current_page + 1}")
+            elif reaction.emoji == RIGHT_EMOJI:
+                if not await pages.fetch(current_page + 1):
+                    log.debug("Got next page reaction, but we're on the last page - ignoring")
+                    continue
+
+                current_page += 1
+                # Keep one page ahead, so a stream knows whether there is a next one
+                await pages.fetch(current_page + 1)
+                log.debug(f"Got next page reaction - changing to page {current_page + 1}")
+
+            embed.description = pages[current_page]
+            set_footer()
+
+            try:
+                await message.edit(embed=embed)
+            except discord.HTTPException as e:
+                if e.code == 50083:
+                    # Trying to act on an archived thread, just ignore and abort
+                    break
+                else:
+                    raise e
 
         log.debug("Ending pagination and clearing reactions.")
         with suppress(discord.NotFound):
@@ -382,3 +453,54 @@ class LinePaginator(Paginator):
                 # Suppress if trying to act on an archived thread.
                 if e.code != 50083:
                     raise e
+
+
+class _ListPages:
+    """The pages of a filled paginator."""
+
+    def __init__(self, pages: t.List[str]) -> None:
+        self.pages = pages
+
+    @property
+    def total(self) -> int:
+        return len(self.pages)
+
+    async def fetch(self, page: int) -> bool:
+        """Return whether `page` exists."""
+        return page < len(self.pages)
+
+    def __getitem__(self, page: int) -> str:
+        return self.pages[page]
+
+
+class _StreamPages:
+    """The pages of a paginator filled from an async iterator of lines, as far as they are fetched."""
+
+    def __init__(self, paginator: LinePaginator, lines: t.AsyncIterator[str], empty: bool) -> None:
+        self.paginator = paginator
+        self.lines = lines
+        self.empty = empty
+        self.exhausted = False
+
+    @property
+    def total(self) -> t.Optional[int]:
+        """The number of pages, unknown until the lines are exhausted."""
+        return len(self.paginator._pages) if self.exhausted else None
+
+    async def fetch(self, page: int) -> bool:
+        """Pull lines until `page` is complete, return whether it exists."""
+        paginator = self.paginator
+        # `paginator.pages` would close the page being filled, so read the closed pages directly
+        while len(paginator._pages) <= page and not self.exhausted:
+            try:
+                line = await self.lines.__anext__()
+            except StopAsyncIteration:
+                self.exhausted = True
+                if paginator._linecount > 0:
+                    paginator.close_page()
+                break
+            paginator.add_line(line, empty=self.empty)
+        return len(paginator._pages) > page
+
+    def __getitem__(self, page: int) -> str:
+        return self.paginator._pages[page]
@@ -0,0 +1,210 @@
+"""
+Bounded per-channel send queues, for the messages the bot posts on its own (logs, automod notices).
+
+`send_queues.enqueue()` queues a send and returns immediately, so a listener never waits on a
+rate-limited channel. Each channel has one worker task sending its queue in order; at most
+`SendQueues.max_concurrency` sends run at once over all the channels.
+
+A queue holds `SendQueues.capacity` sends. When it is full the oldest one is dropped, and once
+the queue has drained a single notice tells the channel how many messages it lost.
+
+Every send waits out the rate limit bucket of its channel, as known from the `X-RateLimit-*`
+headers of its last failed send (`discord.HTTPException.response`). The responses of successful
+sends aren't seen: py-cord returns their message only, and honours their headers by holding the
+next request inside its HTTP client, where waiting callers pile up unbounded. Sends through a
+webhook have buckets of their own, which py-cord's webhook adapter waits out the same way.
+
+`metrics` counts the sends, drops and failures, the time spent queued and the queue depths.
+"""
+
+import asyncio
+import collections
+import time
+import typing as t
+import discord
+from bot import constants
+from bot.log import get_logger
+
+log = get_logger(__name__)
+
+Send = t.Callable[[], t.Awaitable[t.Any]]
+
+DROPPED_NOTICE = "{count} messages meant for this channel were dropped, as it was sending too slowly."
+
+
+class RateLimit:
+    """The state of a rate limit bucket, from the `X-RateLimit-*` headers of its last response."""
+
+    __slots__ = ("bucket", "remaining", "reset_at")
+
+    def __init__(self) -> None:
+        self.bucket: t.Optional[str] = None
+        self.remaining: t.Optional[int] = None
+        self.reset_at = 0.0  # time.monotonic() of the bucket reset
+
+    def update(self, headers: t.Mapping[str, str], status: int = 200) -> None:
+        self.bucket = headers.get("X-RateLimit-Bucket", self.bucket)
+        if status == 429:
+            # Retry-After also covers the global limit, which has no bucket headers
+            retry_after = headers.get("Retry-After") or headers.get("X-RateLimit-Reset-After")
+            self.remaining = 0
+            self.reset_at = time.monotonic() + float(retry_after or 1)
+            return
+
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        if remaining is not None and reset_after is not None:
+            self.remaining = int(remaining)
+            self.reset_at = time.monotonic() + float(reset_after)
+
+    def delay(self) -> float:
+        """Seconds to wait before the next request of the bucket."""
+        if self.remaining is None or self.remaining > 0:
+            return 0.0
+        return max(self.reset_at - time.monotonic(), 0.0)
+
+    def consume(self) -> None:
+        if self.remaining:
+            self.remaining -= 1
+
+
+class QueueMetrics:
+    """Throughput, drops and queueing delays of the send queues."""
+
+    __slots__ = ("enqueued", "sent", "failed", "dropped", "depth", "peak_depth", "wait_total", "wait_max")
+
+    def __init__(self) -> None:
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.depth = 0  # Sends waiting in all the queues
+        self.peak_depth = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def wait_avg(self) -> float:
+        done = self.sent + self.failed
+        return self.wait_total / done if done else 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+
+class _Pending(t.NamedTuple):
+    send: Send
+    enqueued_at: float
+    on_drop: t.Optional[t.Callable[[], None]]
+
+
+class _ChannelQueue:
+    __slots__ = ("channel", "items", "dropped", "rate_limit", "task")
+
+    def __init__(self, channel: discord.abc.Messageable) -> None:
+        self.channel = channel
+        self.items: t.Deque[_Pending] = collections.deque()
+        self.dropped = 0  # Since the last notice
+        self.rate_limit = RateLimit()
+        self.task: t.Optional[asyncio.Task] = None
+
+
+class SendQueues:
+    """A bounded send queue and its worker per channel, under a global concurrency cap."""
+
+    def __init__(self, *, capacity: int, max_concurrency: int) -> None:
+        self.capacity = capacity
+        self.metrics = QueueMetrics()
+        self._queues: t.Dict[int, _ChannelQueue] = {}
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    def depth(self, channel_id: int) -> int:
+        queue = self._queues.get(channel_id)
+        return len(queue.items) if queue is not None else 0
+
+    def _queue(self, channel: discord.abc.Messageable) -> _ChannelQueue:
+        queue = self._queues.get(channel.id)
+        if queue is None:
+            queue = self._queues[channel.id] = _ChannelQueue(channel)
+        else:
+            queue.channel = channel
+        return queue
+
+    def enqueue(
+        self, channel: discord.abc.Messageable, send: Send, *, on_drop: t.Optional[t.Callable[[], None]] = None
+    ) -> None:
+        """
+        Queue `send`, a coroutine function posting to `channel`, and return.
+
+        `on_drop` is called if the send is dropped from a full queue.
+        """
+        queue = self._queue(channel)
+        if len(queue.items) >= self.capacity:
+            self._drop(queue)
+
+        queue.items.append(_Pending(send, time.monotonic(), on_drop))
+        self.metrics.enqueued += 1
+        self.metrics.depth += 1
+        self.metrics.peak_depth = max(self.metrics.peak_depth, self.metrics.depth)
+
+        if queue.task is None or queue.task.done():
+            queue.task = asyncio.create_task(self._drain(queue), name=f"send-queue-{channel.id}")
+
+    def _drop(self, queue: _ChannelQueue) -> None:
+        pending = queue.items.popleft()
+        queue.dropped += 1
+        self.metrics.dropped += 1
+        self.metrics.depth -= 1
+        if pending.on_drop is not None:
+            pending.on_drop()
+
+    async def _drain(self, queue: _ChannelQueue) -> None:
+        # The notice is sent in the loop, so sends queued while it goes out are drained by this task too
+        while queue.items or queue.dropped:
+            delay = queue.rate_limit.delay()
+            if delay:
+                await asyncio.sleep(delay)
+
+            async with self._slots:
+                # Taken only now, so that a send dropped while this one waited is never the one sent
+                if queue.items:
+                    pending = queue.items.popleft()
+                    self.metrics.depth -= 1
+                    self.metrics.record_wait(time.monotonic() - pending.enqueued_at)
+                    await self._send(queue, pending.send)
+                elif queue.dropped:
+                    count, queue.dropped = queue.dropped, 0
+                    log.warning(f"Dropped {count} messages queued for {queue.channel.id}")
+                    await self._send(queue, lambda: queue.channel.send(DROPPED_NOTICE.format(count=count)))
+
+    async def _send(self, queue: _ChannelQueue, send: Send) -> None:
+        queue.rate_limit.consume()
+        try:
+            await send()
+        except discord.HTTPException as e:
+            self.metrics.failed += 1
+            if e.response is not None:
+                queue.rate_limit.update(e.response.headers, e.status)
+            log.warning(f"Could not send a queued message to {queue.channel.id}: {e}")
+        except Exception:
+            self.metrics.failed += 1
+            log.warning(f"Could not send a queued message to {queue.channel.id}", exc_info=True)
+        else:
+            self.metrics.sent += 1
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Wait up to `timeout` seconds for the queues to drain, then drop what is left."""
+        tasks = {queue.task for queue in self._queues.values() if queue.task is not None and not queue.task.done()}
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+
+        for queue in self._queues.values():
+            while queue.items:
+                self._drop(queue)
+        self._queues.clear()
+
+
+send_queues = SendQueues(capacity=constants.SendQueues.capacity, max_concurrency=constants.SendQueues.max_concurrency)
@@ -0,0 +1,295 @@
+"""
+In-process index of the tag names of every guild, for the error handler's tag fallback.
+
+Every unknown command is a possible tag name. Instead of querying `Tags` each time, the names of
+a guild are loaded once (and again after `Tags.index_ttl` seconds) into a map keyed on the
+lowercased name, and into a trigram index for "did you mean" suggestions. Tag names ignore case,
+like the `lower(name)` indexes of migration 3. Tags whose names only differ in case are all kept:
+a lookup gets the one spelled exactly as asked, or else the oldest. Trigrams and their
+similarity follow `pg_trgm`, which serves the suggestions of guilds with more than
+`Tags.fuzzy_index_max` tags from its GIN index instead (migration 3).
+
+Every guild also keeps an LRU of the content of its most used tags, and tag uses are counted in
+memory by `tag_uses`, which adds them to `Tags.uses` in batches every `Tags.uses_flush_interval`
+seconds. Displaying a popular tag is then a dict lookup, without a read or a write.
+
+Tags saved or deleted through the ORM update the index and the cached content of their guild right away.
+"""
+
+import asyncio
+import heapq
+import re
+import time
+import typing as t
+from collections import defaultdict
+from tortoise.signals import post_delete, post_save
+from bot import constants
+from bot.database.models import Tags
+from bot.log import get_logger
+from bot.utils.cache import LRUCache
+
+log = get_logger(__name__)
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def trigrams(text: str) -> t.FrozenSet[str]:
+    """The trigrams of `text` as `pg_trgm` extracts them: lowercased words padded with two spaces before, one after."""
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def similarity(a: str, b: str) -> float:
+    """Shared trigrams over distinct trigrams of both strings, like `pg_trgm.similarity()`."""
+    a_grams, b_grams = trigrams(a), trigrams(b)
+    if not a_grams or not b_grams:
+        return 0.0
+    shared = len(a_grams & b_grams)
+    return shared / (len(a_grams) + len(b_grams) - shared)
+
+
+class TagEntry(t.NamedTuple):
+    tag_id: int
+    name: str
+
+
+class GuildTags:
+    """The tags of one guild by lowercased name, and their trigram postings when `fuzzy` is set."""
+
+    __slots__ = ("names", "by_id", "postings", "gram_counts", "contents", "fuzzy", "loaded_at")
+
+    def __init__(self, rows: t.Iterable[t.Tuple[int, str]], fuzzy: bool = True) -> None:
+        # The tags sharing a lowercased name, oldest first
+        self.names: t.Dict[str, t.List[TagEntry]] = {}
+        self.by_id: t.Dict[int, str] = {}
+        self.postings: t.Dict[str, t.Set[str]] = defaultdict(set)
+        self.gram_counts: t.Dict[str, int] = {}
+        self.contents = LRUCache(constants.Tags.content_cache_size, constants.Tags.index_ttl)
+        self.fuzzy = fuzzy
+        self.loaded_at = time.monotonic()
+
+        for tag_id, name in rows:
+            self.add(tag_id, name)
+
+    def add(self, tag_id: int, name: str) -> None:
+        if tag_id in self.by_id:
+            self.remove(tag_id)
+
+        key = name.lower()
+        entries = self.names.setdefault(key, [])
+        entries.append(TagEntry(tag_id, name))
+        entries.sort()
+        self.by_id[tag_id] = key
+
+        if self.fuzzy and len(entries) == 1:
+            grams = trigrams(key)
+            self.gram_counts[key] = len(grams)
+            for gram in grams:
+                self.postings[gram].add(key)
+
+    def remove(self, tag_id: int) -> None:
+        self.contents.pop(tag_id)
+        key = self.by_id.pop(tag_id, None)
+        if key is None:
+            return
+
+        entries = [entry for entry in self.names[key] if entry.tag_id != tag_id]
+        if entries:
+            self.names[key] = entries
+            return
+        del self.names[key]
+
+        if self.fuzzy:
+            self.gram_counts.pop(key, None)
+            for gram in trigrams(key):
+                keys = self.postings.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.postings[gram]
+
+    def get(self, name: str) -> t.Optional[TagEntry]:
+        """The tag named `name` ignoring case, preferring the one spelled exactly so, then the oldest."""
+        entries = self.names.get(name.lower())
+        if not entries:
+            return None
+        return next((entry for entry in entries if entry.name == name), entries[0])
+
+    def suggest(self, name: str, limit: int, threshold: float) -> t.List[str]:
+        """Up to `limit` tag names at least `threshold` similar to `name`, the most similar first."""
+        grams = trigrams(name)
+        if not grams:
+            return []
+
+        # Only the tags sharing a trigram with `name` are scored, through the postings of its trigrams
+        shared: t.Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for key in self.postings.get(gram, ()):
+                shared[key] += 1
+
+        scored = (
+            (count / (len(grams) + self.gram_counts[key] - count), key)
+            for key, count in shared.items()
+        )
+        best = heapq.nlargest(limit, (item for item in scored if item[0] >= threshold))
+        return [self.names[key][0].name for _, key in best]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class TagIndex:
+    """Lazily loaded `GuildTags` of every guild."""
+
+    def __init__(self) -> None:
+        self._guilds: t.Dict[int, GuildTags] = {}
+        self._loading: t.Dict[int, asyncio.Task] = {}
+
+    async def _guild(self, guild_id: int) -> GuildTags:
+        tags = self._guilds.get(guild_id)
+        if tags is not None and time.monotonic() - tags.loaded_at < constants.Tags.index_ttl:
+            return tags
+
+        # One load per guild at a time, concurrent lookups wait for it
+        task = self._loading.get(guild_id)
+        if task is None:
+            task = asyncio.create_task(self._load(guild_id), name=f"tag-index-{guild_id}")
+            self._loading[guild_id] = task
+            task.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, guild_id: int) -> GuildTags:
+        rows = await Tags.names(guild_id)
+        tags = GuildTags(rows, fuzzy=len(rows) <= constants.Tags.fuzzy_index_max)
+        self._guilds[guild_id] = tags
+        log.debug(f"Indexed {len(rows)} tags of guild {guild_id}")
+        return tags
+
+    async def get(self, guild_id: int, name: str) -> t.Optional[TagEntry]:
+        """The tag of the guild named `name`, ignoring case."""
+        return (await self._guild(guild_id)).get(name)
+
+    async def content(self, guild_id: int, tag: TagEntry) -> t.Optional[str]:
+        """The content of a tag of the guild, from its LRU or else the database. None if it was deleted."""
+        tags = await self._guild(guild_id)
+        content = tags.contents.get(tag.tag_id)
+        if content is None:
+            content = await Tags.filter(tag_id=tag.tag_id).first().values_list("content", flat=True)
+            if content is None:
+                tags.remove(tag.tag_id)
+                return None
+            tags.contents.set(tag.tag_id, content)
+        return content
+
+    async def use(self, guild_id: int, name: str) -> t.Optional[t.Tuple[TagEntry, str]]:
+        """
+        The tag of the guild named `name`, ignoring case, and its content, counting one use of it.
+
+        In steady state nothing is read from or written to the database.
+        """
+        tag = await self.get(guild_id, name)
+        if tag is None:
+            return None
+
+        content = await self.content(guild_id, tag)
+        if content is None:
+            return None
+
+        tag_uses.add(tag.tag_id)
+        return tag, content
+
+    async def suggest(self, guild_id: int, name: str, limit: t.Optional[int] = None) -> t.List[str]:
+        """Names of the guild's tags similar to `name`, the most similar first."""
+        limit = limit or constants.Tags.suggestions
+        tags = await self._guild(guild_id)
+        if tags.fuzzy:
+            return tags.suggest(name, limit, constants.Tags.suggestion_threshold)
+        return await Tags.similar(guild_id, name, limit)
+
+    def update(self, tag: Tags) -> None:
+        tags = self._guilds.get(tag.guild_id)
+        if tags is not None:
+            tags.add(tag.tag_id, tag.name)
+            tags.contents.set(tag.tag_id, tag.content)
+
+    def discard(self, tag: Tags) -> None:
+        tags = self._guilds.get(tag.guild_id)
+        if tags is not None:
+            tags.remove(tag.tag_id)
+
+    def invalidate(self, guild_id: int) -> None:
+        """Reload the guild's names on the next lookup."""
+        self._guilds.pop(guild_id, None)
+
+
+class UseCounter:
+    """Tag uses counted in memory and added to `Tags.uses` in batches."""
+
+    def __init__(self, flush_interval: float) -> None:
+        self.flush_interval = flush_interval
+        self.flushed = 0
+        self._pending: t.Dict[int, int] = defaultdict(int)
+        self._task: t.Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def add(self, tag_id: int, count: int = 1) -> None:
+        self._pending[tag_id] += count
+
+    def discard(self, tag_id: int) -> None:
+        self._pending.pop(tag_id, None)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="tag-use-counter")
+
+    async def close(self) -> None:
+        """Stop the flush task and write the uses counted since the last flush."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+
+        uses, self._pending = self._pending, defaultdict(int)
+        try:
+            await Tags.add_uses(uses)
+        except Exception:
+            # Put them back, they are added to the next flush
+            for tag_id, count in uses.items():
+                self.add(tag_id, count)
+            log.warning(f"Could not write the uses of {len(uses)} tags", exc_info=True)
+        else:
+            self.flushed += len(uses)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await asyncio.shield(self.flush())
+
+
+tag_index = TagIndex()
+tag_uses = UseCounter(constants.Tags.uses_flush_interval)
+
+
+@post_save(Tags)
+async def _tag_saved(sender: t.Type[Tags], instance: Tags, created: bool, using_db, update_fields) -> None:
+    tag_index.update(instance)
+
+
+@post_delete(Tags)
+async def _tag_deleted(sender: t.Type[Tags], instance: Tags, using_db) -> None:
+    tag_index.discard(instance)
+    tag_uses.discard(instance.tag_id)
@@ -0,0 +1,224 @@
+"""
+Durable timers for timed actions, like lifting a mute.
+
+Timers are `Timer` rows, so they survive restarts. Only the timers expiring within the next
+`Timers.window` seconds are held in memory, as (timestamp, id) pairs in a min-heap. The later
+ones stay in the database until the window moves past them. A single dispatcher task sleeps
+until the earliest timer is due, loads the due rows in batches and runs the action registered
+for them with `register()`, at most `Timers.max_concurrency` at a time.
+
+A timer is deleted once its action has run, so an action due while the bot was offline runs
+as soon as the dispatcher starts, and one interrupted by a restart runs again: actions must
+be idempotent. A failing action is retried with a doubling delay, `Timers.max_attempts` times.
+"""
+
+import asyncio
+import heapq
+import time
+import typing as t
+from datetime import datetime, timezone
+from bot import constants
+from bot.database.models import Timer
+from bot.log import get_logger
+
+log = get_logger(__name__)
+
+Action = t.Callable[[Timer], t.Awaitable[None]]
+
+
+def to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+class TimerScheduler:
+    """A heap of the upcoming `Timer` rows and the task running their actions."""
+
+    def __init__(
+        self, *, window: float, batch_size: int, max_concurrency: int, max_attempts: int, retry_delay: float
+    ) -> None:
+        self.window = window
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.actions: t.Dict[str, Action] = {}
+        self.dispatched = 0
+        self.failed = 0
+
+        self._heap: t.List[t.Tuple[float, int]] = []
+        self._queued: t.Set[int] = set()  # The timer ids in the heap, each is pushed once
+        self._horizon = 0.0  # Timestamp up to which the timers are in the heap
+        self._loading = 0.0  # Horizon of the window being loaded
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._task: t.Optional[asyncio.Task] = None
+        self._running: t.Set[asyncio.Task] = set()
+        self._running_ids: t.Set[int] = set()  # Their rows are only deleted once they ran
+
+    @property
+    def in_memory(self) -> int:
+        return len(self._heap)
+
+    def register(self, action: str, handler: Action) -> None:
+        """Run `handler` with the timers of `action` when they expire."""
+        self.actions[action] = handler
+
+    def unregister(self, action: str) -> None:
+        self.actions.pop(action, None)
+
+    async def schedule(
+        self, action: str, guild_id: int, target_id: int, expires_at: datetime, data: t.Optional[dict] = None
+    ) -> Timer:
+        """Persist a timer running `action` at `expires_at`."""
+        timer = await Timer.create(
+            action=action, guild_id=guild_id, target_id=target_id, expires_at=expires_at, data=data
+        )
+        self._push(expires_at.timestamp(), timer.id)
+        return timer
+
+    async def cancel(self, guild_id: int, action: str, target_id: t.Optional[int] = None) -> int:
+        """Delete the pending timers of `action` in a guild, of one target or all. Returns how many there were."""
+        # Their heap entries are skipped when they come due, as their rows are gone
+        return await Timer.pending(guild_id, action, target_id).delete()
+
+    def _push(self, when: float, timer_id: int) -> None:
+        # Timers past the horizon are loaded with their window, those of a window being loaded are
+        # pushed too, as the query may not see them
+        if when >= max(self._horizon, self._loading) or timer_id in self._queued:
+            return
+
+        self._queued.add(timer_id)
+        heapq.heappush(self._heap, (when, timer_id))
+        if self._heap[0][1] == timer_id:
+            self._wakeup.set()
+
+    async def _load_window(self) -> None:
+        start = self._horizon
+        horizon = self._loading = time.time() + self.window
+        try:
+            query = Timer.filter(expires_at__lt=to_datetime(horizon))
+            if start:
+                query = query.filter(expires_at__gte=to_datetime(start))
+            rows = await query.values_list("id", "expires_at")
+        finally:
+            self._loading = 0.0
+
+        # Only moved once loaded, a failed query is retried over the same window
+        self._horizon = horizon
+        for timer_id, expires_at in rows:
+            if timer_id not in self._queued and timer_id not in self._running_ids:
+                self._queued.add(timer_id)
+                heapq.heappush(self._heap, (expires_at.timestamp(), timer_id))
+        log.debug(f"Loaded {len(rows)} timers, {len(self._heap)} in memory")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="timer-dispatcher")
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Stop dispatching and wait for the running actions. Unfinished timers run again on the next start."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._running:
+            await asyncio.wait(self._running, timeout=timeout)
+
+        self._heap.clear()
+        self._queued.clear()
+        self._horizon = 0.0
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.warning("Timer dispatch failed", exc_info=True)
+                await asyncio.sleep(self.retry_delay)
+
+    async def _tick(self) -> None:
+        now = time.time()
+        if now >= self._horizon:
+            await self._load_window()
+
+        if self._heap and self._heap[0][0] <= now:
+            await self._dispatch_due(now)
+            return
+
+        next_due = self._heap[0][0] if self._heap else self._horizon
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), min(next_due, self._horizon) - now)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _dispatch_due(self, now: float) -> None:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            due.append(heapq.heappop(self._heap))
+
+        try:
+            timers = await Timer.filter(id__in=[timer_id for _, timer_id in due])
+        except Exception:
+            # Put them back, they are fetched again on the next tick
+            for entry in due:
+                heapq.heappush(self._heap, entry)
+            raise
+        self._queued.difference_update(timer_id for _, timer_id in due)
+
+        for timer in timers:
+            # Waits for a free slot, which bounds the running actions
+            await self._slots.acquire()
+            self._running_ids.add(timer.id)
+            task = asyncio.create_task(self._run_timer(timer), name=f"timer-{timer.id}")
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run_timer(self, timer: Timer) -> None:
+        try:
+            handler = self.actions.get(timer.action)
+            if handler is None:
+                log.warning(f"Dropping timer {timer.id}, no handler for {timer.action!r}")
+                await timer.delete()
+                return
+
+            try:
+                await handler(timer)
+            except Exception:
+                self.failed += 1
+                await self._retry(timer)
+            else:
+                self.dispatched += 1
+                await timer.delete()
+        except Exception:
+            log.warning(f"Could not update timer {timer.id}", exc_info=True)
+        finally:
+            self._running_ids.discard(timer.id)
+            self._slots.release()
+
+    async def _retry(self, timer: Timer) -> None:
+        timer.attempts += 1
+        if timer.attempts >= self.max_attempts:
+            log.error(f"Timer {timer.id} ({timer.action}) failed {timer.attempts} times, dropping it", exc_info=True)
+            await timer.delete()
+            return
+
+        log.warning(f"Timer {timer.id} ({timer.action}) failed, retrying", exc_info=True)
+        when = time.time() + self.retry_delay * 2 ** (timer.attempts - 1)
+        timer.expires_at = to_datetime(when)
+        await timer.save(update_fields=["attempts", "expires_at"])
+        self._push(when, timer.id)
+
+
+timers = TimerScheduler(
+    window=constants.Timers.window,
+    batch_size=constants.Timers.batch_size,
+    max_concurrency=constants.Timers.max_concurrency,
+    max_attempts=constants.Timers.max_attempts,
+    retry_delay=constants.Timers.retry_delay,
+)
@@ -0,0 +1,147 @@
+"""
+A pool of webhooks per log channel, to post logs outside of the bot's own rate limits.
+
+Messages the bot sends share its per-route rate limits with its command responses, while
+each webhook has buckets of its own. A `WebhookPool` keeps `size` webhooks per channel,
+reusing the ones it made before (found by name) and creating the missing ones, and sends
+through them in turn over the bot's HTTP session. A webhook deleted by a moderator is
+dropped from the pool on its first failed send, and replaced on the next one.
+
+Messages are posted with the bot's name and avatar, so the logs look the same either way.
+Creating webhooks needs the Manage Webhooks permission. Where the bot lacks it, or the channel
+already has as many webhooks as Discord allows, `send()` raises the error and the channel is
+not `usable()` for `retry_after` seconds, or until its webhooks change, so its logs are sent by
+the bot meanwhile. A channel where only some of the webhooks could be made uses those.
+"""
+
+import asyncio
+import time
+import typing as t
+import aiohttp
+import discord
+from bot.log import get_logger
+
+log = get_logger(__name__)
+
+WEBHOOK_NAME = "B0F Logs"
+
+
+class _ChannelWebhooks:
+    __slots__ = ("webhooks", "turn", "lock", "size")
+
+    def __init__(self, size: int) -> None:
+        self.webhooks: t.List[discord.Webhook] = []
+        self.turn = 0
+        self.lock = asyncio.Lock()
+        self.size = size  # Lowered to the webhooks it got when no more can be created
+
+
+class WebhookPool:
+    """Webhooks of the log channels, created on first use and used in turn."""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        *,
+        size: int,
+        allowed_mentions: t.Optional[discord.AllowedMentions] = None,
+        retry_after: float = 3600.0,
+    ) -> None:
+        self.session = session
+        self.size = size
+        self.allowed_mentions = allowed_mentions
+        self.retry_after = retry_after
+        self.created = 0
+        self._channels: t.Dict[int, _ChannelWebhooks] = {}
+        # Channels whose webhooks couldn't be set up, until when their logs are sent by the bot
+        self._unusable: t.Dict[int, float] = {}
+
+    def usable(self, channel_id: int) -> bool:
+        """Whether logs can be sent to the channel through webhooks, as far as is known."""
+        until = self._unusable.get(channel_id)
+        if until is None:
+            return True
+        if time.monotonic() < until:
+            return False
+        del self._unusable[channel_id]
+        return True
+
+    async def _fill(self, channel: discord.TextChannel, pool: _ChannelWebhooks) -> None:
+        async with pool.lock:
+            if len(pool.webhooks) >= pool.size:
+                return
+
+            try:
+                me = channel.guild.me
+                known = {webhook.id for webhook in pool.webhooks}
+                for webhook in await channel.webhooks():
+                    if len(pool.webhooks) >= pool.size:
+                        break
+                    if webhook.name == WEBHOOK_NAME and webhook.token and webhook.user and webhook.user.id == me.id:
+                        if webhook.id not in known:
+                            pool.webhooks.append(
+                                discord.Webhook.partial(webhook.id, webhook.token, session=self.session)
+                            )
+
+                while len(pool.webhooks) < pool.size:
+                    webhook = await channel.create_webhook(name=WEBHOOK_NAME, reason="Log delivery")
+                    pool.webhooks.append(discord.Webhook.partial(webhook.id, webhook.token, session=self.session))
+                    self.created += 1
+                    log.debug(f"Created log webhook {webhook.id} in {channel.id}")
+            except discord.HTTPException as e:
+                # Missing permissions, or the channel's webhook limit
+                if pool.webhooks:
+                    pool.size = len(pool.webhooks)
+                    log.debug(f"Could only set up {pool.size} log webhooks in {channel.id}: {e}")
+                    return
+
+                self._unusable[channel.id] = time.monotonic() + self.retry_after
+                log.info(f"Can't set up log webhooks in {channel.id}, its logs are sent by the bot: {e}")
+                raise
+
+    async def _next(self, channel: discord.TextChannel) -> discord.Webhook:
+        pool = self._channels.get(channel.id)
+        if pool is None:
+            pool = self._channels[channel.id] = _ChannelWebhooks(self.size)
+        if len(pool.webhooks) < pool.size:
+            await self._fill(channel, pool)
+
+        pool.turn = (pool.turn + 1) % len(pool.webhooks)
+        return pool.webhooks[pool.turn]
+
+    def _discard(self, channel_id: int, webhook: discord.Webhook) -> None:
+        pool = self._channels.get(channel_id)
+        if pool is not None and webhook in pool.webhooks:
+            pool.webhooks.remove(webhook)
+            log.info(f"Log webhook {webhook.id} of {channel_id} is gone, it will be recreated")
+
+    def invalidate(self, channel_id: int) -> None:
+        """Forget the webhooks of a channel, for instance after its webhooks changed."""
+        self._channels.pop(channel_id, None)
+
+    def webhooks_updated(self, channel_id: int) -> None:
+        """Try to set up the webhooks of a channel again, as one may have been allowed or made room for."""
+        self._unusable.pop(channel_id, None)
+        pool = self._channels.get(channel_id)
+        if pool is not None:
+            pool.size = self.size
+
+    async def send(self, channel: discord.TextChannel, **kwargs: t.Any) -> discord.WebhookMessage:
+        """Send a message to `channel` through the next webhook of its pool."""
+        # Webhook.send takes MISSING, not None, for the parameters left out
+        kwargs = {key: value for key, value in kwargs.items() if value is not None}
+        if self.allowed_mentions is not None:
+            kwargs.setdefault("allowed_mentions", self.allowed_mentions)
+        me = channel.guild.me
+
+        for attempt in range(2):
+            webhook = await self._next(channel)
+            try:
+                return await webhook.send(
+                    username=me.display_name, avatar_url=me.display_avatar.url, wait=True, **kwargs
+                )
+            except discord.NotFound:
+                # Deleted, the retry goes through a new one
+                self._discard(channel.id, webhook)
+                if attempt:
+                    raise
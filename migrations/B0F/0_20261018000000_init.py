@@ -0,0 +1,104 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "guild" (
+            "discord_id" BIGSERIAL NOT NULL PRIMARY KEY,
+            "language" TEXT NOT NULL,
+            "prefix" TEXT NOT NULL,
+            "is_logging" BOOL NOT NULL  DEFAULT False,
+            "is_automod" BOOL NOT NULL  DEFAULT False,
+            "automod_log" BIGINT NOT NULL  DEFAULT 0,
+            "message_log" BIGINT NOT NULL  DEFAULT 0,
+            "mod_log" BIGINT NOT NULL  DEFAULT 0,
+            "suggestions" BIGINT NOT NULL  DEFAULT 0,
+            "changelog_enabled" BOOL NOT NULL  DEFAULT False,
+            "changelog_channel" BIGINT,
+            "trusted_bot_owners" BIGINT,
+            "is_bot_blacklisted" BOOL NOT NULL  DEFAULT False,
+            "is_nsfw_disabled" BOOL NOT NULL  DEFAULT True,
+            "blacklisted_reason" TEXT NOT NULL,
+            "is_premium" BOOL NOT NULL  DEFAULT False
+        );
+        CREATE TABLE IF NOT EXISTS "afkmodel" (
+            "id" BIGSERIAL NOT NULL PRIMARY KEY,
+            "afk_user_id" BIGINT NOT NULL,
+            "start_time" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+            "enabled" BOOL NOT NULL  DEFAULT True,
+            "nickname" TEXT,
+            "message" TEXT,
+            "guild_id" BIGINT NOT NULL REFERENCES "guild" ("discord_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "filterlist" (
+            "id" BIGSERIAL NOT NULL PRIMARY KEY,
+            "whitelist" TEXT ARRAY,
+            "guild_id" BIGINT NOT NULL REFERENCES "guild" ("discord_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "guildevent" (
+            "id" BIGSERIAL NOT NULL PRIMARY KEY,
+            "description" TEXT NOT NULL,
+            "old" TEXT NOT NULL,
+            "new" TEXT NOT NULL,
+            "timestamp" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+            "guild_id" BIGINT NOT NULL REFERENCES "guild" ("discord_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "invite" (
+            "id" BIGSERIAL NOT NULL PRIMARY KEY,
+            "inviter_id" BIGINT NOT NULL,
+            "invite_count_total" INT NOT NULL  DEFAULT 0,
+            "invite_count_bonus" INT NOT NULL  DEFAULT 0,
+            "invite_count_left" INT NOT NULL  DEFAULT 0,
+            "max_account_age" INT NOT NULL  DEFAULT 3,
+            "channel_id" BIGINT,
+            "enabled" BOOL NOT NULL  DEFAULT True,
+            "guild_id" BIGINT NOT NULL REFERENCES "guild" ("discord_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "keys" (
+            "key_id" UUID NOT NULL  PRIMARY KEY,
+            "enabled" BOOL NOT NULL  DEFAULT False,
+            "level" TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS "roles" (
+            "id" BIGSERIAL NOT NULL PRIMARY KEY,
+            "name" VARCHAR(30) NOT NULL,
+            "role_id" BIGINT NOT NULL,
+            "is_mod" BOOL NOT NULL  DEFAULT False,
+            "comment" TEXT,
+            "guild_id" BIGINT NOT NULL REFERENCES "guild" ("discord_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "tags" (
+            "tag_id" SERIAL NOT NULL PRIMARY KEY,
+            "name" TEXT NOT NULL,
+            "created_at" TIMESTAMPTZ   DEFAULT CURRENT_TIMESTAMP,
+            "author_id" BIGINT NOT NULL,
+            "content" TEXT NOT NULL,
+            "uses" BIGINT NOT NULL,
+            "guild_id" BIGINT NOT NULL REFERENCES "guild" ("discord_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "users" (
+            "user_id" BIGSERIAL NOT NULL PRIMARY KEY,
+            "commands_run" BIGINT   DEFAULT 0,
+            "tracking_enabled" BOOL NOT NULL  DEFAULT True,
+            "api_key_id" UUID REFERENCES "keys" ("key_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "warns" (
+            "id" BIGSERIAL NOT NULL PRIMARY KEY,
+            "warn_id" TEXT NOT NULL,
+            "target_id" BIGINT NOT NULL,
+            "mod_id" BIGINT NOT NULL,
+            "reason" TEXT,
+            "created_at" TIMESTAMPTZ   DEFAULT CURRENT_TIMESTAMP,
+            "guild_id" BIGINT NOT NULL REFERENCES "guild" ("discord_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "aerich" (
+            "id" SERIAL NOT NULL PRIMARY KEY,
+            "version" VARCHAR(255) NOT NULL,
+            "app" VARCHAR(100) NOT NULL,
+            "content" JSONB NOT NULL
+        );"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        """
@@ -0,0 +1,21 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX IF NOT EXISTS "idx_warns_guild_i_95ff3a" ON "warns" ("guild_id", "target_id");
+        CREATE INDEX IF NOT EXISTS "idx_tags_guild_i_682ddd" ON "tags" ("guild_id", "name");
+        CREATE INDEX IF NOT EXISTS "idx_afkmodel_guild_i_869cd9" ON "afkmodel" ("guild_id", "afk_user_id");
+        CREATE INDEX IF NOT EXISTS "idx_roles_guild_i_b9a6cf" ON "roles" ("guild_id", "role_id");
+        CREATE INDEX IF NOT EXISTS "idx_invite_guild_i_91f5ee" ON "invite" ("guild_id", "inviter_id");
+        CREATE INDEX IF NOT EXISTS "idx_guildevent_guild_i_0d6e29" ON "guildevent" ("guild_id", "timestamp");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_warns_guild_i_95ff3a";
+        DROP INDEX IF EXISTS "idx_tags_guild_i_682ddd";
+        DROP INDEX IF EXISTS "idx_afkmodel_guild_i_869cd9";
+        DROP INDEX IF EXISTS "idx_roles_guild_i_b9a6cf";
+        DROP INDEX IF EXISTS "idx_invite_guild_i_91f5ee";
+        DROP INDEX IF EXISTS "idx_guildevent_guild_i_0d6e29";"""
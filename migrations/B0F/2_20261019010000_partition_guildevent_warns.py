@@ -0,0 +1,75 @@
+from tortoise import BaseDBAsyncClient
+
+# Turns "guildevent" and "warns" into tables range partitioned by month on their timestamp.
+# The partitions covering the existing rows (and the next three months) are created before the rows
+# are copied, later ones are created by bot/database/partitions.py. The primary key of a partitioned
+# table must include the partition key, so it becomes ("id", <timestamp>).
+
+PARTITION = """
+        UPDATE "{table}" SET "{column}" = now() WHERE "{column}" IS NULL;
+        ALTER TABLE "{table}" RENAME TO "{table}_unpartitioned";
+        ALTER TABLE "{table}_unpartitioned" RENAME CONSTRAINT "{table}_pkey" TO "{table}_unpartitioned_pkey";
+        DROP INDEX IF EXISTS "{index}";
+        CREATE TABLE "{table}" (LIKE "{table}_unpartitioned" INCLUDING DEFAULTS) PARTITION BY RANGE ("{column}");
+        ALTER TABLE "{table}" ALTER COLUMN "{column}" SET NOT NULL;
+        ALTER TABLE "{table}" ALTER COLUMN "{column}" SET DEFAULT now();
+        ALTER TABLE "{table}" ADD PRIMARY KEY ("id", "{column}");
+        ALTER TABLE "{table}" ADD CONSTRAINT "fk_{table}_guild" FOREIGN KEY ("guild_id")
+            REFERENCES "guild" ("discord_id") ON DELETE CASCADE;
+        ALTER SEQUENCE "{table}_id_seq" OWNED BY "{table}"."id";
+        DO $$
+        DECLARE month date;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    date_trunc('month', COALESCE(MIN("{column}"), now())),
+                    date_trunc('month', now()) + interval '3 months',
+                    interval '1 month'
+                )::date FROM "{table}_unpartitioned"
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF "{table}" FOR VALUES FROM (%L) TO (%L)',
+                    '{table}_p' || to_char(month, 'YYYYMM'), month, (month + interval '1 month')::date
+                );
+            END LOOP;
+        END $$;
+        CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT;
+        INSERT INTO "{table}" SELECT * FROM "{table}_unpartitioned";
+        DROP TABLE "{table}_unpartitioned";
+        CREATE INDEX "{index}" ON "{table}" ({index_columns});"""
+
+UNPARTITION = """
+        ALTER TABLE "{table}" RENAME TO "{table}_partitioned";
+        ALTER TABLE "{table}_partitioned" RENAME CONSTRAINT "{table}_pkey" TO "{table}_partitioned_pkey";
+        DROP INDEX IF EXISTS "{index}";
+        CREATE TABLE "{table}" (LIKE "{table}_partitioned" INCLUDING DEFAULTS);
+        ALTER TABLE "{table}" ADD PRIMARY KEY ("id");
+        ALTER TABLE "{table}" ADD CONSTRAINT "fk_{table}_guild" FOREIGN KEY ("guild_id")
+            REFERENCES "guild" ("discord_id") ON DELETE CASCADE;
+        ALTER SEQUENCE "{table}_id_seq" OWNED BY "{table}"."id";
+        INSERT INTO "{table}" SELECT * FROM "{table}_partitioned";
+        DROP TABLE "{table}_partitioned" CASCADE;
+        CREATE INDEX "{index}" ON "{table}" ({index_columns});"""
+
+TABLES = (
+    {
+        "table": "guildevent",
+        "column": "timestamp",
+        "index": "idx_guildevent_guild_i_0d6e29",
+        "index_columns": '"guild_id", "timestamp"',
+    },
+    {
+        "table": "warns",
+        "column": "created_at",
+        "index": "idx_warns_guild_i_95ff3a",
+        "index_columns": '"guild_id", "target_id"',
+    },
+)
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return "".join(PARTITION.format(**table) for table in TABLES)
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return "".join(UNPARTITION.format(**table) for table in TABLES)
@@ -0,0 +1,16 @@
+from tortoise import BaseDBAsyncClient
+
+# Case-insensitive exact lookups of a guild's tag, and trigram similarity search for tag suggestions
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS "idx_tags_guild_lower_name" ON "tags" ("guild_id", lower("name"));
+        CREATE INDEX IF NOT EXISTS "idx_tags_name_trgm" ON "tags" USING GIN (lower("name") gin_trgm_ops);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_tags_name_trgm";
+        DROP INDEX IF EXISTS "idx_tags_guild_lower_name";"""
@@ -0,0 +1,21 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "timer" (
+            "id" BIGSERIAL NOT NULL PRIMARY KEY,
+            "action" VARCHAR(32) NOT NULL,
+            "target_id" BIGINT NOT NULL,
+            "data" JSONB,
+            "expires_at" TIMESTAMPTZ NOT NULL,
+            "attempts" INT NOT NULL DEFAULT 0,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "guild_id" BIGINT NOT NULL REFERENCES "guild" ("discord_id") ON DELETE CASCADE
+        );
+        CREATE INDEX IF NOT EXISTS "idx_timer_expires_09257e" ON "timer" ("expires_at");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "timer";"""
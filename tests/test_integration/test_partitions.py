@@ -0,0 +1,155 @@
+"""
+Tests for the monthly partitioning of GuildEvent and Warns (migration 2) and its maintenance, on Postgres.
+
+The migrations are applied like aerich applies them, each script in a transaction, to a database
+holding rows from before the tables were partitioned.
+"""
+
+import importlib.util
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+import asyncpg
+import pytest
+import pytest_asyncio
+from tortoise import Tortoise, connections
+from tortoise.transactions import in_transaction
+from bot.database import partitions
+from bot.database.models import GuildEvent, Warns
+from tests.test_integration import tortoise_config
+
+MIGRATIONS = Path(__file__).parents[2] / "migrations" / "B0F"
+
+
+def migration(version: int):
+    (path,) = MIGRATIONS.glob(f"{version}_*.py")
+    spec = importlib.util.spec_from_file_location(f"migration_{version}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def apply(version: int, direction: str = "upgrade") -> None:
+    async with in_transaction() as connection:
+        await connection.execute_script(await getattr(migration(version), direction)(connection))
+
+
+async def query(sql: str) -> list:
+    return await connections.get("default").execute_query_dict(sql)
+
+
+@pytest_asyncio.fixture
+async def migrated():
+    """A database migrated to partitioned tables, holding 400 days of events and 100 of warns."""
+    server = await asyncpg.connect(tortoise_config.PG_SERVER_URI)
+    await server.execute(f'DROP DATABASE IF EXISTS "{tortoise_config.PARTITIONS_DATABASE}"')
+    await server.execute(f'CREATE DATABASE "{tortoise_config.PARTITIONS_DATABASE}"')
+    await server.close()
+
+    await Tortoise.init(tortoise_config.TORTOISE_TO_PG_CONFIG_PARTITIONS)
+    await apply(0)
+    await apply(1)
+    await connections.get("default").execute_script(
+        """
+        INSERT INTO "guild" ("discord_id", "language", "prefix", "blacklisted_reason") VALUES (1, 'en', '.', '');
+        INSERT INTO "guildevent" ("description", "old", "new", "timestamp", "guild_id")
+            SELECT 'event ' || i, '', '', now() - i * interval '1 day', 1 FROM generate_series(0, 399) i;
+        INSERT INTO "warns" ("warn_id", "target_id", "mod_id", "created_at", "guild_id")
+            SELECT 'warn ' || i, i % 5, 9, CASE WHEN i % 10 = 0 THEN NULL ELSE now() - i * interval '1 day' END, 1
+            FROM generate_series(0, 99) i;
+        """
+    )
+    await apply(2)
+    yield
+    await Tortoise._drop_databases()
+
+
+@pytest.mark.asyncio
+async def test_migration_partitions_populated_tables(migrated) -> None:
+    """
+    GIVEN tables of events and warns, some warns without a creation time
+    WHEN they are partitioned by migration 2
+    THEN every row is kept in its month's partition, and the ORM reads and writes them as before
+    """
+    assert await partitions.is_partitioned("guildevent") and await partitions.is_partitioned("warns")
+    assert await query('SELECT count(*) FROM "guildevent"') == [{"count": 400}]
+    assert await query('SELECT count(*) FROM "warns" WHERE "created_at" IS NOT NULL') == [{"count": 100}]
+    assert await query('SELECT count(*) FROM "guildevent_default"') == [{"count": 0}]
+    assert await query("SELECT pg_get_constraintdef(oid) AS pk FROM pg_constraint WHERE conname = 'warns_pkey'") == [
+        {"pk": "PRIMARY KEY (id, created_at)"}
+    ]
+
+    this_month = date.today().replace(day=1)
+    names = set(await partitions.list_partitions("guildevent"))
+    assert partitions.partition_name("guildevent", partitions.add_months(this_month, -13)) in names
+    assert "guildevent_default" in names
+    assert partitions.partition_name("guildevent", partitions.add_months(this_month, 3)) in names
+
+    warn = await Warns.create(warn_id="new", target_id=1, mod_id=2, guild_id=1)
+    assert warn.id == 101
+    warn.reason = "spam"
+    await warn.save()
+    assert [w.reason for w in await Warns.for_member(1, 1, since=datetime.now(timezone.utc) - timedelta(hours=1))] == [
+        "spam"
+    ]
+    await warn.delete()
+    assert await Warns.all().count() == 100
+
+
+@pytest.mark.asyncio
+async def test_bounded_history_only_scans_the_partitions_since(migrated) -> None:
+    """
+    GIVEN events partitioned by month over more than a year
+    WHEN the history of the last days is planned
+    THEN only the partitions from the month of its bound on, and the default one, are scanned
+    """
+    since = datetime.now(timezone.utc) - timedelta(days=3)
+    plan = "\n".join(row["QUERY PLAN"] for row in await query(f"EXPLAIN {GuildEvent.history(1, since=since).sql()}"))
+
+    scanned = {name for name in await partitions.list_partitions("guildevent") if f" on {name} " in plan}
+    assert "guildevent_default" in scanned
+    scanned.discard("guildevent_default")
+    assert min(scanned) == partitions.partition_name("guildevent", since.date().replace(day=1))
+    assert len(await GuildEvent.history(1, since=since)) == 3
+
+
+@pytest.mark.asyncio
+async def test_maintenance_moves_rows_out_of_the_default_partition_and_drops_expired_ones(migrated) -> None:
+    """
+    GIVEN an event dated past the partitions created so far, in the default partition
+    WHEN the partitions up to its month are created and a retention of six months is applied
+    THEN it moves to its month's partition, and the partitions before the window are dropped
+    """
+    await connections.get("default").execute_script(
+        """INSERT INTO "guildevent" ("description", "old", "new", "timestamp", "guild_id")
+        VALUES ('future', '', '', now() + interval '9 months', 1)"""
+    )
+    assert await query('SELECT count(*) FROM "guildevent_default"') == [{"count": 1}]
+
+    await partitions.create_future_partitions("guildevent", "timestamp", 10)
+
+    assert await query('SELECT count(*) FROM "guildevent_default"') == [{"count": 0}]
+    (row,) = await query(
+        """SELECT tableoid::regclass::text AS "partition" FROM "guildevent" WHERE "description" = 'future'"""
+    )
+    future = (datetime.now(timezone.utc) + timedelta(days=1)).date()
+    assert row["partition"] >= partitions.partition_name("guildevent", partitions.add_months(future.replace(day=1), 8))
+
+    cutoff = partitions.add_months(date.today().replace(day=1), -6)
+    await partitions.drop_expired_partitions("guildevent", 6)
+    assert not partitions.expired_partitions(await partitions.list_partitions("guildevent"), cutoff)
+    (oldest,) = await query('SELECT min("timestamp") AS "oldest" FROM "guildevent"')
+    assert oldest["oldest"].date() >= cutoff
+
+
+@pytest.mark.asyncio
+async def test_downgrade_keeps_every_row(migrated) -> None:
+    """
+    GIVEN partitioned tables
+    WHEN migration 2 is rolled back
+    THEN the tables are plain again, with every row
+    """
+    await apply(2, "downgrade")
+
+    assert not await partitions.is_partitioned("guildevent") and not await partitions.is_partitioned("warns")
+    assert await query('SELECT count(*) FROM "guildevent"') == [{"count": 400}]
+    assert await query('SELECT count(*) FROM "warns"') == [{"count": 100}]
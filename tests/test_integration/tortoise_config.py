@@ -15,3 +15,17 @@ TORTOISE_TO_PG_CONFIG_TESTS: dict[str, Any] = {
     },
     "use_tz": False,
 }
+
+PG_SERVER_URI = "postgres://postgres@localhost:5432/postgres"
+PARTITIONS_DATABASE = "testingubot_partitions"
+
+# The bot's own models, for the tests of its migrations
+TORTOISE_TO_PG_CONFIG_PARTITIONS: dict[str, Any] = {
+    "connections": {"default": f"asyncpg://postgres@localhost:5432/{PARTITIONS_DATABASE}"},
+    "apps": {
+        "B0F": {
+            "models": ["bot.database.models"],
+            "default_connection": "default",
+        }
+    },
+}
@@ -0,0 +1,87 @@
+"""Tests for the AFK index of bot.utils.afk."""
+
+from datetime import datetime
+import pytest
+import pytest_asyncio
+from tortoise import Tortoise
+from bot.database.models import AFKModel, Guild
+from bot.utils import afk as afk_module
+from bot.utils.afk import AFKIndex, AFKRecord
+
+
+@pytest_asyncio.fixture
+async def index(tmp_path, monkeypatch):
+    await Tortoise.init(db_url=f"sqlite://{tmp_path}/models.sqlite3", modules={"B0F": ["bot.database.models"]})
+    await Tortoise.generate_schemas()
+    await Guild.create(discord_id=1)
+    # The ORM signals update the module's index
+    index = AFKIndex()
+    monkeypatch.setattr(afk_module, "afk_index", index)
+    yield index
+    await Tortoise.close_connections()
+
+
+def test_mentions_are_checked_against_the_guild_only() -> None:
+    """
+    GIVEN AFK members in two guilds
+    WHEN the mentions of a message are checked, some of them repeated
+    THEN only the AFK members of the message's guild are returned, once each, in mention order
+    """
+    index = AFKIndex()
+    since = datetime(2026, 10, 19)
+    index.guilds[1] = {5: AFKRecord(1, 5, since, None, "lunch"), 6: AFKRecord(2, 6, since, None, None)}
+    index.guilds[2] = {7: AFKRecord(3, 7, since, None, None)}
+
+    assert [record.user_id for record in index.mentioned(1, [6, 7, 5, 6])] == [6, 5]
+    assert index.mentioned(3, [5]) == []
+    assert index.get(2, 7).id == 3
+
+
+@pytest.mark.asyncio
+async def test_the_afk_command_message_doesnt_clear_the_afk_it_sets(index) -> None:
+    """
+    GIVEN a member who goes AFK, then runs the afk command again with a new note
+    WHEN the command's message reaches the listener, after the command set the AFK
+    THEN the member stays AFK with the new note, and a single entry is enabled
+    """
+    await index.set(1, 5, message="lunch")
+    await index.set(1, 5, message="dinner")
+
+    back, mentioned = await index.process(1, 5, [], setting_afk=True)
+
+    assert back is None and mentioned == []
+    assert index.get(1, 5).message == "dinner"
+    assert await AFKModel.filter(guild_id=1, afk_user_id=5, enabled=True).count() == 1
+
+
+@pytest.mark.asyncio
+async def test_a_message_of_an_afk_member_clears_their_afk(index) -> None:
+    """
+    GIVEN an AFK member
+    WHEN they send any other message, twice
+    THEN the first returns their record and disables their entry, the second finds nothing to clear
+    """
+    await index.set(1, 5, message="lunch", nickname="five")
+
+    back, _ = await index.process(1, 5, [])
+
+    assert (back.user_id, back.message, back.nickname) == (5, "lunch", "five")
+    assert index.get(1, 5) is None and 1 not in index.guilds
+    assert not await AFKModel.filter(afk_user_id=5, enabled=True).exists()
+    assert (await index.process(1, 5, []))[0] is None
+
+
+@pytest.mark.asyncio
+async def test_mentions_of_afk_members_get_their_notes(index) -> None:
+    """
+    GIVEN two AFK members
+    WHEN one of them mentions the other and a member who isn't AFK
+    THEN the author is back, and only the other AFK member is reported
+    """
+    await index.set(1, 5, message="lunch")
+    await index.set(1, 6, message="asleep")
+
+    back, mentioned = await index.process(1, 5, [6, 7, 5])
+
+    assert back.user_id == 5
+    assert [(record.user_id, record.message) for record in mentioned] == [(6, "asleep")]
@@ -0,0 +1,103 @@
+"""Tests for the value conversion of bot.database.models.ArrayField and its array functions on SQLite."""
+
+from enum import Enum
+import pytest
+import pytest_asyncio
+from tortoise import Tortoise
+from tortoise.expressions import F
+from bot.database.models import ArrayField, Filterlist, Guild
+
+
+class Colour(str, Enum):
+    red = "red"
+    blue = "blue"
+
+
+def make_field(elem_type: type, dialect: str) -> ArrayField:
+    field = ArrayField(elem_type)
+    capabilities = type("Capabilities", (), {"dialect": dialect})()
+    db = type("Client", (), {"capabilities": capabilities})()
+    field.model = type("Model", (), {"_meta": type("Meta", (), {"db": db})()})
+    return field
+
+
+def test_postgres_keeps_native_lists() -> None:
+    """
+    GIVEN an enum ArrayField on Postgres
+    WHEN a list of members is stored and read back
+    THEN the database gets a list of values and the members are restored
+    """
+    field = make_field(Colour, "postgres")
+
+    assert field.to_db_value([Colour.red, Colour.blue], None) == ["red", "blue"]
+    assert field.to_python_value(["blue", "red"]) == [Colour.blue, Colour.red]
+
+
+def test_other_databases_store_json() -> None:
+    """
+    GIVEN string and enum ArrayFields on SQLite
+    WHEN lists are stored and read back
+    THEN they round trip through a compact JSON array
+    """
+    strings = make_field(str, "sqlite")
+    colours = make_field(Colour, "sqlite")
+
+    assert strings.to_db_value(["a.com", 'b"q.com'], None) == '["a.com","b\\"q.com"]'
+    assert strings.to_python_value('["a.com","b\\"q.com"]') == ["a.com", 'b"q.com']
+    assert colours.to_python_value(colours.to_db_value([Colour.blue], None)) == [Colour.blue]
+    assert strings.to_db_value(None, None) is None
+
+
+@pytest_asyncio.fixture
+async def database(tmp_path):
+    await Tortoise.init(db_url=f"sqlite://{tmp_path}/models.sqlite3", modules={"B0F": ["bot.database.models"]})
+    await Tortoise.generate_schemas()
+    await Guild.create(discord_id=1)
+    yield
+    await Tortoise.close_connections()
+
+
+@pytest.mark.asyncio
+async def test_append_and_remove_emulate_postgres_on_sqlite(database) -> None:
+    """
+    GIVEN a guild without a whitelist
+    WHEN domains are appended, one of them twice, and that one is removed
+    THEN the first append starts the array, order is kept and every copy of the removed domain goes
+    """
+    for domain in ("a.com", 'b"q.com', "a.com", "c.com"):
+        await Filterlist.append_by_guild("whitelist", domain, 1)
+    assert (await Filterlist.get(guild_id=1)).whitelist == ["a.com", 'b"q.com', "a.com", "c.com"]
+
+    filterlist = await Filterlist.remove_by_guild("whitelist", "a.com", 1)
+
+    assert filterlist.whitelist == ['b"q.com', "c.com"]
+
+
+@pytest.mark.asyncio
+async def test_remove_keeps_a_missing_array_null(database) -> None:
+    """
+    GIVEN a guild whose whitelist is NULL
+    WHEN a domain is removed from it
+    THEN it stays NULL, like ARRAY_REMOVE on Postgres
+    """
+    await Filterlist.create(guild_id=1, whitelist=None)
+
+    assert (await Filterlist.remove_by_guild("whitelist", "a.com", 1)).whitelist is None
+
+
+@pytest.mark.asyncio
+async def test_concatenate_prepend_and_replace_emulate_postgres_on_sqlite(database) -> None:
+    """
+    GIVEN a NULL whitelist
+    WHEN a list is concatenated to it, then a domain prepended and another replaced
+    THEN the array is built in order, the NULL taken as empty
+    """
+    await Filterlist.create(guild_id=1, whitelist=None)
+    query = Filterlist.filter(guild_id=1)
+
+    await query.update(whitelist=Filterlist.ArrayConcatenate(F("whitelist"), ["b.com", "c.com"]))
+    await query.update(whitelist=Filterlist.ArrayConcatenate(F("whitelist"), ["d.com"]))
+    await query.update(whitelist=Filterlist.ArrayPrepend(F("whitelist"), "a.com"))
+    await query.update(whitelist=Filterlist.ArrayReplace(F("whitelist"), "c.com", "e.com"))
+
+    assert (await Filterlist.get(guild_id=1)).whitelist == ["a.com", "b.com", "e.com", "d.com"]
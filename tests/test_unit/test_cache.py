@@ -0,0 +1,178 @@
+"""Tests for the in-process LRU, the expiring set and the single-flight loading of the two-tier cache."""
+
+import asyncio
+import time
+import typing as t
+import pytest
+from bot import constants
+from bot.database import cache as redis_cache
+from bot.utils import cache as cache_module
+from bot.utils.cache import ExpiringSet, LRUCache, TwoTierCache
+
+
+def test_lru_evicts_least_recently_used() -> None:
+    """
+    GIVEN a full LRU cache
+    WHEN a key is read and a new key is inserted
+    THEN the least recently used key is the one evicted
+    """
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert len(cache) == 2
+
+
+def test_lru_expires_entries() -> None:
+    """
+    GIVEN an LRU cache with a ttl of 0
+    WHEN a stored key is read
+    THEN it is reported as missing and removed
+    """
+    cache = LRUCache(maxsize=2, ttl=0)
+    cache.set("a", 1)
+
+    assert cache.get("a", "missing") == "missing"
+    assert len(cache) == 0
+
+
+def test_expiring_set_evicts_members_after_their_ttl(monkeypatch) -> None:
+    """
+    GIVEN an expiring set with a ttl of 10 seconds, holding members added 0, 5 and 9 seconds in
+    WHEN the clock moves past the ttl of the first ones
+    THEN those are gone, a discarded or re-added member is handled, and expired members are freed
+    """
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    members = ExpiringSet(ttl=10, buckets=10)
+
+    members.add("a")
+    now[0] += 5
+    members.add("b")
+    members.add("c")
+    members.discard("c")
+    now[0] += 4
+    members.add("a")  # Re-added, its ttl starts over
+
+    now[0] += 7
+    assert "b" not in members
+    assert "a" in members and "c" not in members
+    now[0] += 12
+    assert len(members) == 0
+    assert not members._expiry and not any(members._buckets.values())
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_run_loader_once() -> None:
+    """
+    GIVEN 200 concurrent requests for the same missing key
+    WHEN the loader is slow
+    THEN the loader runs once and every caller gets its result
+    """
+    cache = TwoTierCache("test", maxsize=10, ttl=60, remote_ttl=60)
+    calls = 0
+
+    async def load() -> dict:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"id": 1}
+
+    results = await asyncio.gather(*(cache.get(1, load) for _ in range(200)))
+
+    assert calls == 1
+    assert all(result == {"id": 1} for result in results)
+    assert cache.stats.misses == 1
+    assert cache.stats.coalesced == 199
+
+
+@pytest.mark.asyncio
+async def test_loader_errors_reach_every_waiter() -> None:
+    """
+    GIVEN concurrent requests for a key whose loader raises
+    WHEN the loads are awaited
+    THEN every caller receives the error and nothing is cached
+    """
+    cache = TwoTierCache("test", maxsize=10, ttl=60, remote_ttl=60)
+
+    async def load() -> dict:
+        await asyncio.sleep(0.01)
+        raise LookupError("no such guild")
+
+    results = await asyncio.gather(*(cache.get(1, load) for _ in range(5)), return_exceptions=True)
+
+    assert all(isinstance(result, LookupError) for result in results)
+    assert len(cache) == 0
+
+
+class PubSub:
+    """A subscription that fails, or delivers `messages` and then waits forever."""
+
+    def __init__(self, messages: t.Optional[list]) -> None:
+        self.messages = messages
+
+    async def subscribe(self, channel: str) -> None:
+        pass
+
+    async def listen(self) -> t.AsyncIterator[dict]:
+        if self.messages is None:
+            raise ConnectionError("Connection reset by peer")
+        for message in self.messages:
+            yield message
+        await asyncio.Event().wait()
+
+    async def close(self) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_invalidation_listener_subscribes_again_after_losing_redis(monkeypatch) -> None:
+    """
+    GIVEN a cached key, and a Redis connection that drops on the first subscription
+    WHEN the invalidation listener runs
+    THEN it subscribes again, drops the local tier for the invalidations it missed, and evicts published keys
+    """
+    subscriptions = iter([PubSub(None), PubSub([{"type": "message", "data": "test-listener:2"}])])
+    monkeypatch.setattr(redis_cache, "redis", type("Redis", (), {"pubsub": lambda self: next(subscriptions)})())
+    monkeypatch.setattr(constants.Cache, "listener_retry", 0)
+    cache = cache_module.get_cache("test-listener")
+    cache._local.set("1", {"id": 1})
+    evicted = []
+    monkeypatch.setattr(cache, "evict_local", evicted.append)
+
+    listener = asyncio.create_task(cache_module.listen_for_invalidations())
+    await asyncio.sleep(0.01)
+    listener.cancel()
+
+    assert "1" not in cache._local
+    assert evicted == ["2"]
+
+
+@pytest.mark.asyncio
+async def test_a_load_invalidated_while_it_runs_is_not_cached() -> None:
+    """
+    GIVEN a slow load of a key
+    WHEN the key is invalidated before the load returns
+    THEN its caller gets the loaded value, but the next request loads the key again
+    """
+    cache = TwoTierCache("test", maxsize=10, ttl=60, remote_ttl=60)
+    values = iter([{"name": "stale"}, {"name": "fresh"}])
+
+    async def load() -> dict:
+        value = next(values)
+        await asyncio.sleep(0.01)
+        return value
+
+    stale = asyncio.create_task(cache.get(1, load))
+    await asyncio.sleep(0)
+    await cache.invalidate(1)
+    fresh = await cache.get(1, load)
+
+    assert await stale == {"name": "stale"}
+    assert fresh == {"name": "fresh"}
+    assert await cache.get(1, load) == {"name": "fresh"}
+    assert cache.stats.misses == 2
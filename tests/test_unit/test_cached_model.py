@@ -0,0 +1,80 @@
+"""Tests for the Redis hash codec and the cache invalidation of the cached models, on a SQLite database."""
+
+import pytest
+import pytest_asyncio
+from tortoise import Tortoise, connections
+from tortoise.backends.base.client import BaseTransactionWrapper
+from bot.database.cache import from_redis_hash, redis_hashmap
+from bot.database.models import Guild
+from bot.utils.cache import get_cache
+
+
+@pytest_asyncio.fixture
+async def database(tmp_path):
+    await Tortoise.init(db_url=f"sqlite://{tmp_path}/models.sqlite3", modules={"B0F": ["bot.database.models"]})
+    await Tortoise.generate_schemas()
+    get_cache("guild")._local.clear()
+    yield
+    await Tortoise.close_connections()
+
+
+@pytest.mark.asyncio
+async def test_hash_round_trips_a_saved_row(database) -> None:
+    """
+    GIVEN a guild with booleans, strings, integers and a null column
+    WHEN it is encoded as a Redis hash and decoded back
+    THEN the null column is left out, and the decoded instance has the same values and updates the row
+    """
+    guild = await Guild.create(discord_id=1, prefix="!", is_logging=True, mod_log=42)
+
+    hashmap = redis_hashmap(guild)
+    decoded = from_redis_hash(Guild, hashmap)
+
+    assert hashmap["is_logging"] == "1" and hashmap["mod_log"] == "42" and "changelog_channel" not in hashmap
+    assert (decoded.prefix, decoded.is_logging, decoded.mod_log, decoded.changelog_channel) == ("!", True, 42, None)
+    decoded.prefix = "?"
+    await decoded.save()
+    assert await Guild.all().count() == 1
+    assert (await Guild.get(discord_id=1)).prefix == "?"
+
+
+@pytest.mark.asyncio
+async def test_save_and_delete_invalidate_the_cached_row(database) -> None:
+    """
+    GIVEN a cached guild
+    WHEN it is saved with a new prefix, then deleted
+    THEN the next cached reads see the new prefix, then no guild
+    """
+    await Guild.create(discord_id=1)
+    guild = await Guild.c_get_by_discord_id(1)
+
+    guild.prefix = "?"
+    await guild.save()
+    assert (await Guild.c_get_by_discord_id(1)).prefix == "?"
+
+    await guild.delete()
+    assert await Guild.c_get_or_none_by_discord_id(1) is None
+
+
+@pytest.mark.asyncio
+async def test_update_or_create_invalidates_after_its_commit(database, monkeypatch) -> None:
+    """
+    GIVEN a cached guild
+    WHEN it is updated through update_or_create, which saves inside a transaction
+    THEN the last invalidation runs once the transaction is over, and the cached read sees the update
+    """
+    await Guild.create(discord_id=1)
+    await Guild.c_get_by_discord_id(1)
+    cache = get_cache("guild")
+    in_transaction = []
+    invalidate = cache.invalidate
+
+    async def record(key) -> None:
+        in_transaction.append(isinstance(connections.get("default"), BaseTransactionWrapper))
+        await invalidate(key)
+
+    monkeypatch.setattr(cache, "invalidate", record)
+    await Guild.update_or_create({"prefix": "?"}, discord_id=1)
+
+    assert in_transaction[-1] is False
+    assert (await Guild.c_get_by_discord_id(1)).prefix == "?"
@@ -0,0 +1,148 @@
+"""Tests for the delete runs and transcripts of bot.utils.deleted_messages."""
+
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from discord.utils import time_snowflake
+from bot.utils import deleted_messages as deleted_messages_module
+from bot.utils.cache import ExpiringSet
+from bot.utils.deleted_messages import DeleteRuns, transcript, unignored
+from bot.utils.message_store import StoredMessage
+
+
+class Attachment:
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+
+
+class User:
+    def __init__(self, id_: int, name: str, bot: bool = False) -> None:
+        self.id, self.name, self.bot = id_, name, bot
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class Message:
+    def __init__(self, id_: int, author: User, content: str, attachments: tuple = ()) -> None:
+        self.id, self.author, self.clean_content = id_, author, content
+        self.attachments = [Attachment(name) for name in attachments]
+
+
+class Guild:
+    def __init__(self, *members: User) -> None:
+        self.members = {member.id: member for member in members}
+
+    def get_member(self, member_id: int):
+        return self.members.get(member_id)
+
+
+class DeleteEvent:
+    def __init__(self, message_id: int, cached_message: Message = None) -> None:
+        self.message_id, self.channel_id, self.guild_id = message_id, 2, 1
+        self.cached_message = cached_message
+
+
+def snowflake(minute: int) -> int:
+    return time_snowflake(datetime(2023, 1, 1, 12, minute, tzinfo=timezone.utc))
+
+
+class Logger:
+    """Records the deletes logged one by one and together."""
+
+    def __init__(self) -> None:
+        self.one, self.many = [], []
+
+    async def log_one(self, event: DeleteEvent) -> None:
+        self.one.append(event.message_id)
+
+    async def log_many(self, guild_id: int, channel_id: int, message_ids: list, cached: dict) -> None:
+        self.many.append((guild_id, channel_id, message_ids, sorted(cached)))
+
+
+@pytest.mark.asyncio
+async def test_runs_are_logged_one_by_one_below_the_threshold_and_together_from_it() -> None:
+    """
+    GIVEN delete runs logged together from three deletes
+    WHEN a channel has a run of two deletes, then a run of three
+    THEN the first run is logged one by one and the second one together, with its cached messages
+    """
+    logger = Logger()
+    runs = DeleteRuns(0, 3, logger.log_one, logger.log_many)
+
+    for message_id in (10, 11):
+        runs.add(DeleteEvent(message_id))
+    await asyncio.sleep(0.01)
+    for message_id in (12, 13, 14):
+        runs.add(DeleteEvent(message_id, Message(message_id, User(3, "a"), "hi") if message_id == 13 else None))
+    await asyncio.sleep(0.01)
+
+    assert logger.one == [10, 11]
+    assert logger.many == [(1, 2, [12, 13, 14], [13])]
+
+
+@pytest.mark.asyncio
+async def test_a_run_that_fails_to_log_is_logged_as_an_error(monkeypatch) -> None:
+    """
+    GIVEN delete runs whose logging raises
+    WHEN a run is logged
+    THEN the error is logged and the next run of the channel is logged again
+    """
+    errors = []
+    monkeypatch.setattr(deleted_messages_module.log, "exception", errors.append)
+
+    async def log_one(event: DeleteEvent) -> None:
+        raise RuntimeError("no channel")
+
+    logger = Logger()
+    runs = DeleteRuns(0, 3, log_one, logger.log_many)
+    runs.add(DeleteEvent(10))
+    await asyncio.sleep(0.01)
+    assert errors == ["Could not log the 1 messages deleted in channel 2"]
+
+    for message_id in (11, 12, 13):
+        runs.add(DeleteEvent(message_id))
+    await asyncio.sleep(0.01)
+    assert logger.many == [(1, 2, [11, 12, 13], [])]
+
+
+def test_ignored_messages_are_skipped_once() -> None:
+    """
+    GIVEN two ignored message ids
+    WHEN three messages, one of them ignored, are deleted twice
+    THEN the ignored one is only skipped the first time
+    """
+    ignored = ExpiringSet(60)
+    ignored.add(11)
+    ignored.add(20)
+
+    assert unignored(ignored, [10, 11, 12]) == [10, 12]
+    assert unignored(ignored, [10, 11, 12]) == [10, 11, 12]
+    assert 20 in ignored
+
+
+def test_transcript_leaves_out_bots_and_falls_back_to_the_stored_messages() -> None:
+    """
+    GIVEN a deleted message of a member and of a bot in the cache, and one in the message store only
+    WHEN the transcript of those and of an unknown message is written
+    THEN the messages are written oldest first with their attachments, without the bot's message
+    """
+    member, bot = User(3, "member"), User(4, "bot", bot=True)
+    stored_id, cached_id, bot_id, unknown_id = snowflake(1), snowflake(2), snowflake(3), snowflake(4)
+    stored = {
+        stored_id: StoredMessage(stored_id, 1, 2, 3, "from the store", ("a.png",), datetime.now(timezone.utc), None)
+    }
+    cached = {
+        cached_id: Message(cached_id, member, "from the cache"),
+        bot_id: Message(bot_id, bot, "beep"),
+    }
+
+    written, count = transcript(Guild(member), [unknown_id, bot_id, cached_id, stored_id], cached, stored)
+
+    assert count == 3
+    assert written.read().decode().splitlines() == [
+        f"[2023-01-01 12:01:00 UTC] member (3) [{stored_id}]: from the store",
+        "    Attachments: a.png",
+        f"[2023-01-01 12:02:00 UTC] member (3) [{cached_id}]: from the cache",
+        f"[2023-01-01 12:04:00 UTC] Unknown [{unknown_id}]: This message was not cached.",
+    ]
@@ -0,0 +1,90 @@
+"""Tests for the declarative object diffs of bot.utils.diffing."""
+
+import copy
+from bot.utils.diffing import DiffSpec, Field, overwrite_pairs, word_diff
+
+
+class Overwrite:
+    def __init__(self, id_: int, allow: int) -> None:
+        self.id, self.allow, self.deny = id_, allow, 0
+
+
+class Channel:
+    def __init__(self) -> None:
+        self.name = "general"
+        self.topic = None
+        self._overwrites = [Overwrite(1, 1024)]
+
+
+class Category:
+    def __init__(self) -> None:
+        self.name = "info"
+        self._overwrites = []
+
+
+SPEC = DiffSpec(
+    Field("name"),
+    Field("topic", format=lambda topic: topic or "None"),
+    Field("_overwrites", "Permissions", summary=True, key=overwrite_pairs),
+)
+
+
+def test_only_the_changed_fields_of_the_spec_are_reported() -> None:
+    """
+    GIVEN a channel whose topic was set and whose overwrites were rebuilt with the same content
+    WHEN it is diffed against its copy from before the update
+    THEN only the topic is reported, with its formatted values
+    """
+    before = Channel()
+    after = copy.copy(before)
+    after.topic = "Rules"
+    after._overwrites = [Overwrite(1, 1024)]
+
+    changes = SPEC.diff(before, after)
+
+    assert [(change.label, change.old, change.new) for change in changes] == [("Topic", "None", "Rules")]
+    assert SPEC.diff(after, copy.copy(after)) == []
+
+
+def test_fields_missing_from_a_type_are_skipped() -> None:
+    """
+    GIVEN a category, which has no topic
+    WHEN its overwrites change
+    THEN the diff compares the fields it has and reports the change as a summary
+    """
+    before = Category()
+    after = copy.copy(before)
+    after._overwrites = [Overwrite(2, 8)]
+
+    (change,) = SPEC.diff(before, after)
+
+    assert (change.label, change.summary) == ("Permissions", True)
+
+
+def test_word_diff_renders_changed_regions_between_shortened_equal_runs() -> None:
+    """
+    GIVEN an edit replacing one word and appending another
+    WHEN it is diffed
+    THEN the changes are links, and the unchanged runs are shortened to their ends
+    """
+    before, after = word_diff("one two three four five six", "one two THREE four five six seven")
+
+    assert before == "one two [three](http://o.hi) four ... six"
+    assert after == "one two [THREE](http://o.hi) four ... six [seven](http://o.hi)"
+
+
+def test_word_diff_past_its_cost_is_one_changed_region() -> None:
+    """
+    GIVEN an edit changing every other word of a message
+    WHEN it is diffed with a cost cap below its number of changes
+    THEN everything between the common prefix and suffix is a single changed region
+    """
+    words = [f"w{i}" for i in range(40)]
+    edited = [word if i % 2 else "x" for i, word in enumerate(words)]
+    edited[0], edited[-1] = words[0], words[-1]
+
+    assert word_diff(" ".join(words), " ".join(edited), max_cost=10) == (
+        f"w0 w1 [{' '.join(words[2:-1])}](http://o.hi) w39",
+        f"w0 w1 [{' '.join(edited[2:-1])}](http://o.hi) w39",
+    )
+    assert word_diff(" ".join(words), " ".join(edited), max_cost=100)[0].count("(http://o.hi)") == 19
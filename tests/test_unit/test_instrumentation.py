@@ -0,0 +1,34 @@
+"""Tests for the query template normalisation and latency histograms of the instrumentation layer."""
+
+from bot.database.instrumentation import QueryStats, normalize
+
+
+def test_normalize_groups_queries_by_template() -> None:
+    """
+    GIVEN the same query with different values, placeholders and IN lists
+    WHEN they are normalised
+    THEN they share one template
+    """
+    sqlite = 'SELECT "id" FROM "warns" WHERE "guild_id"=? AND "target_id" IN (?,?,?) LIMIT 20'
+    postgres = 'SELECT "id" FROM "warns" WHERE "guild_id"=$1 AND "target_id" IN ($2,$3) LIMIT 5'
+    inline = """SELECT "id"  FROM "warns" WHERE "guild_id"=12 AND "target_id" IN ('a', 'b''c') LIMIT 1"""
+
+    assert normalize(sqlite) == normalize(postgres) == normalize(inline)
+    assert normalize(sqlite) == 'SELECT "id" FROM "warns" WHERE "guild_id"=? AND "target_id" IN (?...) LIMIT ?'
+
+
+def test_percentiles_come_from_buckets() -> None:
+    """
+    GIVEN 98 fast queries and 2 slow ones
+    WHEN the percentiles are read
+    THEN p50 and p95 report the fast bucket's bound and p99 the slow one, capped at the max
+    """
+    stats = QueryStats()
+    for _ in range(98):
+        stats.record(0.8, rows=1)
+    stats.record(300, rows=10)
+    stats.record(320, rows=10)
+
+    assert stats.percentile(0.5) == stats.percentile(0.95) == 1
+    assert stats.percentile(0.99) == 320
+    assert stats.rows == 118
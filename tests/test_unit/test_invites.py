@@ -0,0 +1,115 @@
+"""Tests for the invite use diff and snapshots of bot.utils.invites."""
+
+import asyncio
+import discord
+import pytest
+from bot.database.models import Invite
+from bot.utils.invites import InviteTracker, InviteUse, used_invites
+
+
+class Response:
+    def __init__(self, status: int) -> None:
+        self.status = status
+        self.reason = "error"
+
+
+class User:
+    def __init__(self, id_: int) -> None:
+        self.id = id_
+
+
+class FetchedInvite:
+    def __init__(self, code: str, uses: int, inviter_id: int) -> None:
+        self.code, self.uses, self.inviter, self.max_uses = code, uses, User(inviter_id), 0
+
+
+class Guild:
+    """A guild whose invite fetches return or raise the given results in turn, each after `delay` seconds."""
+
+    id = 1
+
+    def __init__(self, *results, delay: float = 0) -> None:
+        self.results = list(results)
+        self.delay = delay
+        self.fetches = 0
+
+    async def invites(self) -> list:
+        self.fetches += 1
+        result = self.results.pop(0)
+        await asyncio.sleep(self.delay)
+        if isinstance(result, Exception):
+            raise result
+        return [FetchedInvite(code, uses, 10) for code, uses in result.items()]
+
+
+def test_used_invites_counts_new_uses_and_used_up_invites() -> None:
+    """
+    GIVEN snapshots before and after joins, with a new invite and a single use invite deleted meanwhile
+    WHEN the used invites are computed
+    THEN the uses that went up and the used up invite are returned, the untouched invites are not
+    """
+    before = {"aaa": InviteUse(3, 10, 0), "bbb": InviteUse(0, 11, 0), "once": InviteUse(0, 12, 1)}
+    after = {"aaa": InviteUse(5, 10, 0), "bbb": InviteUse(0, 11, 0), "new": InviteUse(1, 13, 0)}
+    deleted = {"once": InviteUse(0, 12, 1), "expired": InviteUse(4, 14, 10)}
+
+    used = used_invites(before, after, deleted)
+
+    assert {code: count for code, (count, _) in used.items()} == {"aaa": 2, "new": 1, "once": 1}
+
+
+@pytest.mark.asyncio
+async def test_failed_fetches_are_retried_and_keep_the_snapshot() -> None:
+    """
+    GIVEN a guild with a snapshot
+    WHEN a fetch fails once then succeeds, and then fails every retry
+    THEN the first refresh gets the new snapshot, and the second keeps it
+    """
+    tracker = InviteTracker(debounce=0, max_wait=0, retries=1, retry_delay=0)
+    error = discord.HTTPException(Response(500), "error")
+    guild = Guild({"aaa": 1}, error, {"aaa": 2}, error, error)
+    await tracker.refresh(guild)
+
+    assert await tracker.refresh(guild) == {"aaa": InviteUse(2, 10, 0)}
+    assert await tracker.refresh(guild) is None
+    assert tracker.snapshots[1] == {"aaa": InviteUse(2, 10, 0)}
+    assert guild.fetches == 5
+
+
+@pytest.mark.asyncio
+async def test_forbidden_fetches_drop_the_snapshot() -> None:
+    """
+    GIVEN a guild with a snapshot
+    WHEN the bot is forbidden to fetch its invites
+    THEN the snapshot is dropped without retrying
+    """
+    tracker = InviteTracker(debounce=0, max_wait=0, retries=2, retry_delay=0)
+    guild = Guild({"aaa": 1}, discord.Forbidden(Response(403), "forbidden"))
+    await tracker.refresh(guild)
+
+    assert await tracker.refresh(guild) is None
+    assert 1 not in tracker.snapshots and guild.fetches == 2
+
+
+@pytest.mark.asyncio
+async def test_bursts_during_a_fetch_diff_against_its_snapshot(monkeypatch) -> None:
+    """
+    GIVEN a guild whose invite was used once per burst
+    WHEN a second burst is attributed while the fetch of the first is in flight
+    THEN it waits for that fetch, and each use is counted once
+    """
+    added = []
+
+    async def add_invites(guild_id, invites):
+        added.append(invites)
+
+    monkeypatch.setattr(Invite, "add_invites", add_invites)
+    tracker = InviteTracker(debounce=0, max_wait=0)
+    guild = Guild({"aaa": 0}, {"aaa": 1}, {"aaa": 2}, delay=0.05)
+    await tracker.refresh(guild)
+
+    first = asyncio.create_task(tracker._attribute_burst(guild, [100]))
+    await asyncio.sleep(0.01)
+    second = asyncio.create_task(tracker._attribute_burst(guild, [101]))
+
+    assert await asyncio.gather(first, second) == [{100: 10}, {101: 10}]
+    assert added == [{10: 1}, {10: 1}]
@@ -0,0 +1,58 @@
+"""Tests for the coalescing log dispatcher of bot.utils.log_dispatch."""
+
+import asyncio
+import discord
+import pytest
+from bot.utils.log_dispatch import LogDispatcher
+from bot.utils.send_queue import SendQueues
+
+
+class FakeChannel:
+    id = 1
+
+    def __init__(self) -> None:
+        self.sent = []
+
+    async def send(self, **kwargs) -> dict:
+        self.sent.append(kwargs)
+        return kwargs
+
+
+@pytest.mark.asyncio
+async def test_embeds_are_packed_by_count_and_size() -> None:
+    """
+    GIVEN 23 small entries, then 2 entries of 4000 characters
+    WHEN they are logged to one channel and flushed
+    THEN they take messages of at most 10 embeds and 6000 characters, the large entries can't share one
+    """
+    channel = FakeChannel()
+    queues = SendQueues(capacity=10, max_concurrency=1)
+    dispatcher = LogDispatcher(window=60, max_embeds=10, max_chars=6000, queues=queues)
+
+    futures = [dispatcher.send(channel, [discord.Embed(description=str(i))]) for i in range(23)]
+    large = [dispatcher.send(channel, [discord.Embed(description="x" * 4000)]) for _ in range(2)]
+    await dispatcher.flush()
+
+    assert [len(message["embeds"]) for message in channel.sent] == [10, 10, 4, 1]
+    assert (await futures[12])["embeds"][2].description == "12"
+    assert await large[0] is not await large[1]
+
+
+@pytest.mark.asyncio
+async def test_window_bounds_latency_and_pings_keep_their_order() -> None:
+    """
+    GIVEN an entry buffered by a dispatcher with a short window
+    WHEN a ping is logged after it, then another entry
+    THEN the buffered entry is sent before the ping, and the last one once its window passed
+    """
+    channel = FakeChannel()
+    queues = SendQueues(capacity=10, max_concurrency=1)
+    dispatcher = LogDispatcher(window=0.05, max_embeds=10, max_chars=6000, queues=queues)
+
+    dispatcher.send(channel, [discord.Embed(description="before")])
+    await dispatcher.send(channel, [discord.Embed(description="ping")], content="<@&1>")
+    last = dispatcher.send(channel, [discord.Embed(description="after")])
+    await asyncio.wait_for(last, timeout=1)
+
+    assert [message.get("content") for message in channel.sent] == [None, "<@&1>", None]
+    assert [message["embeds"][0].description for message in channel.sent] == ["before", "ping", "after"]
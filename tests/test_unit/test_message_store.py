@@ -0,0 +1,238 @@
+"""Tests for the message store and fetch budget of bot.utils.message_store."""
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+import pytest
+from discord.utils import time_snowflake
+from bot.utils import message_store as message_store_module
+from bot.utils.message_store import FetchBudget, MessageArchive, MessageStore, StoredMessage
+
+
+class Attachment:
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+
+
+class Snowflake:
+    def __init__(self, id_: int) -> None:
+        self.id = id_
+
+
+class Message:
+    def __init__(self, id_: int, content: str, attachments: tuple = ()) -> None:
+        self.id = id_
+        self.guild, self.channel, self.author = Snowflake(1), Snowflake(2), Snowflake(3)
+        self.clean_content = content
+        self.attachments = [Attachment(name) for name in attachments]
+        self.created_at = datetime(2023, 1, 1, tzinfo=timezone.utc)
+        self.edited_at = None
+
+
+@pytest.mark.asyncio
+async def test_store_keeps_the_latest_content_of_the_most_recent_messages() -> None:
+    """
+    GIVEN a store of two messages
+    WHEN a message is edited and a third one is sent
+    THEN the edit replaces the stored content and the least recently used message is evicted
+    """
+    store = MessageStore(maxsize=2, ttl=60)
+    store.add(Message(10, "hello", ("cat.png",)))
+    store.add(Message(11, "world"))
+    store.add(Message(10, "hello there", ("cat.png",)))
+    store.add(Message(12, "again"))
+
+    stored = await store.get(10)
+    assert (stored.content, stored.attachments, stored.channel_id) == ("hello there", ("cat.png",), 2)
+    assert await store.get(11) is None
+    assert (store.hits, store.misses, len(store)) == (1, 1, 2)
+
+
+def test_fetch_budget_is_spent_per_channel_and_refills_over_its_period(monkeypatch) -> None:
+    """
+    GIVEN a budget of two fetches per ten seconds
+    WHEN a channel fetches three times at once, and again five seconds later
+    THEN its third fetch is denied, another channel is unaffected, and a fetch is refilled
+    """
+    now = [100.0]
+    monkeypatch.setattr(message_store_module.time, "monotonic", lambda: now[0])
+    budget = FetchBudget(rate=2, per=10)
+
+    assert [budget.take(1) for _ in range(3)] == [True, True, False]
+    assert budget.take(2)
+
+    now[0] += 5
+    assert [budget.take(1) for _ in range(2)] == [True, False]
+    assert (budget.granted, budget.denied) == (4, 2)
+
+
+def archived(id_: int, guild_id: int, content: str) -> StoredMessage:
+    created_at = datetime.now(timezone.utc) - timedelta(hours=id_)
+    return StoredMessage(time_snowflake(created_at), guild_id, 2, 3, content, ("a.txt",), created_at, None)
+
+
+@pytest.mark.asyncio
+async def test_archive_keeps_compressed_messages_of_the_retention_window_on_disk(tmp_path) -> None:
+    """
+    GIVEN an archive keeping two messages for a day
+    WHEN four messages, one of them older than a day, are flushed and maintained
+    THEN the expired and least recently used messages are deleted and the rest read back as stored
+    """
+    archive = MessageArchive(
+        str(tmp_path / "messages.sqlite3"),
+        retention=86400,
+        max_messages=2,
+        flush_interval=60,
+        max_pending=100,
+        max_backlog=100,
+        maintenance_interval=0,
+        cache_kib=256,
+    )
+    archive.start()
+    long, recent, touched, expired = (
+        archived(3, 1, "edit " * 100),
+        archived(2, 1, "short"),
+        archived(1, 1, "touched"),
+        archived(30, 1, "old"),
+    )
+    for message in (long, touched, recent, expired):
+        archive.add(message)
+    await archive.flush()
+    assert (await archive.get(touched.id)).content == "touched"
+    await archive.flush()
+
+    assert (archive.flushed, archive.expired, archive.evicted) == (4, 1, 1)
+    assert await archive.get(long.id) is None and await archive.get(expired.id) is None
+    stored = await archive.get(recent.id)
+    assert (stored.content, stored.attachments, stored.created_at) == (
+        "short",
+        ("a.txt",),
+        recent.created_at.replace(microsecond=recent.created_at.microsecond // 1000 * 1000),
+    )
+    assert len(message_store_module.pack(long.content)) < len(long.content) // 10
+
+    archive.purge(1)
+    assert await archive.get(recent.id) is None
+    await archive.close()
+
+
+@pytest.mark.asyncio
+async def test_archive_purges_a_guild_that_opts_back_in_before_the_next_flush(tmp_path) -> None:
+    """
+    GIVEN an archive with a flushed message of a guild
+    WHEN the guild opts out, opts back in and stores another message before the next flush
+    THEN the message stored before the purge is deleted and the one stored after it is kept
+    """
+    path = tmp_path / "messages.sqlite3"
+    archive = MessageArchive(
+        str(path),
+        retention=86400,
+        max_messages=100,
+        flush_interval=60,
+        max_pending=100,
+        max_backlog=100,
+        maintenance_interval=60,
+        cache_kib=256,
+    )
+    archive.add(archived(3, 1, "before the archive was opened"))
+    assert not path.exists()
+
+    archive.start()
+    before, after = archived(2, 1, "before"), archived(1, 1, "after")
+    archive.add(before)
+    await archive.flush()
+
+    archive.purge(1)
+    archive.add(after)
+    assert await archive.get(before.id) is None
+    assert (await archive.get(after.id)).content == "after"
+
+    await archive.flush()
+    assert await archive.get(before.id) is None
+    assert (await archive.get(after.id)).content == "after"
+    assert archive._reader.execute("SELECT count(*) FROM message").fetchone() == (1,)
+    await archive.close()
+
+
+@pytest.mark.asyncio
+async def test_store_looks_up_the_messages_it_lacks_on_disk_at_once(tmp_path, monkeypatch) -> None:
+    """
+    GIVEN a store holding a message in memory, and an archive holding three on disk and one waiting to be written
+    WHEN those five messages and an unknown one are looked up together
+    THEN the messages on disk are read in one query, in a worker thread
+    """
+    archive = MessageArchive(
+        str(tmp_path / "messages.sqlite3"),
+        retention=86400,
+        max_messages=100,
+        flush_interval=60,
+        max_pending=100,
+        max_backlog=100,
+        maintenance_interval=60,
+        cache_kib=256,
+    )
+    archive.start()
+    on_disk = [archived(hours, 1, f"on disk {hours}") for hours in (1, 2, 3)]
+    for message in on_disk:
+        archive.add(message)
+    await archive.flush()
+    waiting = archived(4, 1, "waiting")
+    archive.add(waiting)
+    store = MessageStore(maxsize=10, ttl=60, archive=archive)
+    store.add(Message(10, "in memory"))
+    threads = []
+    to_thread = message_store_module.asyncio.to_thread
+
+    def counted_to_thread(func, *args):
+        threads.append(func.__name__)
+        return to_thread(func, *args)
+
+    monkeypatch.setattr(message_store_module.asyncio, "to_thread", counted_to_thread)
+    found = await store.get_many([10, waiting.id, *(message.id for message in on_disk), archived(5, 1, "").id])
+
+    assert {message_id: stored.content for message_id, stored in found.items()} == {
+        10: "in memory",
+        waiting.id: "waiting",
+        **{message.id: message.content for message in on_disk},
+    }
+    assert threads == ["_read"]
+    assert (store.hits, store.archive_hits, store.misses) == (1, 4, 1)
+    await archive.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_flushes_keep_only_the_newest_messages_of_the_backlog(tmp_path, monkeypatch) -> None:
+    """
+    GIVEN an archive keeping a backlog of three messages
+    WHEN two batches of two messages fail to be written
+    THEN the oldest message is dropped and the three others are written with the next flush
+    """
+    archive = MessageArchive(
+        str(tmp_path / "messages.sqlite3"),
+        retention=86400,
+        max_messages=100,
+        flush_interval=60,
+        max_pending=100,
+        max_backlog=3,
+        maintenance_interval=60,
+        cache_kib=256,
+    )
+    archive.start()
+    messages = [archived(hours, 1, f"message {hours}") for hours in (4, 3, 2, 1)]
+
+    def fail(*args):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(archive, "_write", fail)
+        for batch in (messages[:2], messages[2:]):
+            for message in batch:
+                archive.add(message)
+            await archive.flush()
+    assert (archive.pending, archive.dropped) == (3, 1)
+
+    await archive.flush()
+    assert archive.flushed == 3
+    assert await archive.get(messages[0].id) is None
+    written = await archive.get_many(message.id for message in messages[1:])
+    assert [stored.content for stored in written.values()] == ["message 3", "message 2", "message 1"]
+    await archive.close()
@@ -0,0 +1,44 @@
+"""Tests for the CPU work offloader of bot.utils.offload."""
+
+import threading
+import pytest
+from bot.utils.diffing import word_diff
+from bot.utils.offload import Offloader
+
+
+@pytest.mark.asyncio
+async def test_calls_run_in_the_pool_from_the_threshold() -> None:
+    """
+    GIVEN an offloader with a threshold of 10
+    WHEN a call of size 9 and one of size 10 are run
+    THEN the first runs on the loop's thread, the second in the pool
+    """
+    offloader = Offloader(mode="thread", workers=1, threshold=10, max_pending=2)
+
+    small = await offloader.run(threading.get_ident, size=9)
+    large = await offloader.run(threading.get_ident, size=10)
+    offloader.close()
+
+    assert small == threading.get_ident()
+    assert large != threading.get_ident()
+    assert (offloader.inline, offloader.offloaded) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_word_diff_runs_in_a_process() -> None:
+    """
+    GIVEN an offloader in process mode
+    WHEN an edit is diffed with it
+    THEN the rendering matches the inline one
+    """
+    offloader = Offloader(mode="process", workers=1, threshold=0, max_pending=1)
+    before, after = "the quick brown fox jumps over the dog", "the quick red fox jumps over the lazy dog"
+
+    result = await offloader.run(word_diff, before, after, size=len(before) + len(after))
+    offloader.close()
+
+    assert result == word_diff(before, after)
+    assert result == (
+        "the quick [brown](http://o.hi) fox ... the dog",
+        "the quick [red](http://o.hi) fox ... the [lazy](http://o.hi) dog",
+    )
@@ -0,0 +1,165 @@
+"""Tests for the keyset pages of BaseModel.iter_pages and the streamed pages of LinePaginator."""
+
+import asyncio
+from datetime import datetime, timezone
+import discord
+import pytest
+import pytest_asyncio
+from tortoise import Tortoise
+from bot.database.models import Guild, GuildEvent, Timer, Warns
+from bot.utils import paginator as paginator_module
+from bot.utils.paginator import LAST_EMOJI, RIGHT_EMOJI, LinePaginator
+
+
+@pytest_asyncio.fixture
+async def database(tmp_path):
+    await Tortoise.init(db_url=f"sqlite://{tmp_path}/models.sqlite3", modules={"B0F": ["bot.database.models"]})
+    await Tortoise.generate_schemas()
+    await Guild.create(discord_id=1)
+    yield
+    await Tortoise.close_connections()
+
+
+async def collect(pages) -> list:
+    return [page async for page in pages]
+
+
+@pytest.mark.asyncio
+async def test_pages_seek_by_primary_key(database) -> None:
+    """
+    GIVEN five warns of a member and one of another
+    WHEN they are paged two at a time, newest first
+    THEN every warn of the member is yielded once, in order, in three pages
+    """
+    for id_ in range(1, 6):
+        await Warns.create(id=id_, warn_id=str(id_), target_id=10, mod_id=20, guild_id=1)
+    await Warns.create(id=6, warn_id="6", target_id=11, mod_id=20, guild_id=1)
+
+    pages = await collect(Warns.iter_pages(page_size=2, guild_id=1, target_id=10))
+
+    assert [[warn.id for warn in page] for page in pages] == [[5, 4], [3, 2], [1]]
+
+
+@pytest.mark.asyncio
+async def test_pages_break_timestamp_ties_by_primary_key(database) -> None:
+    """
+    GIVEN timers sharing expiry timestamps across page boundaries
+    WHEN they are paged by expiry, oldest first
+    THEN no timer is skipped or repeated
+    """
+    first, second = datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 1, 2, tzinfo=timezone.utc)
+    for id_, expires_at in ((1, second), (2, first), (3, first), (4, second), (5, first)):
+        await Timer.create(id=id_, action="unmute", target_id=10, expires_at=expires_at, guild_id=1)
+
+    pages = await collect(Timer.iter_pages(page_size=2, order_by="expires_at", descending=False, guild_id=1))
+
+    assert [[timer.id for timer in page] for page in pages] == [[2, 3], [5, 1], [4]]
+
+
+@pytest.mark.asyncio
+async def test_pages_of_a_query_helper_keep_its_bounds(database) -> None:
+    """
+    GIVEN events of a guild over four days, and one of another guild
+    WHEN the guild's history since the second day is paged by timestamp
+    THEN only the guild's events since then are yielded, newest first
+    """
+    for day in range(1, 5):
+        timestamp = datetime(2024, 1, day, tzinfo=timezone.utc)
+        await GuildEvent.create(id=day, description="", old="", new="", timestamp=timestamp, guild_id=1)
+    await Guild.create(discord_id=2)
+    timestamp = datetime(2024, 1, 3, tzinfo=timezone.utc)
+    await GuildEvent.create(id=5, description="", old="", new="", timestamp=timestamp, guild_id=2)
+
+    query = GuildEvent.history(1, since=datetime(2024, 1, 2, tzinfo=timezone.utc))
+    pages = await collect(GuildEvent.iter_pages(query=query, order_by="timestamp", page_size=2))
+
+    assert [[event.id for event in page] for page in pages] == [[4, 3], [2]]
+
+
+@pytest.mark.asyncio
+async def test_pages_refuse_a_nullable_key(database) -> None:
+    """
+    GIVEN a model with a nullable timestamp
+    WHEN it is paged by that timestamp
+    THEN it is refused, as the rows where it is NULL would be skipped
+    """
+    await Warns.create(id=1, warn_id="1", target_id=10, mod_id=20, guild_id=1, reason=None)
+
+    with pytest.raises(ValueError):
+        await collect(Warns.iter_pages(order_by="reason", guild_id=1))
+
+
+class User:
+    id = 1
+
+
+class Reaction:
+    def __init__(self, emoji: str) -> None:
+        self.emoji = emoji
+
+
+class Message:
+    id = 2
+
+    def __init__(self, embed: discord.Embed) -> None:
+        self.shown = [(embed.description, embed.footer.text)]
+        self.reactions = []
+
+    async def add_reaction(self, emoji: str) -> None:
+        self.reactions.append(emoji)
+
+    async def remove_reaction(self, emoji: str, user: User) -> None:
+        pass
+
+    async def edit(self, embed: discord.Embed) -> None:
+        self.shown.append((embed.description, embed.footer.text))
+
+    async def clear_reactions(self) -> None:
+        pass
+
+
+class Bot:
+    def __init__(self, emoji: list) -> None:
+        self.emoji = emoji
+
+    async def wait_for(self, event: str, timeout: float, check) -> tuple:
+        if not self.emoji:
+            raise asyncio.TimeoutError
+        return Reaction(self.emoji.pop(0)), User()
+
+
+class Context:
+    author = User()
+
+    def __init__(self, emoji: list) -> None:
+        self.bot = Bot(emoji)
+        self.message = None
+
+    async def send(self, embed: discord.Embed) -> Message:
+        self.message = Message(embed)
+        return self.message
+
+
+@pytest.mark.asyncio
+async def test_stream_pulls_lines_one_page_ahead_of_the_page_shown(monkeypatch) -> None:
+    """
+    GIVEN a stream of five lines, two per page
+    WHEN the next page is asked for three times, once more than there are pages
+    THEN lines are pulled a page ahead, the total is shown once known and there is no last page reaction
+    """
+    # The trace level is only added by the bot's logging setup
+    monkeypatch.setattr(paginator_module.log, "trace", lambda *args, **kwargs: None, raising=False)
+    pulled = []
+
+    async def lines():
+        for n in range(5):
+            pulled.append(n)
+            yield f"line {n}"
+
+    ctx = Context([RIGHT_EMOJI, RIGHT_EMOJI, RIGHT_EMOJI])
+    await LinePaginator.paginate_stream(lines(), ctx, discord.Embed(), max_lines=2)
+
+    assert LAST_EMOJI not in ctx.message.reactions
+    assert [footer for _, footer in ctx.message.shown] == ["Page 1/?", "Page 2/3", "Page 3/3"]
+    assert ctx.message.shown[-1][0].strip() == "line 4"
+    assert pulled == [0, 1, 2, 3, 4]
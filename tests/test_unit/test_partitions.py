@@ -0,0 +1,47 @@
+"""Tests for the monthly partition naming and retention of bot.database.partitions."""
+
+from datetime import date
+from bot.database.partitions import add_months, create_partition_sql, expired_partitions, partition_name
+
+
+def test_add_months_crosses_years() -> None:
+    """
+    GIVEN dates near the ends of a year
+    WHEN months are added or removed
+    THEN the first day of the right month is returned
+    """
+    assert add_months(date(2026, 11, 19), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 31), -1) == date(2025, 12, 1)
+    assert add_months(date(2026, 10, 1), -12) == date(2025, 10, 1)
+
+
+def test_only_whole_months_before_the_cutoff_expire() -> None:
+    """
+    GIVEN monthly partitions, a default partition and a cutoff on the 1st of a month
+    WHEN the expired partitions are selected
+    THEN only the months ending on or before the cutoff are returned
+    """
+    names = [partition_name("warns", date(2025, month, 1)) for month in range(8, 13)] + ["warns_default"]
+
+    assert expired_partitions(names, date(2025, 10, 1)) == ["warns_p202508", "warns_p202509"]
+
+
+def test_new_partitions_take_their_rows_out_of_the_default_partition() -> None:
+    """
+    GIVEN a month to partition, on a table with and without a default partition
+    WHEN the partition's script is built
+    THEN with a default partition, the month's rows are moved out of it in the same transaction
+    """
+    plain = create_partition_sql("warns", "created_at", date(2027, 1, 1), has_default=False)
+    moving = create_partition_sql("warns", "created_at", date(2027, 1, 1), has_default=True)
+
+    assert plain == (
+        'CREATE TABLE IF NOT EXISTS "warns_p202701" PARTITION OF "warns" '
+        "FOR VALUES FROM ('2027-01-01') TO ('2027-02-01')"
+    )
+    assert moving.startswith('BEGIN;ALTER TABLE "warns" DETACH PARTITION "warns_default";' + plain)
+    assert (
+        'DELETE FROM "warns_default" WHERE "created_at" >= \'2027-01-01\' AND "created_at" < \'2027-02-01\''
+        in moving
+    )
+    assert moving.endswith('ATTACH PARTITION "warns_default" DEFAULT;COMMIT')
@@ -0,0 +1,78 @@
+"""Tests for the metered connection pools of bot.database.pool."""
+
+import asyncio
+import asyncpg
+import pytest
+from bot.database import pool as pool_module
+from bot.database.pool import MeteredPool, pool_status
+
+
+def metered_pool(acquire_timeout: float = None) -> MeteredPool:
+    return MeteredPool(
+        None,
+        acquire_timeout=acquire_timeout,
+        min_size=0,
+        max_size=2,
+        max_queries=1,
+        max_inactive_connection_lifetime=0,
+        setup=None,
+        init=None,
+        loop=None,
+        connection_class=asyncpg.connection.Connection,
+        record_class=asyncpg.Record,
+    )
+
+
+class Client:
+    def __init__(self, name: str, pool: object) -> None:
+        self.connection_name = name
+        self._pool = pool
+
+
+@pytest.mark.asyncio
+async def test_each_pool_counts_its_own_acquires_and_connections(monkeypatch) -> None:
+    """
+    GIVEN a primary and a replica pool
+    WHEN the primary hands out two connections and takes one back, and the replica's acquire times out
+    THEN each pool reports its own connections in use, peak, acquires and timeouts
+    """
+    async def acquire(self, timeout):
+        if self is replica:
+            raise asyncio.TimeoutError
+        return object()
+
+    async def release(self, connection, *, timeout=None):
+        pass
+
+    monkeypatch.setattr(asyncpg.Pool, "_acquire", acquire)
+    monkeypatch.setattr(asyncpg.Pool, "release", release)
+    primary, replica = metered_pool(), metered_pool(acquire_timeout=0.1)
+    monkeypatch.setattr(
+        pool_module.connections,
+        "all",
+        lambda: [Client("default", primary), Client("replica", replica), Client("sqlite", None)],
+    )
+
+    connection = await primary._acquire(None)
+    await primary._acquire(None)
+    await primary.release(connection)
+    with pytest.raises(asyncio.TimeoutError):
+        await replica._acquire(None)
+
+    status = pool_status()
+    assert list(status) == ["default", "replica"]
+    primary_metrics, replica_metrics = status["default"]["metrics"], status["replica"]["metrics"]
+    assert (status["default"]["in_use"], primary_metrics.peak_in_use, primary_metrics.acquires) == (1, 2, 2)
+    assert (status["replica"]["in_use"], replica_metrics.acquires, replica_metrics.timeouts) == (0, 1, 1)
+    assert primary_metrics.timeouts == 0 and status["default"]["max"] == 2
+
+
+def test_no_pools_off_postgres(monkeypatch) -> None:
+    """
+    GIVEN only SQLite connections
+    WHEN the pool status is asked for
+    THEN it is empty
+    """
+    monkeypatch.setattr(pool_module.connections, "all", lambda: [Client("default", None)])
+
+    assert pool_status() == {}
@@ -0,0 +1,88 @@
+"""Tests for the read-replica router, with two SQLite databases standing in for primary and replica."""
+
+import asyncio
+import pytest
+import pytest_asyncio
+from tortoise import Tortoise, connections
+from tortoise.utils import get_schema_sql
+from bot.database import routing
+
+
+@pytest_asyncio.fixture
+async def two_databases(tmp_path):
+    await Tortoise.init(
+        {
+            "connections": {
+                "default": f"sqlite://{tmp_path}/primary.sqlite3",
+                "replica": f"sqlite://{tmp_path}/replica.sqlite3",
+            },
+            "apps": {"B0F": {"models": ["bot.database.models"], "default_connection": "default"}},
+            "routers": ["bot.database.routing.ReplicaRouter"],
+        }
+    )
+    # Both stand-ins get the schema, but rows written to the primary never reach the replica
+    await Tortoise.generate_schemas()
+    await connections.get("replica").execute_script(get_schema_sql(connections.get("default"), safe=True))
+    routing.replica_lag = 0.0
+    yield
+    routing.replica_lag = None
+    await Tortoise.close_connections()
+
+
+@pytest.mark.asyncio
+async def test_reads_follow_writes_then_move_to_the_replica(two_databases) -> None:
+    """
+    GIVEN a guild written to the primary
+    WHEN it is read right after by the writing task, then by another task
+    THEN the writer reads it back from the primary and the other task reads the replica
+    """
+    from bot.database.models import Guild
+
+    await Guild.create(discord_id=1)
+
+    assert await Guild.get_or_none(discord_id=1) is not None
+    assert await asyncio.create_task(_fresh_read(1)) is None
+
+
+@pytest.mark.asyncio
+async def test_lagging_replica_is_skipped(two_databases) -> None:
+    """
+    GIVEN a replica lagging past the allowed bound
+    WHEN another task reads
+    THEN the read goes to the primary
+    """
+    from bot.database.models import Guild
+
+    await Guild.create(discord_id=2)
+    routing.replica_lag = 3600.0
+
+    assert await asyncio.create_task(_fresh_read(2)) is not None
+
+
+async def _fresh_read(discord_id: int):
+    # create_task copies the context, and so the write's pin, so unpin this task to read like another one
+    routing._pinned_until.set(0.0)
+    from bot.database.models import Guild
+
+    return await Guild.get_or_none(discord_id=discord_id)
+
+
+@pytest.mark.asyncio
+async def test_cached_reads_load_from_the_primary(two_databases) -> None:
+    """
+    GIVEN a guild written to the primary and missing from the cache
+    WHEN another task reads it through the cache
+    THEN the cache loads it from the primary, not from the replica that doesn't have it yet
+    """
+    from bot.database.models import Guild
+    from bot.utils.cache import get_cache
+
+    await Guild.create(discord_id=3)
+    get_cache("guild").clear_local()
+
+    async def cached_read():
+        routing._pinned_until.set(0.0)
+        return await Guild.c_get_or_none_by_discord_id(3)
+
+    assert await asyncio.create_task(_fresh_read(3)) is None
+    assert (await asyncio.create_task(cached_read())).discord_id == 3
@@ -0,0 +1,81 @@
+"""Tests for the per-channel send queues of bot.utils.send_queue."""
+
+import asyncio
+import pytest
+from bot.utils.send_queue import RateLimit, SendQueues
+
+
+class FakeChannel:
+    id = 1
+
+    def __init__(self) -> None:
+        self.sent = []
+
+    async def send(self, content: str) -> None:
+        self.sent.append(content)
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_the_oldest_and_sends_a_notice() -> None:
+    """
+    GIVEN a queue of capacity 3
+    WHEN 5 messages are queued at once
+    THEN the 2 oldest are dropped, and the channel is told once the others were sent
+    """
+    channel = FakeChannel()
+    queues = SendQueues(capacity=3, max_concurrency=1)
+    dropped = []
+
+    for i in range(5):
+        queues.enqueue(channel, lambda i=i: channel.send(str(i)), on_drop=lambda i=i: dropped.append(i))
+    await queues.close()
+
+    assert dropped == [0, 1]
+    assert channel.sent[:3] == ["2", "3", "4"]
+    assert channel.sent[3].startswith("2 messages")
+    assert (queues.metrics.sent, queues.metrics.dropped, queues.metrics.depth) == (4, 2, 0)
+
+
+def test_rate_limit_waits_for_the_bucket_reset() -> None:
+    """
+    GIVEN the headers of an exhausted bucket, then of a 429
+    WHEN the rate limit is updated from them
+    THEN it waits until the reset, then for the Retry-After
+    """
+    rate_limit = RateLimit()
+    rate_limit.update({"X-RateLimit-Remaining": "1", "X-RateLimit-Reset-After": "2.5"})
+    assert rate_limit.delay() == 0
+    rate_limit.consume()
+    assert 2 < rate_limit.delay() <= 2.5
+
+    rate_limit.update({"Retry-After": "7", "X-RateLimit-Global": "true"}, status=429)
+    assert 6 < rate_limit.delay() <= 7
+
+
+@pytest.mark.asyncio
+async def test_sends_queued_while_the_notice_is_sent_are_not_stranded() -> None:
+    """
+    GIVEN a queue of capacity 1 that dropped a message
+    WHEN a message is queued while the drop notice is being sent
+    THEN that message is sent after the notice
+    """
+    queues = SendQueues(capacity=1, max_concurrency=1)
+
+    class SlowChannel(FakeChannel):
+        async def send(self, content: str) -> None:
+            if content.startswith("1 messages"):
+                queues.enqueue(self, lambda: self.send("late"))
+            await asyncio.sleep(0)
+            self.sent.append(content)
+
+    channel = SlowChannel()
+    for i in range(2):
+        queues.enqueue(channel, lambda i=i: channel.send(str(i)))
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+    assert channel.sent[0] == "1"
+    assert channel.sent[1].startswith("1 messages")
+    assert channel.sent[2:] == ["late"]
+    assert queues.depth(channel.id) == 0
+    await queues.close()
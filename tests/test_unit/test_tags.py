@@ -0,0 +1,178 @@
+"""Tests for the trigram tag index, content cache and use counter of bot.utils.tags."""
+
+import pytest
+import pytest_asyncio
+from tortoise import Tortoise
+from bot.database.models import Guild, Tags
+from bot.utils import tags as tags_module
+from bot.utils.tags import GuildTags, TagIndex, UseCounter, similarity
+
+
+@pytest_asyncio.fixture
+async def database(tmp_path):
+    await Tortoise.init(db_url=f"sqlite://{tmp_path}/models.sqlite3", modules={"B0F": ["bot.database.models"]})
+    await Tortoise.generate_schemas()
+    await Guild.create(discord_id=1)
+    yield
+    await Tortoise.close_connections()
+
+
+def test_similarity_matches_pg_trgm() -> None:
+    """
+    GIVEN strings whose pg_trgm similarity is known
+    WHEN their similarity is computed in process
+    THEN it matches what Postgres returns
+    """
+    assert similarity("word", "two words") == pytest.approx(0.363636, abs=1e-6)
+    assert similarity("Python", "python") == 1.0
+    assert similarity("abc", "xyz") == 0.0
+
+
+def test_lookup_ignores_case_and_follows_renames() -> None:
+    """
+    GIVEN a guild's tags
+    WHEN a tag is renamed and another deleted
+    THEN lookups ignore case and only see the current names
+    """
+    tags = GuildTags([(1, "Rules"), (2, "faq")])
+    tags.add(1, "server-rules")
+    tags.remove(2)
+
+    assert tags.get("SERVER-rules").tag_id == 1
+    assert tags.get("rules") is None
+    assert tags.get("faq") is None
+    assert tags.suggest("faq", 3, 0.1) == []
+
+
+def test_suggestions_are_ranked_by_similarity() -> None:
+    """
+    GIVEN a guild's tags
+    WHEN suggestions for a misspelled name are requested
+    THEN only similar enough names are returned, the most similar first
+    """
+    tags = GuildTags([(1, "install"), (2, "installation"), (3, "uninstall"), (4, "welcome")])
+
+    assert tags.suggest("instal", 2, 0.3) == ["install", "installation"]
+    assert "welcome" not in tags.suggest("instal", 5, 0.3)
+
+
+def test_edits_replace_the_cached_content() -> None:
+    """
+    GIVEN a guild with the content of a tag cached
+    WHEN the tag is edited, then deleted
+    THEN the cache holds the new content, then nothing
+    """
+    tags = GuildTags([(1, "rules")])
+    tags.contents.set(1, "be nice")
+
+    tags.add(1, "rules")
+    assert tags.contents.get(1) is None
+
+    tags.contents.set(1, "be very nice")
+    tags.remove(1)
+    assert tags.contents.get(1) is None
+
+
+def test_names_differing_in_case_dont_shadow_each_other() -> None:
+    """
+    GIVEN tags named "FAQ" and "faq", the first created first
+    WHEN they are looked up in various cases, and the older one is deleted
+    THEN the exact spelling wins, other spellings get the oldest, and the other tag stays found
+    """
+    tags = GuildTags([(2, "faq"), (1, "FAQ")])
+
+    assert (tags.get("faq").tag_id, tags.get("FAQ").tag_id, tags.get("Faq").tag_id) == (2, 1, 1)
+    assert tags.suggest("faqs", 3, 0.1) == ["FAQ"]
+
+    tags.remove(1)
+    assert (tags.get("FAQ").tag_id, tags.suggest("faqs", 3, 0.1)) == (2, ["faq"])
+
+
+@pytest.mark.asyncio
+async def test_contents_are_read_once_and_forgotten_with_their_tag(database, monkeypatch) -> None:
+    """
+    GIVEN a guild with a tag
+    WHEN it is used twice, edited, used again, then deleted behind the index's back
+    THEN its content is read once, the edit is seen, each use is counted and the deleted tag isn't found
+    """
+    monkeypatch.setattr(tags_module, "tag_uses", UseCounter(flush_interval=60))
+    index = TagIndex()
+    await Tags.create(tag_id=1, name="rules", author_id=2, guild_id=1, content="be nice", uses=0)
+    reads = []
+    original_filter = Tags.filter
+    monkeypatch.setattr(Tags, "filter", lambda *args, **kwargs: reads.append(kwargs) or original_filter(**kwargs))
+
+    assert (await index.use(1, "Rules"))[1] == "be nice"
+    assert (await index.use(1, "rules"))[1] == "be nice"
+    assert reads == [{"guild_id": 1}, {"tag_id": 1}]
+
+    tag = await Tags.get(tag_id=1)
+    tag.content = "be very nice"
+    index.update(tag)
+    assert (await index.use(1, "rules"))[1] == "be very nice"
+    assert tags_module.tag_uses._pending == {1: 3}
+
+    await Tags.filter(tag_id=1).delete()
+    index._guilds[1].contents.pop(1)
+    assert await index.use(1, "rules") is None
+    assert await index.get(1, "rules") is None
+
+
+@pytest.mark.asyncio
+async def test_uses_are_added_in_one_batch_and_kept_when_it_fails(database, monkeypatch) -> None:
+    """
+    GIVEN uses counted for two tags
+    WHEN a flush fails, more uses are counted and the counter is closed
+    THEN the failed uses are kept and every use is added to the tags
+    """
+    for tag_id in (1, 2):
+        await Tags.create(tag_id=tag_id, name=f"tag{tag_id}", author_id=2, guild_id=1, content="", uses=10)
+    counter = UseCounter(flush_interval=60)
+    counter.add(1)
+    counter.add(1)
+    counter.add(2)
+
+    async def fail(uses):
+        raise ConnectionError
+
+    with monkeypatch.context() as patch:
+        patch.setattr(Tags, "add_uses", fail)
+        await counter.flush()
+    assert (counter.pending, counter.flushed) == (2, 0)
+
+    counter.add(2, 5)
+    await counter.close()
+
+    assert (counter.pending, counter.flushed) == (0, 2)
+    assert dict(await Tags.all().values_list("tag_id", "uses")) == {1: 12, 2: 16}
+
+
+@pytest.mark.asyncio
+async def test_uses_put_back_after_a_failed_update_are_counted_once(database, monkeypatch) -> None:
+    """
+    GIVEN uses counted for two tags with different increments, so written by two UPDATEs
+    WHEN the second UPDATE fails and the uses are flushed again
+    THEN the first UPDATE is rolled back and every use is added once
+    """
+    for tag_id in (1, 2):
+        await Tags.create(tag_id=tag_id, name=f"tag{tag_id}", author_id=2, guild_id=1, content="", uses=10)
+    counter = UseCounter(flush_interval=60)
+    counter.add(1)
+    counter.add(2, 2)
+    tag_filter, calls = Tags.filter, []
+
+    def failing_filter(*args, **kwargs):
+        calls.append(kwargs)
+        if len(calls) == 2:
+            raise ConnectionError
+        return tag_filter(*args, **kwargs)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(Tags, "filter", failing_filter)
+        await counter.flush()
+    assert (counter.pending, counter.flushed) == (2, 0)
+    assert dict(await Tags.all().values_list("tag_id", "uses")) == {1: 10, 2: 10}
+
+    await counter.flush()
+
+    assert dict(await Tags.all().values_list("tag_id", "uses")) == {1: 11, 2: 12}
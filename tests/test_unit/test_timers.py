@@ -0,0 +1,116 @@
+"""Tests for the persisted timer scheduler of bot.utils.timers, on a SQLite database."""
+
+import asyncio
+import time
+import pytest
+import pytest_asyncio
+from tortoise import Tortoise
+from bot.database.models import Guild, Timer
+from bot.utils.timers import TimerScheduler, to_datetime
+
+
+@pytest_asyncio.fixture
+async def scheduler(tmp_path):
+    await Tortoise.init(db_url=f"sqlite://{tmp_path}/timers.sqlite3", modules={"B0F": ["bot.database.models"]})
+    await Tortoise.generate_schemas()
+    await Guild.create(discord_id=1)
+    scheduler = TimerScheduler(window=60, batch_size=10, max_concurrency=5, max_attempts=2, retry_delay=0.1)
+    yield scheduler
+    await scheduler.close()
+    await Tortoise.close_connections()
+
+
+@pytest.mark.asyncio
+async def test_overdue_timers_run_on_start_and_cancelled_ones_never(scheduler) -> None:
+    """
+    GIVEN a timer that expired while the bot was offline, a due one, a cancelled one and a later one
+    WHEN the scheduler runs past the due timers
+    THEN the expired and due timers ran and were deleted, the cancelled one didn't run, the later one is pending
+    """
+    ran = []
+
+    async def action(timer: Timer) -> None:
+        ran.append(timer.target_id)
+
+    scheduler.register("test", action)
+    now = time.time()
+    await Timer.create(action="test", guild_id=1, target_id=1, expires_at=to_datetime(now - 3600))
+
+    scheduler.start()
+    await scheduler.schedule("test", 1, 2, to_datetime(now + 0.2))
+    await scheduler.schedule("other", 1, 3, to_datetime(now + 0.2))
+    await scheduler.schedule("test", 1, 4, to_datetime(now + 30))
+    await scheduler.cancel(1, "other")
+    await asyncio.sleep(0.5)
+
+    assert ran == [1, 2]
+    assert await Timer.all().values_list("target_id", flat=True) == [4]
+
+
+@pytest.mark.asyncio
+async def test_a_timer_scheduled_while_its_window_loads_is_queued_once(scheduler, monkeypatch) -> None:
+    """
+    GIVEN a window query that is still running
+    WHEN a timer of that window is scheduled before the query reads the table
+    THEN it is in the heap once, though it was pushed and loaded
+    """
+    release = asyncio.Event()
+    original_filter = Timer.filter
+
+    class SlowQuery:
+        def __init__(self, query) -> None:
+            self.query = query
+
+        def filter(self, **filters) -> "SlowQuery":
+            return SlowQuery(self.query.filter(**filters))
+
+        async def values_list(self, *fields) -> list:
+            await release.wait()
+            return await self.query.values_list(*fields)
+
+    monkeypatch.setattr(Timer, "filter", lambda *args, **filters: SlowQuery(original_filter(**filters)))
+    load = asyncio.create_task(scheduler._load_window())
+    await asyncio.sleep(0)
+    await scheduler.schedule("test", 1, 2, to_datetime(time.time() + 10))
+    release.set()
+    await load
+
+    assert scheduler.in_memory == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_queries_lose_no_timer(scheduler, monkeypatch) -> None:
+    """
+    GIVEN a due timer
+    WHEN the window query fails once, then the fetch of the due timers fails once
+    THEN the window is loaded again, the due timer is fetched again, and it runs
+    """
+    ran = []
+
+    async def action(timer: Timer) -> None:
+        ran.append(timer.target_id)
+
+    scheduler.register("test", action)
+    await Timer.create(action="test", guild_id=1, target_id=1, expires_at=to_datetime(time.time() - 1))
+    original_filter = Timer.filter
+    failures = {"expires_at__lt", "id__in"}
+
+    def flaky_filter(*args, **filters):
+        for name in filters:
+            if name in failures:
+                failures.discard(name)
+                raise ConnectionError
+        return original_filter(**filters)
+
+    monkeypatch.setattr(Timer, "filter", flaky_filter)
+    with pytest.raises(ConnectionError):
+        await scheduler._tick()
+    assert scheduler._horizon == 0.0
+
+    with pytest.raises(ConnectionError):
+        await scheduler._tick()
+    assert scheduler.in_memory == 1
+
+    await scheduler._tick()
+    await asyncio.sleep(0.1)
+    assert ran == [1] and failures == set()
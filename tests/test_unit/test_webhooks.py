@@ -0,0 +1,124 @@
+"""Tests for the log channel webhook pool of bot.utils.webhooks."""
+
+import types
+import aiohttp
+import discord
+import pytest
+from bot.utils.log_dispatch import LogDispatcher
+from bot.utils.send_queue import SendQueues
+from bot.utils.webhooks import WEBHOOK_NAME, WebhookPool
+
+BOT_ID = 10
+
+
+class FakeChannel:
+    id = 1
+
+    def __init__(self) -> None:
+        me = types.SimpleNamespace(id=BOT_ID, display_name="B0F", display_avatar=types.SimpleNamespace(url="avatar"))
+        self.guild = types.SimpleNamespace(me=me)
+        self.existing = [
+            types.SimpleNamespace(id=100, name=WEBHOOK_NAME, token="a", user=me),
+            types.SimpleNamespace(id=101, name="Someone else's", token="b", user=me),
+        ]
+        self.next_id = 200
+
+    async def webhooks(self) -> list:
+        return self.existing
+
+    async def create_webhook(self, *, name: str, reason: str) -> types.SimpleNamespace:
+        self.next_id += 1
+        return types.SimpleNamespace(id=self.next_id, token="c")
+
+
+@pytest.mark.asyncio
+async def test_webhooks_are_reused_used_in_turn_and_recreated(monkeypatch) -> None:
+    """
+    GIVEN a channel with one pool webhook already, and a pool of 2
+    WHEN 3 messages are sent, the pool webhook is deleted, and 2 more are sent
+    THEN the existing webhook is reused with a new one, in turn, and the deleted one is replaced
+    """
+    deleted = set()
+    posts = []
+
+    async def send(webhook, **kwargs):
+        if webhook.id in deleted:
+            raise discord.NotFound(types.SimpleNamespace(status=404, reason="Not Found"), "Unknown Webhook")
+        posts.append(webhook.id)
+        return kwargs
+
+    monkeypatch.setattr(discord.Webhook, "send", send)
+    channel = FakeChannel()
+    async with aiohttp.ClientSession() as session:
+        pool = WebhookPool(session, size=2)
+        for _ in range(3):
+            sent = await pool.send(channel, content="log", files=None)
+        deleted.add(100)
+        channel.existing.pop(0)
+        for _ in range(2):
+            await pool.send(channel, content="log")
+
+    assert posts == [201, 100, 201, 202, 201]
+    assert sent == {"content": "log", "username": "B0F", "avatar_url": "avatar", "wait": True}
+    assert pool.created == 2
+
+
+class LimitedChannel(FakeChannel):
+    """A channel where webhooks can't be listed, or where one more can be created only."""
+
+    def __init__(self, error: discord.HTTPException, room: int = 0) -> None:
+        super().__init__()
+        self.error = error
+        self.room = room
+        self.sent = []
+
+    async def webhooks(self) -> list:
+        if not self.room:
+            raise self.error
+        return []
+
+    async def create_webhook(self, *, name: str, reason: str) -> types.SimpleNamespace:
+        if not self.room:
+            raise self.error
+        self.room -= 1
+        return await super().create_webhook(name=name, reason=reason)
+
+    async def send(self, **kwargs) -> dict:
+        self.sent.append(kwargs)
+        return kwargs
+
+
+def http_error(error_type: type, status: int, code: int) -> discord.HTTPException:
+    return error_type(types.SimpleNamespace(status=status, reason="error"), {"code": code, "message": "error"})
+
+
+@pytest.mark.asyncio
+async def test_channels_without_webhooks_are_sent_to_by_the_bot_until_they_change(monkeypatch) -> None:
+    """
+    GIVEN a channel where the bot can't manage webhooks, and one at its webhook limit
+    WHEN logs are posted to them twice, then the webhooks of the first one change
+    THEN each is set up once and its logs are sent by the bot, until the change makes it try again
+    """
+    async def send(webhook, **kwargs):
+        return kwargs
+
+    monkeypatch.setattr(discord.Webhook, "send", send)
+    monkeypatch.setattr(discord, "TextChannel", FakeChannel)
+    forbidden = LimitedChannel(http_error(discord.Forbidden, 403, 50013))
+    full = LimitedChannel(http_error(discord.HTTPException, 400, 30007))
+    full.id = 2
+    async with aiohttp.ClientSession() as session:
+        queues = SendQueues(capacity=10, max_concurrency=1)
+        dispatcher = LogDispatcher(window=0, max_embeds=10, max_chars=6000, queues=queues)
+        dispatcher.webhooks = pool = WebhookPool(session, size=2, retry_after=60)
+        for channel in (forbidden, full, forbidden, full):
+            await dispatcher._post(channel, content="log")
+        assert (len(forbidden.sent), len(full.sent), pool.usable(1), pool.usable(2)) == (2, 2, False, False)
+
+        forbidden.room = 1
+        pool.webhooks_updated(1)
+        await dispatcher._post(forbidden, content="log")
+        await dispatcher._post(forbidden, content="log")
+
+    assert len(forbidden.sent) == 2 and pool.usable(1)
+    assert pool.created == 1
@@ -0,0 +1,100 @@
+"""Tests for the batched audit writers of bot.database.writers, on a SQLite database."""
+
+import asyncio
+import pytest
+import pytest_asyncio
+from tortoise import Tortoise
+from bot.database.models import Guild, GuildEvent
+from bot.database.writers import BatchedWriter
+
+
+@pytest_asyncio.fixture
+async def database(tmp_path):
+    await Tortoise.init(db_url=f"sqlite://{tmp_path}/models.sqlite3", modules={"B0F": ["bot.database.models"]})
+    await Tortoise.generate_schemas()
+    await Guild.create(discord_id=1)
+    yield
+    await Tortoise.close_connections()
+
+
+def writer(batch_size: int = 100, flush_interval: float = 60) -> BatchedWriter:
+    return BatchedWriter(
+        GuildEvent,
+        ("guild_id", "description", "old", "new"),
+        batch_size=batch_size,
+        flush_interval=flush_interval,
+        max_pending=100,
+    )
+
+
+@pytest.mark.asyncio
+async def test_full_batches_are_written_without_waiting(database) -> None:
+    """
+    GIVEN a writer of batches of two
+    WHEN three rows are put
+    THEN the first two are written as a batch while the third waits for the flush interval
+    """
+    events = writer(batch_size=2)
+    events.start()
+    for n in range(3):
+        await events.put(1, f"event {n}", "", "")
+    await asyncio.sleep(0.1)
+
+    assert (events.written, events.pending) == (2, 0)
+    assert await GuildEvent.all().count() == 2
+    await events.close()
+
+
+@pytest.mark.asyncio
+async def test_close_writes_the_batch_being_gathered(database) -> None:
+    """
+    GIVEN a writer gathering a batch for a minute
+    WHEN five rows are put and it is closed before the minute is up
+    THEN the five rows taken off the queue are written
+    """
+    events = writer()
+    events.start()
+    for n in range(5):
+        await events.put(1, f"event {n}", "", "")
+    await asyncio.sleep(0.1)
+    await events.close()
+
+    assert events.written == 5
+    assert await GuildEvent.all().count() == 5
+
+
+@pytest.mark.asyncio
+async def test_a_failing_row_is_dropped_alone(database) -> None:
+    """
+    GIVEN a batch with a row of a guild that doesn't exist
+    WHEN it is flushed
+    THEN it is written again row by row, and only the row of the missing guild is dropped
+    """
+    events = writer()
+    await events.put(1, "kept", "", "")
+    await events.put(2, "missing guild", "", "")
+    await events.put(1, "kept too", "", "")
+    await events.close()
+
+    assert (events.written, events.failed) == (2, 1)
+    assert sorted(await GuildEvent.all().values_list("description", flat=True)) == ["kept", "kept too"]
+
+
+@pytest.mark.asyncio
+async def test_rows_put_after_close_are_dropped(database) -> None:
+    """
+    GIVEN a closed writer
+    WHEN a row is put, then the writer is started again and another row is put
+    THEN the first row is counted as failed and not queued, and the second one is written
+    """
+    events = writer(batch_size=1)
+    events.start()
+    await events.close()
+
+    await events.put(1, "after close", "", "")
+    assert (events.failed, events.pending) == (1, 0)
+
+    events.start()
+    await events.put(1, "after start", "", "")
+    await events.close()
+    assert await GuildEvent.all().values_list("description", flat=True) == ["after start"]